@@ -0,0 +1,164 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from gqlalchemy import Memgraph
+
+from db.workload import WORKLOAD, WORKLOAD_VERSION
+from utils import setup_custom_logger
+
+logger = setup_custom_logger(__name__)
+
+
+class WorkloadBenchmark:
+    """
+    Runs the query workload of db/workload.py against a Bolt endpoint and measures latency and throughput.
+
+    Every worker thread holds its own connection. Each query is first run warmup times per worker without being
+    measured, then iterations times per worker, with all workers starting their measured runs together. The
+    latency of a query includes fetching all its results.
+
+    Parameters
+    ----------
+    host : str
+        The host of the Bolt endpoint.
+    port : int
+        The port of the Bolt endpoint.
+    username : str
+        The username, empty if authentication is disabled.
+    password : str
+        The password, empty if authentication is disabled.
+    encrypted : bool
+        Whether to connect over SSL.
+    workload : list
+        The WorkloadQuery objects to run.
+
+    Methods
+    -------
+    run(concurrency_levels=(1,), warmup=5, iterations=50)
+        Runs the workload at each concurrency level and returns the report.
+    """
+
+    def __init__(self, host, port, username="", password="", encrypted=False, workload=WORKLOAD):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.encrypted = encrypted
+        self.workload = workload
+
+    def _connect(self):
+        return Memgraph(self.host, self.port, username=self.username, password=self.password, encrypted=self.encrypted)
+
+    @staticmethod
+    def _run_query(memgraph, query) -> float:
+        start = time.perf_counter()
+        for _ in memgraph.execute_and_fetch(query.cypher, query.parameters):
+            pass
+        return time.perf_counter() - start
+
+    def _worker(self, query, warmup, iterations, barrier) -> tuple:
+        try:
+            memgraph = self._connect()
+            for _ in range(warmup):
+                self._run_query(memgraph, query)
+        except Exception:
+            # release the other clients waiting for this one
+            barrier.abort()
+            raise
+        barrier.wait()
+        start = time.perf_counter()
+        latencies = [self._run_query(memgraph, query) for _ in range(iterations)]
+        return latencies, start, time.perf_counter()
+
+    def _run_level(self, query, concurrency, warmup, iterations) -> dict:
+        # the clients start their measured runs together once all of them are warmed up
+        barrier = threading.Barrier(concurrency)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(self._worker, query, warmup, iterations, barrier) for _ in range(concurrency)]
+        errors = [future.exception() for future in futures if future.exception() and not isinstance(future.exception(), threading.BrokenBarrierError)]
+        if errors:
+            raise errors[0]
+        runs = [future.result() for future in futures]
+        latencies = np.concatenate([run[0] for run in runs])
+        elapsed = max(run[2] for run in runs) - min(run[1] for run in runs)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+        return {
+            "query": query.name,
+            "concurrency": concurrency,
+            "count": int(len(latencies)),
+            "meanMs": round(float(latencies.mean() * 1000), 3),
+            "p50Ms": round(float(p50), 3),
+            "p95Ms": round(float(p95), 3),
+            "p99Ms": round(float(p99), 3),
+            "throughputQps": round(len(latencies) / elapsed, 2),
+        }
+
+    def run(self, concurrency_levels=(1,), warmup=5, iterations=50) -> dict:
+        """
+        Runs the workload at each concurrency level.
+
+        Parameters
+        ----------
+        concurrency_levels : iterable
+            The numbers of concurrent clients.
+        warmup : int
+            The unmeasured runs of each query per client.
+        iterations : int
+            The measured runs of each query per client.
+
+        Returns
+        -------
+        dict
+            The run metadata and one result per query and concurrency level.
+        """
+        results = []
+        for concurrency in concurrency_levels:
+            for query in self.workload:
+                try:
+                    result = self._run_level(query, concurrency, warmup, iterations)
+                except Exception as e:
+                    logger.error(f"Query {query.name} failed: {e}")
+                    result = {"query": query.name, "concurrency": concurrency, "error": str(e)}
+                logger.info(f"{query.name} x{concurrency}: {result}")
+                results.append(result)
+        return {
+            "workloadVersion": WORKLOAD_VERSION,
+            "endpoint": f"{self.host}:{self.port}",
+            "startedAt": pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "warmup": warmup,
+            "iterations": iterations,
+            "results": results,
+        }
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Benchmark the Cypher query workload against a Bolt endpoint")
+    parser.add_argument("--host", default=os.getenv("QUICK_CONNECT_MG_HOST", "127.0.0.1"), help="Bolt host, QUICK_CONNECT_MG_HOST by default")
+    parser.add_argument("--port", type=int, default=int(os.getenv("QUICK_CONNECT_MG_PORT", "7687")), help="Bolt port, QUICK_CONNECT_MG_PORT by default")
+    parser.add_argument("--username", default="")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--encrypted", action="store_true")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured runs of each query per client")
+    parser.add_argument("--iterations", type=int, default=50, help="measured runs of each query per client")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="numbers of concurrent clients")
+    parser.add_argument("--queries", nargs="+", help="names of the workload queries to run, all by default")
+    parser.add_argument("--output", help="file to write the JSON report to, stdout by default")
+    args = parser.parse_args()
+
+    workload = [query for query in WORKLOAD if not args.queries or query.name in args.queries]
+    benchmark = WorkloadBenchmark(args.host, args.port, args.username, args.password, args.encrypted, workload)
+    report = json.dumps(benchmark.run(args.concurrency, args.warmup, args.iterations), indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(report)
+        logger.info(f"Saved benchmark report to {args.output}")
+    else:
+        print(report)
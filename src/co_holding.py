@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix, diags
+
+from entity_resolution import HolderNameResolver
+from utils import DATA_DIR, setup_custom_logger
+
+logger = setup_custom_logger(__name__)
+
+
+class CoHoldingBuilder:
+    """
+    Computes which tickers share institutional and mutual fund holders.
+
+    The holders of a snapshot form a sparse holder x ticker matrix weighted by pctHeld. With its columns scaled
+    to unit length, one sparse multiply gives the cosine overlap of the holder bases of all ticker pairs, and the
+    top-k pairs per ticker are kept as CO_HELD relationships.
+
+    Parameters
+    ----------
+    data_path : Path
+        The snapshot directory.
+    top_k : int
+        The number of most co-held tickers kept per ticker.
+    resolver : HolderNameResolver
+        Maps holder name variants to one holder.
+
+    Methods
+    -------
+    build_matrix()
+        Builds the holder x ticker matrix.
+    compute(block_size=512)
+        Computes the top-k co-held tickers of every ticker.
+    save(co_held)
+        Saves the co-held pairs to the snapshot directory.
+    """
+
+    def __init__(self, data_path=DATA_DIR / f"data_{pd.Timestamp.now().strftime('%Y-%m-%d')}", top_k=20, resolver=None):
+        self.data_path = data_path
+        self.top_k = top_k
+        self.resolver = resolver or HolderNameResolver()
+
+    def _read_holders(self, file_name, prefix):
+        try:
+            data = pd.read_csv(self.data_path / file_name, usecols=["name", "ticker", "pctHeld"])
+        except (FileNotFoundError, ValueError, pd.errors.EmptyDataError):
+            return pd.DataFrame(columns=["holder", "ticker", "pctHeld"])
+        data = data.dropna(subset=["name", "ticker"])
+        mapping = self.resolver.resolve(data["name"]).set_index("name")
+        data["holder"] = prefix + data["name"].map(mapping["canonicalName"])
+        return data[["holder", "ticker", "pctHeld"]]
+
+    def build_matrix(self):
+        """
+        Builds the holder x ticker matrix.
+
+        Returns
+        -------
+        tuple
+            The csr_matrix of pctHeld (holders without a reported pctHeld get a tiny weight so they still count)
+            and the tickers of its columns.
+        """
+        holdings = pd.concat([self._read_holders("institution.csv", "Institution:"), self._read_holders("mutual_fund.csv", "MutualFund:")], ignore_index=True)
+        holdings = holdings.drop_duplicates(["holder", "ticker"])
+        holder_ids, _ = pd.factorize(holdings["holder"])
+        ticker_ids, tickers = pd.factorize(holdings["ticker"])
+        weights = pd.to_numeric(holdings["pctHeld"], errors="coerce").fillna(0).clip(lower=1e-6).to_numpy()
+        matrix = csr_matrix((weights, (holder_ids, ticker_ids)), shape=(holder_ids.max() + 1 if len(holder_ids) else 0, len(tickers)))
+        return matrix, np.asarray(tickers)
+
+    def compute(self, block_size=512) -> pd.DataFrame:
+        """
+        Computes the top-k co-held tickers of every ticker.
+
+        Parameters
+        ----------
+        block_size : int
+            The number of tickers whose overlap row is held in memory at once.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per unordered ticker pair with columns source, target, weight (cosine overlap of the pctHeld
+            vectors) and sharedHolders.
+        """
+        matrix, tickers = self.build_matrix()
+        if matrix.nnz == 0 or len(tickers) < 2:
+            return pd.DataFrame(columns=["source", "target", "weight", "sharedHolders"])
+
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+        normalized = matrix @ diags(1 / norms)
+        binary = matrix.copy()
+        binary.data[:] = 1
+        normalized_t, binary_t = normalized.T.tocsr(), binary.T.tocsr()
+
+        # the overlap of large holders is close to dense, so it is multiplied out and ranked one block of tickers at a time
+        k = min(self.top_k, len(tickers) - 1)
+        sources, targets, weights, shared_holders = [], [], [], []
+        for start in range(0, len(tickers), block_size):
+            rows = np.arange(start, min(start + block_size, len(tickers)))
+            overlap = (normalized_t[rows] @ normalized).toarray()
+            overlap[np.arange(len(rows)), rows] = 0
+            top = np.argpartition(-overlap, k - 1, axis=1)[:, :k]
+            top_weights = np.take_along_axis(overlap, top, axis=1)
+            top_shared = np.take_along_axis((binary_t[rows] @ binary).toarray(), top, axis=1)
+            keep = top_weights > 0
+            sources.append(np.repeat(rows, k).reshape(-1, k)[keep])
+            targets.append(top[keep])
+            weights.append(top_weights[keep])
+            shared_holders.append(top_shared[keep])
+
+        # keep each pair once, whichever side ranked it
+        sources, targets = np.concatenate(sources), np.concatenate(targets)
+        pairs = pd.DataFrame({"source": np.minimum(sources, targets), "target": np.maximum(sources, targets), "weight": np.concatenate(weights), "sharedHolders": np.concatenate(shared_holders).astype(int)})
+        pairs = pairs.drop_duplicates(["source", "target"])
+        co_held = pairs.assign(source=tickers[pairs["source"]], target=tickers[pairs["target"]]).reset_index(drop=True)
+        logger.info(f"Computed {len(co_held)} co-held ticker pairs for {len(tickers)} tickers")
+        return co_held
+
+    def save(self, co_held):
+        """
+        Saves the co-held pairs to the snapshot directory.
+        """
+        file_path = self.data_path / "co_held.csv"
+        co_held.to_csv(file_path, index=False)
+        logger.info(f"Saved data to {file_path}")
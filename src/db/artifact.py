@@ -0,0 +1,218 @@
+import gzip
+import json
+import shutil
+
+import pandas as pd
+
+from metrics import metrics
+from utils import DATA_DIR, setup_custom_logger
+
+logger = setup_custom_logger(__name__)
+
+ARTIFACT_VERSION = 1
+# set on the restored nodes until their relationships are created, then removed
+RESTORE_ID = "_restoreId"
+# the schedule of the cron job running main.py, see src/Dockerfile
+SCHEDULE_TIME = pd.Timedelta(hours=21, minutes=5)
+SCHEDULE_WEEKDAYS = (0, 1, 2, 3, 4)
+
+
+def last_scheduled_run(now=None) -> pd.Timestamp:
+    """
+    Returns the start of the last scheduled run of main.py at or before now, the current time by default.
+    """
+    now = now or pd.Timestamp.now()
+    run = now.normalize() + SCHEDULE_TIME
+    while run > now or run.weekday() not in SCHEDULE_WEEKDAYS:
+        run -= pd.Timedelta(days=1)
+    return run
+
+
+def graph_is_empty(memgraph) -> bool:
+    return next(memgraph.execute_and_fetch("MATCH (n) RETURN count(n) AS nodes"))["nodes"] == 0
+
+
+class GraphArtifact:
+    """
+    A load-ready export of the whole graph, used to restore it on a cold start in minutes instead of
+    downloading and uploading all data again.
+
+    The artifact is a directory with one gzipped JSON lines file per node label and per relationship type,
+    holding the properties, and a manifest.json with the date of the snapshot the graph was built from and
+    the element counts. It is written to a temporary directory and swapped in once complete, so a failed
+    export never replaces the last good artifact.
+
+    Parameters
+    ----------
+    path : Path
+        The artifact directory.
+    batch_size : int
+        The number of nodes or relationships created per query on restore.
+
+    Methods
+    -------
+    manifest()
+        Returns the manifest, None if there is no artifact.
+    is_fresh(now=None)
+        Checks if the artifact is at least as new as the last scheduled run.
+    export(memgraph, snapshot_date)
+        Exports the graph.
+    restore(memgraph)
+        Replaces the graph with the exported one.
+    """
+
+    def __init__(self, path=DATA_DIR / "graph_artifact", batch_size=5000):
+        self.path = path
+        self.batch_size = batch_size
+
+    def manifest(self):
+        """
+        Returns the manifest, None if there is no artifact.
+        """
+        manifest_file = self.path / "manifest.json"
+        if not manifest_file.exists():
+            return None
+        return json.loads(manifest_file.read_text())
+
+    def is_fresh(self, now=None) -> bool:
+        """
+        Checks if the artifact was built from a snapshot at least as new as the last scheduled run at or before
+        now, the current time by default. A run started at the schedule would not produce a newer snapshot.
+        """
+        manifest = self.manifest()
+        return manifest is not None and manifest["snapshotDate"] >= last_scheduled_run(now).strftime("%Y-%m-%d")
+
+    @staticmethod
+    def _write(directory, file_name, rows, files):
+        if file_name not in files:
+            files[file_name] = gzip.open(directory / file_name, "wt", encoding="utf-8")
+        files[file_name].write(json.dumps(rows, default=str) + "\n")
+
+    @metrics.timed("export_graph")
+    def export(self, memgraph, snapshot_date):
+        """
+        Exports the graph, replacing the previous artifact.
+
+        Parameters
+        ----------
+        memgraph : Memgraph
+            The database connection.
+        snapshot_date : str
+            The date of the snapshot the graph was built from, YYYY-MM-DD.
+        """
+        temporary_path = self.path.with_name(self.path.name + ".tmp")
+        shutil.rmtree(temporary_path, ignore_errors=True)
+        temporary_path.mkdir(parents=True)
+
+        nodes, relationships, files = {}, {}, {}
+        try:
+            for row in memgraph.execute_and_fetch("MATCH (n) RETURN id(n) AS id, labels(n) AS labels, properties(n) AS properties"):
+                label = ":".join(row["labels"])
+                nodes[label] = nodes.get(label, 0) + 1
+                self._write(temporary_path, f"nodes_{label}.jsonl.gz", {"id": row["id"], "properties": row["properties"]}, files)
+
+            query = "MATCH (a)-[r]->(b) RETURN id(a) AS source, labels(a) AS sourceLabels, id(b) AS target, labels(b) AS targetLabels, type(r) AS type, properties(r) AS properties"
+            for row in memgraph.execute_and_fetch(query):
+                # grouped by the end node labels too, so the restore looks both ends up by label
+                key = f"{':'.join(row['sourceLabels'])}-{row['type']}-{':'.join(row['targetLabels'])}"
+                relationships[key] = relationships.get(key, 0) + 1
+                self._write(temporary_path, f"relationships_{key}.jsonl.gz", {"source": row["source"], "target": row["target"], "properties": row["properties"]}, files)
+        finally:
+            for file in files.values():
+                file.close()
+
+        manifest = {
+            "version": ARTIFACT_VERSION,
+            "snapshotDate": snapshot_date,
+            "exportedAt": pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "nodes": nodes,
+            "relationships": relationships,
+        }
+        (temporary_path / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+        previous_path = self.path.with_name(self.path.name + ".old")
+        shutil.rmtree(previous_path, ignore_errors=True)
+        if self.path.exists():
+            self.path.rename(previous_path)
+        temporary_path.rename(self.path)
+        shutil.rmtree(previous_path, ignore_errors=True)
+        metrics.add_rows(sum(nodes.values()) + sum(relationships.values()))
+        logger.info(f"Exported {sum(nodes.values())} nodes and {sum(relationships.values())} relationships of the {snapshot_date} snapshot to {self.path}")
+
+    def _read(self, file_name):
+        with gzip.open(self.path / file_name, "rt", encoding="utf-8") as file:
+            for line in file:
+                yield json.loads(line)
+
+    def _execute_batches(self, memgraph, query, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                memgraph.execute(query, {"rows": batch})
+                batch = []
+        if batch:
+            memgraph.execute(query, {"rows": batch})
+
+    @staticmethod
+    def _labels(label) -> str:
+        """
+        Returns the label expression of the exported labels, empty for the nodes without labels.
+        """
+        return f":{label}" if label else ""
+
+    @metrics.timed("restore_graph")
+    def restore(self, memgraph):
+        """
+        Replaces the graph with the exported one. The nodes get a temporary indexed id, so the relationships
+        can be created by looking their end nodes up, which is removed afterwards. Nodes with several labels
+        are looked up by their first label, nodes without labels by a scan.
+
+        Parameters
+        ----------
+        memgraph : Memgraph
+            The database connection.
+
+        Returns
+        -------
+        dict
+            The manifest of the restored artifact.
+        """
+        manifest = self.manifest()
+        if manifest is None:
+            logger.error(f"No graph artifact in {self.path}")
+            raise FileNotFoundError(f"No graph artifact in {self.path}")
+        if manifest["version"] != ARTIFACT_VERSION:
+            logger.error(f"Graph artifact version {manifest['version']} is not supported")
+            raise ValueError(f"Graph artifact version {manifest['version']} is not supported")
+
+        logger.info(f"Restoring the graph of the {manifest['snapshotDate']} snapshot from {self.path}")
+        memgraph.execute("MATCH (n) DETACH DELETE n")
+        labels = sorted({label.split(":")[0] for label in manifest["nodes"]})
+        for label in filter(None, labels):
+            memgraph.execute(f"CREATE INDEX ON :{label}({RESTORE_ID});")
+
+        for label, count in manifest["nodes"].items():
+            query = f"UNWIND $rows AS row CREATE (n{self._labels(label)}) SET n = row.properties, n.{RESTORE_ID} = row.id"
+            self._execute_batches(memgraph, query, self._read(f"nodes_{label}.jsonl.gz"))
+            metrics.add_rows(count)
+            logger.info(f"Restored {count} {label or 'unlabeled'} nodes")
+
+        for key, count in manifest["relationships"].items():
+            source_label, relationship_type, target_label = key.split("-")
+            query = f"""
+                UNWIND $rows AS row
+                MATCH (a{self._labels(source_label.split(':')[0])} {{{RESTORE_ID}: row.source}}), (b{self._labels(target_label.split(':')[0])} {{{RESTORE_ID}: row.target}})
+                CREATE (a)-[r:{relationship_type}]->(b)
+                SET r = row.properties
+            """
+            self._execute_batches(memgraph, query, self._read(f"relationships_{key}.jsonl.gz"))
+            metrics.add_rows(count)
+            logger.info(f"Restored {count} {relationship_type} relationships from {source_label} to {target_label}")
+
+        for label in labels:
+            memgraph.execute(f"MATCH (n{self._labels(label)}) WHERE n.{RESTORE_ID} IS NOT NULL REMOVE n.{RESTORE_ID}")
+            if label:
+                memgraph.execute(f"DROP INDEX ON :{label}({RESTORE_ID});")
+        logger.info(f"Restored the graph of the {manifest['snapshotDate']} snapshot")
+        return manifest
@@ -0,0 +1,84 @@
+import os
+
+from dotenv import load_dotenv
+from gqlalchemy import Memgraph
+
+from utils import setup_custom_logger
+
+logger = setup_custom_logger(__name__)
+
+
+class LazyMemgraph:
+    """
+    A Memgraph connection that is only opened when it is first used, so importing the models does not need a
+    reachable database.
+
+    The indexes and constraints the models declare with Field(..., db=memgraph) are queued instead of being
+    created at import time. They are created on the first query through the connection, skipping the ones
+    that already exist, so the schema bootstrap can run any number of times. All other attributes are those
+    of the underlying Memgraph object.
+
+    Parameters
+    ----------
+    host : str
+        The Memgraph host, QUICK_CONNECT_MG_HOST by default.
+    port : int
+        The Memgraph port, QUICK_CONNECT_MG_PORT by default.
+
+    Methods
+    -------
+    create_index(index)
+        Queues an index for the schema bootstrap.
+    create_constraint(constraint)
+        Queues a constraint for the schema bootstrap.
+    bootstrap()
+        Creates the queued indexes and constraints that do not exist yet.
+    """
+
+    def __init__(self, host=None, port=None):
+        self.host = host
+        self.port = port
+        self._memgraph = None
+        self._pending = []
+
+    def _connect(self) -> Memgraph:
+        if self._memgraph is None:
+            load_dotenv()
+            self._memgraph = Memgraph(self.host or os.getenv("QUICK_CONNECT_MG_HOST"), int(self.port or os.getenv("QUICK_CONNECT_MG_PORT")))
+        return self._memgraph
+
+    def create_index(self, index):
+        self._pending.append(("INDEX", index))
+
+    def create_constraint(self, constraint):
+        self._pending.append(("CONSTRAINT", constraint))
+
+    def bootstrap(self):
+        """
+        Creates the queued indexes and constraints that do not exist yet.
+        """
+        if not self._pending:
+            return
+        memgraph = self._connect()
+        pending, self._pending = self._pending, []
+        existing = {("INDEX", index.to_cypher()) for index in memgraph.get_indexes()}
+        existing |= {("CONSTRAINT", constraint.to_cypher()) for constraint in memgraph.get_constraints()}
+        created = 0
+        for kind, schema_object in pending:
+            if (kind, schema_object.to_cypher()) in existing:
+                continue
+            try:
+                memgraph.execute(f"CREATE {kind} ON {schema_object.to_cypher()};")
+                created += 1
+            except Exception as e:
+                # e.g. a constraint reported in another form by SHOW CONSTRAINT INFO
+                logger.info(f"CREATE {kind} ON {schema_object.to_cypher()} skipped: {e}")
+        logger.info(f"Schema bootstrap created {created} of {len(pending)} indexes and constraints")
+
+    def __getattr__(self, name):
+        memgraph = self._connect()
+        self.bootstrap()
+        return getattr(memgraph, name)
+
+
+memgraph = LazyMemgraph()
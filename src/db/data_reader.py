@@ -2,6 +2,10 @@ from enum import Enum
 
 import pandas as pd
 
+from utils import setup_custom_logger
+
+logger = setup_custom_logger(__name__)
+
 
 class Files(Enum):
     """
@@ -12,7 +16,8 @@ class Files(Enum):
     INSIDER_TRANSACTION = "insider_transaction.csv"
     INSTITUTION = "institution.csv"
     MUTUAL_FUND = "mutual_fund.csv"
-    TICKER_INFO = "info.csv"
+    NEWS = "news.csv"
+    TICKER_INFO = "ticker_info.csv"
 
 
 class DataReader:
@@ -34,7 +39,7 @@ class DataReader:
         """
         self.data_path = data_path
 
-    def read_all_files(self, file: Files):
+    def read_all_files(self, file: Files, since=None):
         """
         Read all the files with the given name in the data directory
 
@@ -42,12 +47,18 @@ class DataReader:
         ----------
         file : Files
             Name of the file to read
+        since : str, optional
+            Only read snapshots taken strictly after this date (YYYY-MM-DD)
         """
         dfs = []
         for directory in self.get_all_directories():
+            if since is not None and directory.name.replace("data_", "") <= since:
+                continue
             for file_dir in self.get_all_files_w_name(directory, file):
-                print("FILE IN LOOP:", file_dir)
+                logger.debug(f"Reading {file_dir}")
                 dfs.append(self.read_df(file_dir))
+        if not dfs:
+            return pd.DataFrame([])
         return pd.concat(dfs, ignore_index=True)
 
     @staticmethod
@@ -61,7 +72,10 @@ class DataReader:
             Path to the csv file
         """
 
-        df = pd.read_csv(dir)
+        try:
+            df = pd.read_csv(dir)
+        except pd.errors.EmptyDataError:
+            df = pd.DataFrame([])
         date = str(dir).split("/")[-2].replace("data_", "")
         df["date"] = pd.to_datetime(date)
         return df
@@ -77,11 +91,12 @@ class DataReader:
         file : str
             Name of the file to search for
         """
-        print("PATH:", files_path)
-        print("FILE:", file)
-        print("FILE VAL:", file.value)
         return [x for x in files_path.iterdir() if x.name == file.value]
 
     def get_all_directories(self):
-        """Get all directories in the data directory"""
-        return [x for x in self.data_path.iterdir() if x.is_dir()]
+        """Get all snapshot directories (data_YYYY-MM-DD) in the data directory, sorted by date"""
+        return sorted(x for x in self.data_path.iterdir() if x.is_dir() and x.name.startswith("data_"))
+
+    def get_all_dates(self):
+        """Get the dates (YYYY-MM-DD) of all snapshot directories in the data directory, sorted ascending"""
+        return [x.name.replace("data_", "") for x in self.get_all_directories()]
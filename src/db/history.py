@@ -0,0 +1,184 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from db.data_reader import DataReader, Files
+from utils import DATA_DIR, setup_custom_logger
+
+logger = setup_custom_logger(__name__)
+
+
+class HoldingsHistory:
+    """
+    Turns the daily snapshots into run-length-encoded validity intervals for the holding relationships.
+
+    A new interval is opened only when the tracked values of a (holder, ticker) pair change, or when the pair
+    reappears after missing from a snapshot. Snapshots without rows of a relationship, e.g. of a failed download,
+    are skipped rather than treated as a snapshot every pair is missing from. Intervals are stored as CSV files in the history directory and are
+    extended incrementally: only snapshots newer than the last processed one are read on each update.
+
+    Parameters
+    ----------
+    data_path : Path
+        The path to the data directory containing the data_YYYY-MM-DD snapshots.
+
+    Attributes
+    ----------
+    reader : DataReader
+        The reader used to load the snapshots.
+    history_path : Path
+        The path to the directory holding the precomputed intervals.
+
+    Methods
+    -------
+    update()
+        Extends the stored intervals with all snapshots not processed yet.
+    load_intervals(relationship)
+        Loads the stored intervals for the given relationship type.
+    build_intervals(snapshots, dates, keys, values, open_intervals=None)
+        Run-length encodes the snapshots into validity intervals.
+    """
+
+    # relationship type -> (snapshot file, key columns, tracked value columns)
+    RELATIONSHIPS = {
+        "HOLDS_IT": (Files.INSTITUTION, ["name", "ticker"], ["shares", "dateReported", "pctHeld", "value"]),
+        "HOLDS_MT": (Files.MUTUAL_FUND, ["name", "ticker"], ["shares", "dateReported", "pctHeld", "value"]),
+        "HOLDS_IHT": (Files.INSIDER_HOLDER, ["ticker", "name"], ["mostRecentTransaction", "latestTransactionDate", "sharesOwnedDirectly", "positionDirectDate", "sharesOwnedIndirectly", "positionIndirectDate"]),
+    }
+
+    def __init__(self, data_path=DATA_DIR):
+        self.reader = DataReader(data_path)
+        self.history_path = data_path / "history"
+
+    def _intervals_file(self, relationship):
+        return self.history_path / f"{relationship.lower()}.csv"
+
+    def _load_state(self):
+        state_file = self.history_path / "state.json"
+        if not state_file.exists():
+            return {}
+        return json.loads(state_file.read_text())
+
+    def _save_state(self, state):
+        (self.history_path / "state.json").write_text(json.dumps(state, indent=2))
+
+    def load_intervals(self, relationship) -> pd.DataFrame:
+        """
+        Loads the stored intervals for the given relationship type.
+
+        Parameters
+        ----------
+        relationship : str
+            The relationship type, one of RELATIONSHIPS.
+
+        Returns
+        -------
+        pd.DataFrame
+            The intervals with the key columns, the tracked values, validFrom and validTo (None while still open).
+        """
+        _, keys, values = self.RELATIONSHIPS[relationship]
+        intervals_file = self._intervals_file(relationship)
+        if not intervals_file.exists():
+            return pd.DataFrame(columns=keys + values + ["validFrom", "validTo"])
+        return pd.read_csv(intervals_file)
+
+    def update(self):
+        """
+        Extends the stored intervals with all snapshots not processed yet.
+
+        Returns
+        -------
+        dict
+            The number of stored intervals per relationship type.
+        """
+        state = self._load_state()
+        last_snapshot = state.get("lastSnapshot")
+        new_dates = [date for date in self.reader.get_all_dates() if last_snapshot is None or date > last_snapshot]
+        if not new_dates:
+            logger.info(f"Holdings history is up to date with snapshot {last_snapshot}")
+            return {relationship: len(self.load_intervals(relationship)) for relationship in self.RELATIONSHIPS}
+
+        self.history_path.mkdir(parents=True, exist_ok=True)
+        counts, processed = {}, []
+        for relationship, (file, keys, values) in self.RELATIONSHIPS.items():
+            snapshots = self.reader.read_all_files(file, since=last_snapshot)
+            if snapshots.empty:
+                snapshots = pd.DataFrame(columns=keys + values + ["date"])
+            snapshots["date"] = pd.to_datetime(snapshots["date"]).dt.strftime("%Y-%m-%d")
+            for column in values:
+                if column not in snapshots:
+                    snapshots[column] = None
+
+            # only the snapshots holding the relationship, an incomplete one would close and reopen every interval
+            dates = sorted(snapshots["date"].unique())
+            processed += dates[-1:]
+
+            stored = self.load_intervals(relationship)
+            is_open = stored["validTo"].isna()
+            if last_snapshot is None:
+                intervals = self.build_intervals(snapshots, dates, keys, values)
+            else:
+                intervals = self.build_intervals(snapshots, [last_snapshot] + dates, keys, values, open_intervals=stored[is_open])
+            if not stored[~is_open].empty:
+                intervals = pd.concat([stored[~is_open], intervals], ignore_index=True)
+            intervals.to_csv(self._intervals_file(relationship), index=False)
+            counts[relationship] = len(intervals)
+            logger.info(f"Stored {len(intervals)} {relationship} intervals up to snapshot {dates[-1] if dates else last_snapshot}")
+
+        if processed:
+            self._save_state({"lastSnapshot": max(processed)})
+        else:
+            logger.warning(f"No holdings in the snapshots {new_dates}, they are read again on the next update")
+        return counts
+
+    @staticmethod
+    def build_intervals(snapshots, dates, keys, values, open_intervals=None) -> pd.DataFrame:
+        """
+        Run-length encodes the snapshots into validity intervals.
+
+        Parameters
+        ----------
+        snapshots : pd.DataFrame
+            The snapshot rows with the key columns, the tracked values and a date column (YYYY-MM-DD).
+        dates : list
+            All snapshot dates covered, sorted ascending. When open_intervals is given, the first date is the
+            snapshot the open intervals were last seen in.
+        keys : list
+            The columns identifying a relationship.
+        values : list
+            The columns whose change opens a new interval.
+        open_intervals : pd.DataFrame, optional
+            Still open intervals from a previous run, carried over as rows of the first date.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per interval with the key columns, the tracked values, validFrom and validTo. validTo is the
+            first snapshot date the values no longer held, or None if they hold in the last snapshot.
+        """
+        frames = [snapshots[keys + values + ["date"]]]
+        if open_intervals is not None and not open_intervals.empty:
+            frames.insert(0, open_intervals[keys + values + ["validFrom"]].assign(date=dates[0]))
+        data = pd.concat(frames, ignore_index=True)
+        if "validFrom" not in data:
+            data["validFrom"] = None
+        if data.empty:
+            return pd.DataFrame(columns=keys + values + ["validFrom", "validTo"])
+
+        data = data.drop_duplicates(subset=keys + ["date"], keep="last")
+        data["dateIdx"] = data["date"].map({date: i for i, date in enumerate(dates)})
+        data = data.sort_values(keys + ["dateIdx"], kind="stable").reset_index(drop=True)
+
+        previous = data.shift(1)
+        new_key = (data[keys] != previous[keys]).any(axis=1)
+        changed = ((data[values] != previous[values]) & ~(data[values].isna() & previous[values].isna())).any(axis=1)
+        gap = data["dateIdx"] != previous["dateIdx"] + 1
+        data["run"] = (new_key | changed | gap).cumsum()
+
+        runs = data.groupby("run", sort=False)
+        intervals = runs[keys + values].first()
+        intervals["validFrom"] = runs["validFrom"].first().fillna(runs["date"].first())
+        next_dates = np.array(list(dates) + [None], dtype=object)
+        intervals["validTo"] = next_dates[runs["dateIdx"].max().to_numpy() + 1]
+        return intervals.reset_index(drop=True)
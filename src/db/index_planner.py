@@ -0,0 +1,166 @@
+import re
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from gqlalchemy import Node
+
+from db import models
+from db.workload import WORKLOAD
+from utils import setup_custom_logger
+
+logger = setup_custom_logger(__name__)
+
+NODE_PATTERN = re.compile(r"\((\w*)\s*:\s*(\w+)\s*(?:\{([^}]*)\})?\s*\)")
+RELATIONSHIP_PATTERN = re.compile(r"\[(\w*)\s*:\s*(\w+)\s*(?:\{([^}]*)\})?\s*\]")
+PREDICATE_PATTERN = re.compile(r"\b(\w+)\.(\w+)\s*(?:=|<>|<=|>=|<|>|IN\b|STARTS WITH|ENDS WITH|CONTAINS|IS NOT NULL)", re.IGNORECASE)
+MAP_KEY_PATTERN = re.compile(r"(\w+)\s*:")
+
+
+class Index(NamedTuple):
+    """
+    A label-property index ("label") or an edge-type-property index ("edge").
+    """
+
+    kind: str
+    name: str
+    property: str
+
+    def to_cypher(self) -> str:
+        return f"{'EDGE ' if self.kind == 'edge' else ''}INDEX ON :{self.name}({self.property})"
+
+
+class IndexPlanner:
+    """
+    Plans the indexes of the graph from the models and a declared query workload.
+
+    Essential indexes are the ones the models declare with index=True: the upload looks nodes up by them, so
+    they stay in place at all times. Workload indexes are derived from the property filters of the workload
+    queries; they only speed up reads, so they are dropped during a full reload and rebuilt once it finished.
+
+    Parameters
+    ----------
+    memgraph : Memgraph
+        The database connection.
+    workload : list
+        The WorkloadQuery objects the indexes are planned for.
+
+    Methods
+    -------
+    essential_indexes()
+        Returns the indexes declared by the models.
+    query_indexes(cypher)
+        Returns the indexes a query can use.
+    workload_indexes()
+        Returns the indexes used by each workload query.
+    bulk_load()
+        Context manager dropping the non-essential indexes for the duration of a bulk load.
+    report(verify=False)
+        Returns which indexes each workload query uses.
+    """
+
+    def __init__(self, memgraph, workload=WORKLOAD):
+        self.memgraph = memgraph
+        self.workload = workload
+
+    @staticmethod
+    def essential_indexes() -> set:
+        """
+        Returns the label-property indexes declared with index=True in db/models.py.
+        """
+        indexes = set()
+        for model in vars(models).values():
+            if isinstance(model, type) and issubclass(model, Node) and model is not Node:
+                for name, model_field in model.__fields__.items():
+                    if model_field.field_info.extra.get("index") is True:
+                        indexes.add(Index("label", model.label, name))
+        return indexes
+
+    @staticmethod
+    def query_indexes(cypher) -> set:
+        """
+        Returns the indexes a query can use: one per property of a labelled node or typed relationship that is
+        matched in an inline property map or compared in a predicate.
+
+        Parameters
+        ----------
+        cypher : str
+            The Cypher query.
+        """
+        variables, indexes = {}, set()
+        for kind, pattern in [("label", NODE_PATTERN), ("edge", RELATIONSHIP_PATTERN)]:
+            for variable, name, properties in pattern.findall(cypher):
+                if variable:
+                    variables[variable] = (kind, name)
+                for key in MAP_KEY_PATTERN.findall(properties or ""):
+                    indexes.add(Index(kind, name, key))
+        for variable, key in PREDICATE_PATTERN.findall(cypher):
+            if variable in variables:
+                indexes.add(Index(*variables[variable], key))
+        return indexes
+
+    def workload_indexes(self) -> dict:
+        """
+        Returns the indexes used by each workload query, by query name.
+        """
+        return {query.name: self.query_indexes(query.cypher) for query in self.workload}
+
+    def required_indexes(self) -> set:
+        """
+        Returns the essential indexes and all indexes used by the workload.
+        """
+        return self.essential_indexes().union(*self.workload_indexes().values())
+
+    def non_essential_indexes(self) -> set:
+        return self.required_indexes() - self.essential_indexes()
+
+    def _execute_all(self, statement, indexes):
+        for index in sorted(indexes):
+            try:
+                self.memgraph.execute(f"{statement} {index.to_cypher()}")
+            except Exception as e:
+                logger.info(f"{statement} {index.to_cypher()} skipped: {e}")
+
+    def create_indexes(self):
+        """
+        Creates all required indexes, skipping the existing ones.
+        """
+        self._execute_all("CREATE", self.required_indexes())
+
+    @contextmanager
+    def bulk_load(self):
+        """
+        Drops the non-essential indexes for the duration of a bulk load, then rebuilds all required indexes.
+        """
+        logger.info(f"Dropping {len(self.non_essential_indexes())} non-essential indexes for the bulk load")
+        self._execute_all("DROP", self.non_essential_indexes())
+        try:
+            yield self
+        finally:
+            logger.info(f"Rebuilding {len(self.required_indexes())} indexes")
+            self.create_indexes()
+
+    def report(self, verify=False) -> dict:
+        """
+        Returns which indexes each workload query uses.
+
+        Parameters
+        ----------
+        verify : bool
+            If True, the plan of each query is fetched with EXPLAIN and only the indexes whose label/edge type
+            and property appear in an index scan operator of the plan are reported.
+
+        Returns
+        -------
+        dict
+            The list of used indexes (as Cypher index specifications) per query name.
+        """
+        report = {}
+        for query in self.workload:
+            indexes = self.query_indexes(query.cypher)
+            if verify:
+                plan = " ".join(str(value) for row in self.memgraph.execute_and_fetch(f"EXPLAIN {query.cypher}", query.parameters) for value in row.values())
+                scans = " ".join(re.findall(r"ScanAllBy\w*Property\w*\s*\([^)]*\)", plan))
+                indexes = {index for index in indexes if f":{index.name}" in scans and index.property in scans}
+            report[query.name] = sorted(index.to_cypher() for index in indexes)
+            logger.info(f"Workload query {query.name} uses: {', '.join(report[query.name]) or 'no index'}")
+        return report
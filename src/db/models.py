@@ -1,12 +1,8 @@
-import os
-from typing import Optional
+from typing import List, Optional
 
-from dotenv import load_dotenv
-from gqlalchemy import Field, Memgraph, Node, Relationship
+from gqlalchemy import Field, Node, Relationship
 
-load_dotenv()
-
-memgraph = Memgraph(os.getenv("QUICK_CONNECT_MG_HOST"), int(os.getenv("QUICK_CONNECT_MG_PORT")))
+from db.connection import memgraph
 
 
 class Ticker(Node):
@@ -153,11 +149,45 @@ class Ticker(Node):
     institutionsPercentHeld: Optional[float] = Field()
     institutionsFloatPercentHeld: Optional[float] = Field()
     institutionsCount: Optional[int] = Field()
+    return1M: Optional[float] = Field()
+    return3M: Optional[float] = Field()
+    return1Y: Optional[float] = Field()
+    volatility1Y: Optional[float] = Field()
+    marketCorrelation1Y: Optional[float] = Field()
+    lastPriceDate: Optional[str] = Field()
+    topInstitutionHolders: Optional[List[str]] = Field()
+    topInstitutionPctHeld: Optional[float] = Field()
+    institutionHolderCount: Optional[int] = Field()
+    topMutualFundHolders: Optional[List[str]] = Field()
+    topMutualFundPctHeld: Optional[float] = Field()
+    mutualFundHolderCount: Optional[int] = Field()
+    insiderBuyCount: Optional[int] = Field()
+    insiderSellCount: Optional[int] = Field()
+    insiderNetShares: Optional[float] = Field()
+    insiderNetValue: Optional[float] = Field()
+    latestNewsUuid: Optional[str] = Field()
+    latestNewsTitle: Optional[str] = Field()
+    latestNewsTime: Optional[str] = Field()
+    newsCount: Optional[int] = Field()
+    summaryRefreshedAt: Optional[str] = Field()
+
+
+class Sector(Node):
+    __label__ = "Sector"
+    name: str = Field(index=True, exists=True, unique=True, db=memgraph)
+    tickerCount: Optional[int] = Field()
+    totalMarketCap: Optional[float] = Field()
+    medianTrailingPE: Optional[float] = Field()
+    largestTicker: Optional[str] = Field()
+    insiderNetShares: Optional[float] = Field()
+    insiderNetValue: Optional[float] = Field()
+    refreshedAt: Optional[str] = Field()
 
 
 class InsiderHolder(Node):
     __label__ = "InsiderHolder"
-    name: str = Field(index=True, exists=True, unique=True, db=memgraph)
+    canonicalId: str = Field(index=True, exists=True, unique=True, db=memgraph)
+    name: str = Field(index=True, exists=True, db=memgraph)
     position: Optional[str] = Field()
 
 
@@ -199,6 +229,12 @@ class About_NT(Relationship):
     __dst__ = Ticker
 
 
+class In_Sector(Relationship):
+    __label__ = "IN_SECTOR"
+    __src__ = Ticker
+    __dst__ = Sector
+
+
 class Holds_IHT(Relationship):
     __label__ = "HOLDS_IHT"
     __src__ = Ticker
@@ -210,6 +246,8 @@ class Holds_IHT(Relationship):
     positionDirectDate: Optional[str] = Field()
     sharesOwnedIndirectly: Optional[str] = Field()
     positionIndirectDate: Optional[str] = Field()
+    validFrom: Optional[str] = Field()
+    validTo: Optional[str] = Field()
 
 
 class Created(Relationship):
@@ -233,6 +271,8 @@ class Holds_IT(Relationship):
     dateReported: Optional[str] = Field()
     pctHeld: Optional[float] = Field()
     value: Optional[int] = Field()
+    validFrom: Optional[str] = Field()
+    validTo: Optional[str] = Field()
 
 
 class Holds_MT(Relationship):
@@ -244,3 +284,14 @@ class Holds_MT(Relationship):
     dateReported: Optional[str] = Field()
     pctHeld: Optional[float] = Field()
     value: Optional[int] = Field()
+    validFrom: Optional[str] = Field()
+    validTo: Optional[str] = Field()
+
+
+class Co_Held(Relationship):
+    __label__ = "CO_HELD"
+    __src__ = Ticker
+    __dst__ = Ticker
+
+    weight: Optional[float] = Field()
+    sharedHolders: Optional[int] = Field()
@@ -0,0 +1,139 @@
+import pandas as pd
+
+
+class SummaryBuilder:
+    """
+    Computes the aggregates AI agents ask for most often, so they can be stored on the graph instead of being
+    recomputed from the raw holdings, insider transactions and news on every query.
+
+    Parameters
+    ----------
+    ticker_info : pd.DataFrame
+        The ticker information of the snapshot.
+    institution : pd.DataFrame
+        The institutional holders, with canonical names.
+    mutual_fund : pd.DataFrame
+        The mutual fund holders, with canonical names.
+    insider_transaction : pd.DataFrame
+        The insider transactions.
+    news : pd.DataFrame
+        The news articles.
+    top_n : int
+        The number of top holders kept per ticker.
+    refreshed_at : str
+        The refresh timestamp stored with every rollup, now by default.
+
+    Methods
+    -------
+    ticker_summaries()
+        Computes the per-ticker rollups.
+    sector_summaries(ticker_summaries)
+        Computes the per-sector rollups.
+    """
+
+    def __init__(self, ticker_info, institution, mutual_fund, insider_transaction, news, top_n=5, refreshed_at=None):
+        self.ticker_info = ticker_info
+        self.institution = institution
+        self.mutual_fund = mutual_fund
+        self.insider_transaction = insider_transaction
+        self.news = news
+        self.top_n = top_n
+        self.refreshed_at = refreshed_at or pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def _top_holders(self, holders, prefix) -> pd.DataFrame:
+        count = f"{prefix[0].lower()}{prefix[1:]}HolderCount"
+        if holders.empty:
+            return pd.DataFrame(columns=[f"top{prefix}Holders", f"top{prefix}PctHeld", count])
+        holders = holders.assign(pctHeld=pd.to_numeric(holders["pctHeld"], errors="coerce")).sort_values(["ticker", "pctHeld"], ascending=[True, False])
+        top = holders.groupby("ticker").head(self.top_n).groupby("ticker")
+        return pd.DataFrame(
+            {
+                f"top{prefix}Holders": top["name"].agg(list),
+                f"top{prefix}PctHeld": top["pctHeld"].sum(),
+                count: holders.groupby("ticker")["name"].nunique(),
+            }
+        )
+
+    def _insider_activity(self) -> pd.DataFrame:
+        columns = ["insiderBuyCount", "insiderSellCount", "insiderNetShares", "insiderNetValue"]
+        if self.insider_transaction.empty:
+            return pd.DataFrame(columns=columns)
+        transactions = self.insider_transaction
+        text = transactions["transaction_text"].fillna("").astype(str)
+        is_buy = text.str.contains("Purchase", case=False)
+        is_sell = text.str.contains("Sale", case=False)
+        direction = is_buy.astype(int) - is_sell.astype(int)
+        activity = pd.DataFrame(
+            {
+                "ticker": transactions["ticker"],
+                "insiderBuyCount": is_buy.astype(int),
+                "insiderSellCount": is_sell.astype(int),
+                "insiderNetShares": direction * pd.to_numeric(transactions["shares"], errors="coerce").fillna(0),
+                "insiderNetValue": direction * pd.to_numeric(transactions["value"], errors="coerce").fillna(0),
+            }
+        )
+        return activity.groupby("ticker")[columns].sum()
+
+    def _latest_news(self) -> pd.DataFrame:
+        if self.news.empty:
+            return pd.DataFrame(columns=["latestNewsUuid", "latestNewsTitle", "latestNewsTime", "newsCount"])
+        news = self.news.dropna(subset=["uuid"])
+        # whole rows, groupby().last() would combine the last non-null value of each column across articles
+        latest = news.dropna(subset=["providerPublishTime"]).sort_values("providerPublishTime", kind="stable").drop_duplicates("ticker", keep="last").set_index("ticker")
+        return pd.DataFrame(
+            {
+                "latestNewsUuid": latest["uuid"],
+                "latestNewsTitle": latest["title"],
+                "latestNewsTime": latest["providerPublishTime"],
+                "newsCount": news.groupby("ticker")["uuid"].nunique(),
+            }
+        )
+
+    def ticker_summaries(self) -> pd.DataFrame:
+        """
+        Computes the per-ticker rollups: top institutional and mutual fund holders, net insider buying and the
+        latest news.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per ticker with a ticker column and summaryRefreshedAt.
+        """
+        tickers = pd.Index(self.ticker_info["ticker"].dropna().unique(), name="ticker")
+        summaries = pd.concat([self._top_holders(self.institution, "Institution"), self._top_holders(self.mutual_fund, "MutualFund"), self._insider_activity(), self._latest_news()], axis=1).reindex(tickers)
+        summaries["summaryRefreshedAt"] = self.refreshed_at
+        return summaries.reset_index()
+
+    def sector_summaries(self, ticker_summaries) -> pd.DataFrame:
+        """
+        Computes the per-sector rollups: ticker count, market cap totals, median valuation and net insider buying.
+
+        Parameters
+        ----------
+        ticker_summaries : pd.DataFrame
+            The result of ticker_summaries.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per sector with a name column and refreshedAt.
+        """
+        if "sector" not in self.ticker_info:
+            return pd.DataFrame(columns=["name", "refreshedAt"])
+        info = self.ticker_info.drop_duplicates("ticker").merge(ticker_summaries[["ticker", "insiderNetShares", "insiderNetValue"]], on="ticker", how="left")
+        info = info[info["sector"].astype(str).str.strip() != ""].dropna(subset=["sector"])
+        for column in ["marketCap", "trailingPE"]:
+            info[column] = pd.to_numeric(info[column], errors="coerce") if column in info else float("nan")
+        sectors = info.groupby("sector")
+        summaries = pd.DataFrame(
+            {
+                "tickerCount": sectors["ticker"].nunique(),
+                "totalMarketCap": sectors["marketCap"].sum(),
+                "medianTrailingPE": sectors["trailingPE"].median(),
+                "largestTicker": info.loc[info["marketCap"].fillna(-1).groupby(info["sector"]).idxmax(), ["sector", "ticker"]].set_index("sector")["ticker"],
+                "insiderNetShares": sectors["insiderNetShares"].sum(),
+                "insiderNetValue": sectors["insiderNetValue"].sum(),
+            }
+        )
+        summaries["refreshedAt"] = self.refreshed_at
+        return summaries.rename_axis("name").reset_index()
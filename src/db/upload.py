@@ -1,17 +1,18 @@
-import os
-
 import numpy as np
 import pandas as pd
-from dotenv import load_dotenv
-from gqlalchemy import Memgraph
 
-from db.models import About_NT, Created, Holds_IHT, Holds_IT, Holds_MT, InsiderHolder, InsiderTransaction, Institution, Involves, MutualFund, News, Ticker
+from db.connection import memgraph
+from db.history import HoldingsHistory
+from db.index_planner import IndexPlanner
+from db.models import Created, Holds_IHT, Holds_IT, Holds_MT, InsiderHolder, InsiderTransaction, Institution, Involves, MutualFund, News, Ticker
+from db.summary import SummaryBuilder
+from entity_resolution import HolderNameResolver, InsiderNameResolver
+from metrics import metrics
+from news_index import SeenNewsIndex
 from utils import DATA_DIR, setup_custom_logger
 
 logger = setup_custom_logger(__name__)
 
-load_dotenv()
-
 
 class DataUploader:
 
@@ -22,28 +23,96 @@ class DataUploader:
     ----------
     data_path : str
         The path to the data directory.
+    load_history : bool
+        If True, the holding relationships are loaded from the holdings history as validFrom/validTo intervals
+        instead of from the latest snapshot only.
 
     Attributes
     ----------
     file_path : Path
         The path to the data file.
-    memgraph : Memgraph
-        The Memgraph object.
+    memgraph : LazyMemgraph
+        The shared Memgraph connection, opened on the first query.
+    load_history : bool
+        Whether the holding relationships are loaded from the holdings history.
+    insider_resolver : InsiderNameResolver
+        Maps insider name variants to the canonical id the InsiderHolder nodes are merged on.
+    holder_resolver : HolderNameResolver
+        Maps institution and mutual fund name variants to the canonical name the nodes are merged on.
+    index_planner : IndexPlanner
+        Keeps the indexes required by the models and the query workload in place around the uploads.
+    seen_news : SeenNewsIndex
+        The news articles and links already loaded, so only new ones are written.
     """
 
-    def __init__(self, data_path=pd.Timestamp.now().strftime("%Y-%m-%d")):
+    HISTORY_QUERIES = {
+        "HOLDS_IT": """
+            UNWIND $rows AS row
+            MATCH (t:Ticker {ticker: row.ticker})
+            MERGE (h:Institution {name: row.name})
+            CREATE (h)-[:HOLDS_IT {shares: row.shares, dateReported: row.dateReported, pctHeld: row.pctHeld, value: row.value, validFrom: row.validFrom, validTo: row.validTo}]->(t)
+        """,
+        "HOLDS_MT": """
+            UNWIND $rows AS row
+            MATCH (t:Ticker {ticker: row.ticker})
+            MERGE (h:MutualFund {name: row.name})
+            CREATE (h)-[:HOLDS_MT {shares: row.shares, dateReported: row.dateReported, pctHeld: row.pctHeld, value: row.value, validFrom: row.validFrom, validTo: row.validTo}]->(t)
+        """,
+        "HOLDS_IHT": """
+            UNWIND $rows AS row
+            MATCH (t:Ticker {ticker: row.ticker})
+            MERGE (h:InsiderHolder {canonicalId: row.canonicalId})
+            ON CREATE SET h.name = row.canonicalName
+            CREATE (t)-[:HOLDS_IHT {
+                mostRecentTransaction: row.mostRecentTransaction, latestTransactionDate: row.latestTransactionDate,
+                sharesOwnedDirectly: row.sharesOwnedDirectly, positionDirectDate: row.positionDirectDate,
+                sharesOwnedIndirectly: row.sharesOwnedIndirectly, positionIndirectDate: row.positionIndirectDate,
+                validFrom: row.validFrom, validTo: row.validTo
+            }]->(h)
+        """,
+    }
+
+    def __init__(self, data_path=pd.Timestamp.now().strftime("%Y-%m-%d"), load_history=False):
+        self.load_history = load_history
         self.file_path = DATA_DIR / f"data_{data_path}"
         if not self.file_path.exists():
             logger.error(f"Data directory {self.file_path} does not exist")
             raise FileNotFoundError(f"Data directory {self.file_path} does not exist")
-        self.memgraph = Memgraph(os.getenv("QUICK_CONNECT_MG_HOST"), int(os.getenv("QUICK_CONNECT_MG_PORT")))
+        # opened, and the model schema created, on the first query
+        self.memgraph = memgraph
+        self.insider_resolver = InsiderNameResolver()
+        self.holder_resolver = HolderNameResolver()
+        self.index_planner = IndexPlanner(self.memgraph)
+        self.seen_news = SeenNewsIndex()
 
-    def delete_all_data(self):
+    def delete_all_data(self, keep_news=False):
         logger.info("Deleting all data from the database")
-        self.memgraph.execute("MATCH (n) DETACH DELETE n")
+        if keep_news:
+            self.memgraph.execute("MATCH (n) WHERE NOT n:News DETACH DELETE n")
+        else:
+            self.memgraph.execute("MATCH (n) DETACH DELETE n")
+
+    def _bulk_execute(self, query, rows, batch_size=5000):
+        """
+        Executes an UNWIND query over the given rows in batches.
 
-    def upload_ticker_data(self):
-        data = pd.read_csv(self.file_path / "ticker_info.csv").replace({np.nan: None})
+        Parameters
+        ----------
+        query : str
+            The Cypher query, reading the batch from the $rows parameter.
+        rows : list
+            The list of dictionaries to pass to the query.
+        batch_size : int
+            The number of rows sent per query.
+        """
+        for start in range(0, len(rows), batch_size):
+            self.memgraph.execute(query, {"rows": rows[start : start + batch_size]})
+        metrics.add_rows(len(rows))
+
+    @metrics.timed()
+    def upload_ticker_data(self, data=None):
+        data = (self._read_snapshot_file("ticker_info.csv") if data is None else data).replace({np.nan: None})
+        metrics.add_rows(len(data))
         for _, row in data.iterrows():
             try:
                 ticker = Ticker(**row.to_dict())
@@ -52,8 +121,42 @@ class DataUploader:
                 logger.error(f"Error uploading ticker {row['ticker']}: {e}")
         logger.info("Uploaded ticker data")
 
-    def upload_insider_holder_data(self):
-        data = pd.read_csv(self.file_path / "insider_holder.csv")
+    def _resolve_insider_names(self, data):
+        """
+        Replaces the raw insider names with their canonical names and adds the canonicalId column.
+        """
+        if data.empty:
+            return data
+        mapping = self.insider_resolver.resolve(data["name"]).set_index("name")
+        data["canonicalId"] = data["name"].map(mapping["canonicalId"])
+        data["canonicalName"] = data["name"].map(mapping["canonicalName"])
+        data["name"] = data["canonicalName"]
+        return data
+
+    def _resolve_holder_names(self, data):
+        """
+        Replaces the raw institution and mutual fund names with their canonical names.
+        """
+        if data.empty:
+            return data
+        mapping = self.holder_resolver.resolve(data["name"]).set_index("name")
+        data["name"] = data["name"].map(mapping["canonicalName"])
+        return data
+
+    @metrics.timed()
+    def upload_price_metrics_data(self):
+        metrics_file = self.file_path / "price_metrics.csv"
+        if not metrics_file.exists():
+            logger.info("No price metrics to upload")
+            return
+        rows = pd.read_csv(metrics_file).replace({np.nan: None}).to_dict("records")
+        self._bulk_execute("UNWIND $rows AS row MATCH (t:Ticker {ticker: row.ticker}) SET t += row", rows)
+        logger.info("Uploaded price metrics data")
+
+    @metrics.timed()
+    def upload_insider_holder_data(self, data=None):
+        data = self._resolve_insider_names(self._read_snapshot_file("insider_holder.csv") if data is None else data)
+        metrics.add_rows(len(data))
         for _, row in data.iterrows():
             try:
                 insider_holder = InsiderHolder(**row.to_dict())
@@ -61,6 +164,9 @@ class DataUploader:
             except Exception as e:
                 logger.error(f"Error uploading insider holder {row['name']}: {e}")
 
+            if self.load_history:
+                continue
+
             try:
                 ticker = Ticker(ticker=row["ticker"]).load(self.memgraph)
                 relationship = Holds_IHT(_start_node_id=ticker._id, _end_node_id=insider_holder._id, **row.to_dict())
@@ -69,8 +175,10 @@ class DataUploader:
                 logger.error(f"Error creating relationship between {row['ticker']} and {row['name']}: {e}")
         logger.info("Uploaded insider holder data")
 
-    def upload_insider_transaction_data(self):
-        data = pd.read_csv(self.file_path / "insider_transaction.csv")
+    @metrics.timed()
+    def upload_insider_transaction_data(self, data=None):
+        data = self._resolve_insider_names(self._read_snapshot_file("insider_transaction.csv") if data is None else data)
+        metrics.add_rows(len(data))
         for _, row in data.iterrows():
             try:
                 insider = InsiderHolder(**row.to_dict())
@@ -99,8 +207,10 @@ class DataUploader:
 
         logger.info("Uploaded insider transaction data")
 
-    def upload_institution_data(self):
-        data = pd.read_csv(self.file_path / "institution.csv")
+    @metrics.timed()
+    def upload_institution_data(self, data=None):
+        data = self._resolve_holder_names(self._read_snapshot_file("institution.csv") if data is None else data)
+        metrics.add_rows(len(data))
         for _, row in data.iterrows():
             try:
                 institution = Institution(**row.to_dict())
@@ -108,6 +218,9 @@ class DataUploader:
             except Exception as e:
                 logger.error(f"Error uploading institution {row['name']}: {e}")
 
+            if self.load_history:
+                continue
+
             try:
                 ticker = Ticker(ticker=row["ticker"]).load(self.memgraph)
                 relationship = Holds_IT(_start_node_id=institution._id, _end_node_id=ticker._id, shares=row["shares"])
@@ -117,8 +230,10 @@ class DataUploader:
 
         logger.info("Uploaded institution data")
 
-    def upload_mutual_fund_data(self):
-        data = pd.read_csv(self.file_path / "mutual_fund.csv")
+    @metrics.timed()
+    def upload_mutual_fund_data(self, data=None):
+        data = self._resolve_holder_names(self._read_snapshot_file("mutual_fund.csv") if data is None else data)
+        metrics.add_rows(len(data))
         for _, row in data.iterrows():
             try:
                 mutual_fund = MutualFund(**row.to_dict())
@@ -126,6 +241,9 @@ class DataUploader:
             except Exception as e:
                 logger.error(f"Error uploading mutual fund {row['name']}: {e}")
 
+            if self.load_history:
+                continue
+
             try:
                 ticker = Ticker(ticker=row["ticker"]).load(self.memgraph)
                 relationship = Holds_MT(_start_node_id=mutual_fund._id, _end_node_id=ticker._id, shares=row["shares"])
@@ -135,41 +253,183 @@ class DataUploader:
 
         logger.info("Uploaded mutual fund data")
 
-    def upload_news_data(self):
-        data = pd.read_csv(self.file_path / "news.csv")
-        for _, row in data.iterrows():
-            try:
-                news = News(**row.to_dict())
-                news.save(self.memgraph)
-            except Exception as e:
-                logger.error(f"Error creating news {row['title']}: {e}")
+    @metrics.timed()
+    def evict_news(self):
+        """
+        Evicts the old articles from the seen-news index and deletes them from the graph.
+        """
+        evicted = self.seen_news.evict()
+        if evicted:
+            self._bulk_execute("UNWIND $rows AS uuid MATCH (n:News {uuid: uuid}) DETACH DELETE n", evicted)
 
-            try:
-                ticker = Ticker(ticker=row["ticker"]).load(self.memgraph)
-                relationship = About_NT(_start_node_id=news._id, _end_node_id=ticker._id)
-                relationship.save(self.memgraph)
-            except Exception as e:
-                logger.error(f"Error creating relationship between {row['title']} and {row['name']}: {e}")
+    def upload_news_data(self, data=None, update_index=True):
+        """
+        Uploads the news articles and ABOUT_NT links missing from the seen-news index and records them in it.
+        Articles evicted from the index are deleted from the graph.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The news to upload, news.csv of the snapshot by default.
+        update_index : bool
+            Whether the index is evicted before and saved after the upload. A pipelined run uploading the news
+            in batches does both once, with evict_news and SeenNewsIndex.save.
+        """
+        if update_index:
+            self.evict_news()
+
+        data = self._read_snapshot_file("news.csv") if data is None else data
+        if not data.empty:
+            data = self.seen_news.new_links(data.dropna(subset=["uuid", "ticker"]))
+            # link-only rows of articles evicted since they were parsed have nothing to link to
+            data = data[data["title"].notna() | data["uuid"].map(self.seen_news.is_seen).astype(bool)]
+        if data.empty:
+            logger.info("No new news to upload")
+            if update_index:
+                self.seen_news.save()
+            return
+        articles = data[~data["uuid"].map(self.seen_news.is_seen)].dropna(subset=["title"]).drop_duplicates("uuid")
+        rows = articles[[field for field in News.__fields__ if field in articles]].replace({np.nan: None}).to_dict("records")
+        self._bulk_execute("UNWIND $rows AS row MERGE (n:News {uuid: row.uuid}) ON CREATE SET n += row", rows)
+        links = data[["uuid", "ticker"]].to_dict("records")
+        self._bulk_execute("UNWIND $rows AS row MATCH (n:News {uuid: row.uuid}), (t:Ticker {ticker: row.ticker}) MERGE (n)-[:ABOUT_NT]->(t)", links)
+        self.seen_news.add(data)
+        if update_index:
+            self.seen_news.save()
+        logger.info(f"Uploaded {len(rows)} new news articles and {len(links)} new news links")
+
+    @metrics.timed()
+    def relink_news(self):
+        """
+        Restores the News nodes and ABOUT_NT links of all articles in the seen-news index: the articles missing
+        from the graph, e.g. after Memgraph restarted with an empty graph, are recreated from their stored fields,
+        and the links are restored after the Ticker nodes were recreated by a full reupload. Existing nodes and
+        links are kept, so it can run after new news were uploaded.
+        """
+        in_graph = {row["uuid"] for row in self.memgraph.execute_and_fetch("MATCH (n:News) RETURN n.uuid AS uuid")}
+        missing = self.seen_news.article_rows(set(self.seen_news.links["uuid"]) - in_graph)
+        if not missing.empty:
+            rows = missing[[field for field in News.__fields__ if field in missing]].replace({np.nan: None}).to_dict("records")
+            self._bulk_execute("UNWIND $rows AS row MERGE (n:News {uuid: row.uuid}) ON CREATE SET n += row", rows)
+            logger.info(f"Recreated {len(rows)} indexed news articles missing from the graph")
+        rows = self.seen_news.links[["uuid", "ticker"]].to_dict("records")
+        self._bulk_execute("UNWIND $rows AS row MATCH (n:News {uuid: row.uuid}), (t:Ticker {ticker: row.ticker}) MERGE (n)-[:ABOUT_NT]->(t)", rows)
+        logger.info(f"Relinked {len(rows)} indexed news articles")
+
+    @metrics.timed()
+    def upload_holdings_history(self):
+        """
+        Replaces the holding relationships with the validFrom/validTo intervals of the holdings history.
+        The history is first extended with any new snapshots, then bulk loaded from the precomputed intervals.
+        Current holdings are the relationships with validTo IS NULL.
+        """
+        history = HoldingsHistory()
+        history.update()
+        for relationship, query in self.HISTORY_QUERIES.items():
+            self.memgraph.execute(f"MATCH ()-[r:{relationship}]->() DELETE r")
+            intervals = history.load_intervals(relationship)
+            if relationship == "HOLDS_IHT":
+                intervals = self._resolve_insider_names(intervals)
+            else:
+                intervals = self._resolve_holder_names(intervals)
+            rows = intervals.replace({np.nan: None}).to_dict("records")
+            self._bulk_execute(query, rows)
+            logger.info(f"Uploaded {len(rows)} {relationship} history intervals")
+
+    @metrics.timed()
+    def upload_co_held_data(self):
+        co_held_file = self.file_path / "co_held.csv"
+        if not co_held_file.exists():
+            logger.info("No co-held data to upload")
+            return
+        self.memgraph.execute("MATCH ()-[r:CO_HELD]->() DELETE r")
+        rows = pd.read_csv(co_held_file).replace({np.nan: None}).to_dict("records")
+        self._bulk_execute(
+            """
+            UNWIND $rows AS row
+            MATCH (a:Ticker {ticker: row.source}), (b:Ticker {ticker: row.target})
+            CREATE (a)-[:CO_HELD {weight: row.weight, sharedHolders: row.sharedHolders}]->(b)
+            """,
+            rows,
+        )
+        logger.info("Uploaded co-held data")
+
+    def _read_snapshot_file(self, file_name):
+        try:
+            return pd.read_csv(self.file_path / file_name)
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            return pd.DataFrame([])
+
+    @metrics.timed()
+    def upload_summary_data(self):
+        """
+        Materializes the per-ticker and per-sector rollups (top holders, net insider buying, latest news, sector
+        totals) computed from the snapshot and the news in the graph, each with its refresh timestamp.
+        """
+        summary = SummaryBuilder(
+            ticker_info=self._read_snapshot_file("ticker_info.csv"),
+            institution=self._resolve_holder_names(self._read_snapshot_file("institution.csv")),
+            mutual_fund=self._resolve_holder_names(self._read_snapshot_file("mutual_fund.csv")),
+            insider_transaction=self._read_snapshot_file("insider_transaction.csv"),
+            # news.csv only holds the articles of today's feeds, all retained ones are read back from the graph
+            news=pd.DataFrame(
+                list(self.memgraph.execute_and_fetch("MATCH (n:News)-[:ABOUT_NT]->(t:Ticker) RETURN t.ticker AS ticker, n.uuid AS uuid, n.title AS title, n.providerPublishTime AS providerPublishTime")),
+                columns=["ticker", "uuid", "title", "providerPublishTime"],
+            ),
+        )
+        if summary.ticker_info.empty:
+            logger.info("No ticker data to summarize")
+            return
+        ticker_summaries = summary.ticker_summaries()
+        rows = ticker_summaries.astype(object).where(ticker_summaries.notna(), None).to_dict("records")
+        self._bulk_execute("UNWIND $rows AS row MATCH (t:Ticker {ticker: row.ticker}) SET t += row", rows)
+
+        self.memgraph.execute("MATCH (s:Sector) DETACH DELETE s")
+        sector_summaries = summary.sector_summaries(ticker_summaries)
+        rows = sector_summaries.astype(object).where(sector_summaries.notna(), None).to_dict("records")
+        self._bulk_execute("UNWIND $rows AS row CREATE (s:Sector) SET s = row WITH s MATCH (t:Ticker {sector: s.name}) CREATE (t)-[:IN_SECTOR]->(s)", rows)
+        logger.info(f"Uploaded summaries for {len(ticker_summaries)} tickers and {len(sector_summaries)} sectors")
+
+    def upload_snapshot_data(self, ticker_info=None, insider_holder=None, mutual_fund=None, institution=None, insider_transaction=None, news=None, update_news_index=True):
+        """
+        Uploads the per-ticker datasets, read from the snapshot unless given, e.g. by a pipelined run uploading
+        the tickers downloaded so far. See upload_news_data for update_news_index.
+        """
+        self.upload_ticker_data(ticker_info)
+        self.upload_insider_holder_data(insider_holder)
+        self.upload_insider_transaction_data(insider_transaction)
+        self.upload_institution_data(institution)
+        self.upload_mutual_fund_data(mutual_fund)
+        self.upload_news_data(news, update_index=update_news_index)
+
+    def upload_derived_data(self):
+        """
+        Uploads the data computed from the complete snapshot: price metrics, holdings history, co-held tickers
+        and the summaries.
+        """
+        self.upload_price_metrics_data()
+        if self.load_history:
+            self.upload_holdings_history()
+        self.upload_co_held_data()
+        self.upload_summary_data()
 
     def reupload_all_data(self):
         logger.info("Reuploading all data")
-        self.delete_all_data()
-        self.upload_ticker_data()
-        self.upload_insider_holder_data()
-        self.upload_insider_transaction_data()
-        self.upload_institution_data()
-        self.upload_mutual_fund_data()
-        self.upload_news_data()
+        with self.index_planner.bulk_load():
+            # the news already loaded are kept, their links to the recreated tickers are restored from the seen-news index
+            self.delete_all_data(keep_news=True)
+            self.upload_snapshot_data()
+            self.relink_news()
+            self.upload_derived_data()
+        self.index_planner.report()
         logger.info("Finished reuploading all data")
 
     def upload_all_data(self):
         logger.info("Uploading all data")
-        self.upload_ticker_data()
-        self.upload_insider_holder_data()
-        self.upload_insider_transaction_data()
-        self.upload_institution_data()
-        self.upload_mutual_fund_data()
-        self.upload_news_data()
+        self.upload_snapshot_data()
+        self.relink_news()
+        self.upload_derived_data()
+        self.index_planner.create_indexes()
         logger.info("Finished uploading all data")
 
 
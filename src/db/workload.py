@@ -0,0 +1,108 @@
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class WorkloadQuery:
+    """
+    A representative Cypher query run against the graph by the MCP agents and Lab users.
+
+    Attributes
+    ----------
+    name : str
+        The name of the query.
+    cypher : str
+        The parameterized Cypher query.
+    parameters : dict
+        Example parameter values.
+    """
+
+    name: str
+    cypher: str
+    parameters: dict = field(default_factory=dict)
+
+
+# bump whenever a query is added, removed or changed, so benchmark reports are only compared on the same workload
+WORKLOAD_VERSION = 1
+
+WORKLOAD = [
+    WorkloadQuery(
+        "holders_of_ticker",
+        "MATCH (i:Institution)-[r:HOLDS_IT]->(t:Ticker {ticker: $ticker}) RETURN i.name, r.shares, r.pctHeld ORDER BY r.pctHeld DESC LIMIT 20",
+        {"ticker": "AAPL"},
+    ),
+    WorkloadQuery(
+        "fund_holders_of_ticker",
+        "MATCH (m:MutualFund)-[r:HOLDS_MT]->(t:Ticker {ticker: $ticker}) RETURN m.name, r.shares, r.pctHeld ORDER BY r.pctHeld DESC LIMIT 20",
+        {"ticker": "AAPL"},
+    ),
+    WorkloadQuery(
+        "institution_portfolio",
+        "MATCH (i:Institution {name: $institution})-[r:HOLDS_IT]->(t:Ticker) RETURN t.ticker, r.pctHeld ORDER BY r.pctHeld DESC LIMIT 50",
+        {"institution": "Vanguard Group Inc"},
+    ),
+    WorkloadQuery(
+        "holdings_reported_since",
+        "MATCH (i:Institution)-[r:HOLDS_IT]->(t:Ticker) WHERE r.dateReported >= $since RETURN i.name, t.ticker, r.dateReported LIMIT 100",
+        {"since": "2025-01-01"},
+    ),
+    WorkloadQuery(
+        "holding_as_of_date",
+        "MATCH (i:Institution)-[r:HOLDS_IT]->(t:Ticker {ticker: $ticker}) WHERE r.validFrom <= $date AND (r.validTo IS NULL OR r.validTo > $date) RETURN i.name, r.shares",
+        {"ticker": "AAPL", "date": "2025-01-02"},
+    ),
+    WorkloadQuery(
+        "fund_holding_as_of_date",
+        "MATCH (m:MutualFund)-[r:HOLDS_MT]->(t:Ticker {ticker: $ticker}) WHERE r.validFrom <= $date AND (r.validTo IS NULL OR r.validTo > $date) RETURN m.name, r.shares",
+        {"ticker": "AAPL", "date": "2025-01-02"},
+    ),
+    WorkloadQuery(
+        "insider_position_as_of_date",
+        "MATCH (t:Ticker {ticker: $ticker})-[r:HOLDS_IHT]->(h:InsiderHolder) WHERE r.validFrom <= $date AND (r.validTo IS NULL OR r.validTo > $date) RETURN h.name, r.sharesOwnedDirectly",
+        {"ticker": "AAPL", "date": "2025-01-02"},
+    ),
+    WorkloadQuery(
+        "insider_activity_by_date_range",
+        "MATCH (h:InsiderHolder)-[:CREATED]->(x:InsiderTransaction)-[:INVOLVES]->(t:Ticker) WHERE x.startDate >= $start AND x.startDate < $end RETURN t.ticker, h.name, x.transaction_text, x.shares LIMIT 100",
+        {"start": "2025-01-01", "end": "2025-04-01"},
+    ),
+    WorkloadQuery(
+        "insider_activity_of_ticker",
+        "MATCH (h:InsiderHolder)-[:CREATED]->(x:InsiderTransaction)-[:INVOLVES]->(t:Ticker {ticker: $ticker}) RETURN h.name, x.transaction_text, x.shares, x.startDate ORDER BY x.startDate DESC LIMIT 20",
+        {"ticker": "AAPL"},
+    ),
+    WorkloadQuery(
+        "tickers_in_sector",
+        "MATCH (t:Ticker) WHERE t.sector = $sector RETURN t.ticker, t.marketCap ORDER BY t.marketCap DESC LIMIT 20",
+        {"sector": "Technology"},
+    ),
+    WorkloadQuery(
+        "tickers_in_industry",
+        "MATCH (t:Ticker) WHERE t.industry = $industry RETURN t.ticker, t.trailingPE LIMIT 50",
+        {"industry": "Semiconductors"},
+    ),
+    WorkloadQuery(
+        "news_for_sector",
+        "MATCH (n:News)-[:ABOUT_NT]->(t:Ticker) WHERE t.sector = $sector AND n.providerPublishTime >= $since RETURN t.ticker, n.title, n.providerPublishTime ORDER BY n.providerPublishTime DESC LIMIT 20",
+        {"sector": "Technology", "since": "2025-01-01 00:00:00"},
+    ),
+    WorkloadQuery(
+        "latest_news",
+        "MATCH (n:News) WHERE n.providerPublishTime >= $since RETURN n.title, n.publisher ORDER BY n.providerPublishTime DESC LIMIT 20",
+        {"since": "2025-01-01 00:00:00"},
+    ),
+    WorkloadQuery(
+        "co_held_tickers",
+        "MATCH (:Ticker {ticker: $ticker})-[r:CO_HELD]-(t:Ticker) RETURN t.ticker, r.weight, r.sharedHolders ORDER BY r.weight DESC LIMIT 10",
+        {"ticker": "AAPL"},
+    ),
+    WorkloadQuery(
+        "ticker_summary",
+        "MATCH (t:Ticker {ticker: $ticker}) RETURN t.topInstitutionHolders, t.insiderNetShares, t.latestNewsTitle, t.summaryRefreshedAt",
+        {"ticker": "AAPL"},
+    ),
+    WorkloadQuery(
+        "sector_summary",
+        "MATCH (s:Sector {name: $sector}) RETURN s.tickerCount, s.totalMarketCap, s.medianTrailingPE, s.refreshedAt",
+        {"sector": "Technology"},
+    ),
+]
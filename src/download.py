@@ -1,12 +1,19 @@
 import asyncio
+import time
 
 import pandas as pd
 
+from metrics import metrics
+from news_index import SeenNewsIndex
 from ticker_handler import TickerHandler
 from utils import DATA_DIR, setup_custom_logger
 
 logger = setup_custom_logger(__name__)
 
+# the raw news items are parsed in batches of at least this many, a chunk of a few tickers holds too few items
+# to pay off the fixed cost of a columnar parse, see news_parsing_benchmark.py
+NEWS_PARSE_BATCH = 1000
+
 
 class AsyncDataDownloader:
 
@@ -17,11 +24,19 @@ class AsyncDataDownloader:
     ----------
     tickers : list
         The list of tickers to download data for.
+    seen_news : SeenNewsIndex
+        The index of the news already loaded, whose articles are not parsed again.
+    data_path : Path
+        The directory the data is saved to, the snapshot directory of the current date by default.
 
     Attributes
     ----------
     tickers : list
         The list of tickers to download data for.
+    seen_news : SeenNewsIndex
+        The index of the news already loaded.
+    data_path : Path
+        The directory the data is saved to, None for the snapshot directory of the current date.
 
     Methods
     -------
@@ -31,12 +46,14 @@ class AsyncDataDownloader:
         Saves the data to the given file path.
     download_all_data()
         Downloads all data for the tickers.
-    download_data_by_chunks(chunk_size=10, sleep_time=5)
-        Downloads data for the tickers by chunks.
+    download_data_by_chunks(chunk_size=4, sleep_time=2.5, chunk_queue=None)
+        Downloads data for the tickers by chunks, optionally handing each finished chunk to a consumer.
     """
 
-    def __init__(self, tickers):
+    def __init__(self, tickers, seen_news=None, data_path=None):
         self.tickers = tickers
+        self.seen_news = seen_news if seen_news is not None else SeenNewsIndex()
+        self.data_path = data_path
 
     async def get_data(self, ticker):
         """
@@ -50,21 +67,26 @@ class AsyncDataDownloader:
         Returns
         -------
         tuple
-            A tuple containing the dataframes for ticker info, insider holder, mutual fund, institution, and insider transaction.
+            A tuple containing the dataframes for ticker info, insider holder, mutual fund, institution, and insider transaction,
+            and the raw news items, which are parsed in batches of NEWS_PARSE_BATCH items.
         """
 
         logger.info(f"Getting data for ticker {ticker}")
+        start = time.perf_counter()
         ticker_handler = TickerHandler(ticker)
-        if not ticker_handler.is_valid_ticker():
+        if not self._fetch("info", ticker_handler.is_valid_ticker):
             logger.info(f"Valid ticker {ticker}")
-            return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-
-        ticker_info = ticker_handler.prepare_ticker_info()
-        insider_holder = ticker_handler.prepare_insider_roster_holders()
-        mutual_fund = ticker_handler.prepare_mutualfund_holders()
-        institution = ticker_handler.prepare_institutional_holders()
-        insider_transaction = ticker_handler.prepare_insider_transactions()
-        news = ticker_handler.prepare_news()
+            return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), []
+
+        ticker_info = self._fetch("ticker_info", ticker_handler.prepare_ticker_info)
+        insider_holder = self._fetch("insider_holder", ticker_handler.prepare_insider_roster_holders)
+        mutual_fund = self._fetch("mutual_fund", ticker_handler.prepare_mutualfund_holders)
+        institution = self._fetch("institution", ticker_handler.prepare_institutional_holders)
+        insider_transaction = self._fetch("insider_transaction", ticker_handler.prepare_insider_transactions)
+        news = self._fetch("news", ticker_handler.prepare_news_items, self.seen_news)
+        elapsed = time.perf_counter() - start
+        metrics.observe("ticker_fetch_seconds", elapsed)
+        metrics.sample("ticker_fetch_seconds", ticker, round(elapsed, 3))
 
         # add ticker to the data
         ticker_info["ticker"] = ticker
@@ -72,19 +94,31 @@ class AsyncDataDownloader:
         mutual_fund["ticker"] = ticker
         institution["ticker"] = ticker
         insider_transaction["ticker"] = ticker
-        news["ticker"] = ticker
 
         return ticker_info, insider_holder, mutual_fund, institution, insider_transaction, news
 
+    @staticmethod
+    def _fetch(dataset, function, *args):
+        """
+        Calls the fetch function and records its latency in the fetch_seconds histogram of the dataset.
+        """
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            metrics.observe("fetch_seconds", time.perf_counter() - start, dataset=dataset)
+
     async def save_data(self, data, file_name):
         """
-        Saves the data to the given file path. The file path is created based on the current date.
+        Saves the data to the given file path. The file path is created based on the current date unless data_path is set.
         """
         current_date = pd.Timestamp.now().strftime("%Y-%m-%d")
-        file_path = DATA_DIR / f"data_{current_date}" / file_name
+        file_path = (self.data_path or DATA_DIR / f"data_{current_date}") / file_name
         if not file_path.parent.exists():
             file_path.parent.mkdir(parents=True)
-        data.to_csv(file_path, index=False)
+        with metrics.timer(f"write_{file_name}"):
+            data.to_csv(file_path, index=False)
+            metrics.add_rows(len(data))
         logger.info(f"Saved data to {file_path}")
 
     async def download_all_data(self):
@@ -105,7 +139,7 @@ class AsyncDataDownloader:
         all_mutual_fund = pd.concat([data[2] for data in all_data])
         all_institution = pd.concat([data[3] for data in all_data])
         all_insider_trade = pd.concat([data[4] for data in all_data])
-        all_news = pd.concat([data[5] for data in all_data])
+        all_news = self.seen_news.complete(TickerHandler.parse_news([item for data in all_data for item in data[5]]))
 
         # save all dataframes
         await self.save_data(all_ticker_info, "ticker_info.csv")
@@ -115,7 +149,7 @@ class AsyncDataDownloader:
         await self.save_data(all_insider_trade, "insider_transaction.csv")
         await self.save_data(all_news, "news.csv")
 
-    async def download_data_by_chunks(self, chunk_size=4, sleep_time=2.5):
+    async def download_data_by_chunks(self, chunk_size=4, sleep_time=2.5, chunk_queue=None):
 
         """
         Downloads data for the tickers by chunks.
@@ -126,6 +160,11 @@ class AsyncDataDownloader:
             The size of each chunk.
         sleep_time : int
             The time to sleep between each chunk.
+        chunk_queue : asyncio.Queue
+            If given, every finished chunk is put on the queue as a (ticker info, insider holder, mutual fund,
+            institution, insider transaction, news) tuple, followed by None once all chunks are downloaded.
+            The news are those of the parse batch the chunk completed, empty for the other chunks.
+            A bounded queue pauses the download while the consumer is behind. The snapshot is saved as usual.
         """
 
         logger.info(f"Downloading data for the tickers by chunks with chunk size {chunk_size} and sleep time {sleep_time}")
@@ -138,7 +177,8 @@ class AsyncDataDownloader:
         all_insider_transaction = []
         all_news = []
 
-        for chunk in chunks:
+        news_items = []
+        for chunk_index, chunk in enumerate(chunks):
             tasks = []
             for ticker in chunk:
                 tasks.append(self.get_data(ticker))
@@ -150,18 +190,32 @@ class AsyncDataDownloader:
             all_mutual_fund.append(pd.concat([data[2] for data in data_chunk]))
             all_institution.append(pd.concat([data[3] for data in data_chunk]))
             all_insider_transaction.append(pd.concat([data[4] for data in data_chunk]))
-            all_news.append(pd.concat([data[5] for data in data_chunk]))
+            # parsed in batches, so at most a batch of raw items is kept rather than the raw items of all tickers
+            news_items += [item for data in data_chunk for item in data[5]]
+            if len(news_items) >= NEWS_PARSE_BATCH or chunk_index == len(chunks) - 1:
+                chunk_news = self.seen_news.complete(TickerHandler.parse_news(news_items))
+                all_news.append(chunk_news)
+                news_items = []
+            else:
+                chunk_news = TickerHandler.parse_news([])
+
+            if chunk_queue is not None:
+                # the news go with the chunk completing their batch, their tickers are uploaded with it or before
+                await chunk_queue.put((all_ticker_info[-1], all_insider_holder[-1], all_mutual_fund[-1], all_institution[-1], all_insider_transaction[-1], chunk_news))
 
             # sleep for a while
             await asyncio.sleep(sleep_time)
 
+        if chunk_queue is not None:
+            await chunk_queue.put(None)
+
         # save all dataframes
         await self.save_data(pd.concat(all_ticker_info), "ticker_info.csv")
         await self.save_data(pd.concat(all_insider_holder), "insider_holder.csv")
         await self.save_data(pd.concat(all_mutual_fund), "mutual_fund.csv")
         await self.save_data(pd.concat(all_institution), "institution.csv")
         await self.save_data(pd.concat(all_insider_transaction), "insider_transaction.csv")
-        await self.save_data(pd.concat(all_news), "news.csv")
+        await self.save_data(pd.concat(all_news) if all_news else TickerHandler.parse_news([]), "news.csv")
 
 
 # %%
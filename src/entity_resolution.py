@@ -0,0 +1,281 @@
+import hashlib
+import re
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix, diags
+
+from ticker_handler import TickerHandler
+from utils import DATA_DIR, setup_custom_logger
+
+logger = setup_custom_logger(__name__)
+
+
+class NameResolver(ABC):
+    """
+    Maps raw names to canonical ids and names through a persistent alias table.
+
+    Every name is reduced to a matching key by normalize. Names sharing a key share a canonical id, and
+    subclasses may additionally match unseen keys to similar ones in _match_new_keys. The table is cached in a
+    CSV file and updated incrementally, so each run only processes names it has not seen before and the ids
+    stay stable across runs.
+
+    Parameters
+    ----------
+    cache_path : Path
+        The CSV file holding the alias table.
+
+    Attributes
+    ----------
+    mapping : pd.DataFrame
+        The alias table with columns name, key, canonicalId and canonicalName.
+
+    Methods
+    -------
+    resolve(names)
+        Resolves all unseen names and returns the mapping for the given names.
+    normalize(name)
+        Returns the matching key of a name.
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        if cache_path.exists():
+            self.mapping = pd.read_csv(cache_path, dtype=str, keep_default_na=False)
+        else:
+            self.mapping = pd.DataFrame(columns=["name", "key", "canonicalId", "canonicalName"])
+
+    @staticmethod
+    @abstractmethod
+    def normalize(name) -> str:
+        """Returns the matching key of a name."""
+
+    @staticmethod
+    def display_name(name) -> str:
+        """Returns the canonical name shown for a cluster whose first raw name is name."""
+        return name.strip()
+
+    @staticmethod
+    def canonical_id(key) -> str:
+        """Returns the canonical id derived from the key of the first name of a cluster."""
+        return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    def _match_new_keys(self, new_keys, known, first_names) -> dict:
+        """
+        Returns the (canonicalId, canonicalName) of every key not in the alias table yet; each gets its own by default.
+
+        Parameters
+        ----------
+        new_keys : np.ndarray
+            The unseen keys.
+        known : pd.DataFrame
+            The alias table indexed by key, one row per key.
+        first_names : pd.Series
+            The first raw name seen for each new key.
+        """
+        return {key: (self.canonical_id(key), self.display_name(first_names[key])) for key in new_keys}
+
+    def resolve(self, names) -> pd.DataFrame:
+        """
+        Resolves all unseen names and returns the mapping for the given names.
+
+        Parameters
+        ----------
+        names : iterable
+            The raw names.
+
+        Returns
+        -------
+        pd.DataFrame
+            The mapping rows (name, key, canonicalId, canonicalName) of the given names.
+        """
+        names = pd.Series(pd.unique(pd.Series(list(names), dtype=object).dropna().astype(str)))
+        unseen = names[~names.isin(self.mapping["name"])]
+        if not unseen.empty:
+            self._resolve_unseen(unseen)
+        return self.mapping[self.mapping["name"].isin(names)]
+
+    def _resolve_unseen(self, unseen):
+        new = pd.DataFrame({"name": unseen.to_numpy(), "key": unseen.map(self.normalize).to_numpy()})
+        known = self.mapping.drop_duplicates("key").set_index("key")
+        new["canonicalId"] = new["key"].map(known["canonicalId"]).astype(object)
+        new["canonicalName"] = new["key"].map(known["canonicalName"]).astype(object)
+
+        unmatched = new[new["canonicalId"].isna()]
+        if not unmatched.empty:
+            first_names = unmatched.drop_duplicates("key").set_index("key")["name"]
+            resolved = self._match_new_keys(pd.unique(unmatched["key"]), known, first_names)
+            new.loc[unmatched.index, "canonicalId"] = unmatched["key"].map(lambda key: resolved[key][0])
+            new.loc[unmatched.index, "canonicalName"] = unmatched["key"].map(lambda key: resolved[key][1])
+
+        self.mapping = pd.concat([self.mapping, new], ignore_index=True) if not self.mapping.empty else new
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.mapping.to_csv(self.cache_path, index=False)
+        logger.info(f"Resolved {len(new)} new names into {self.cache_path.name}, {self.mapping['canonicalId'].nunique()} canonical names in total")
+
+
+class InsiderNameResolver(NameResolver):
+    """
+    Resolves variants of insider names ("Dr. John Smith", "SMITH JOHN") to one canonical id.
+
+    Names are cleaned with TickerHandler.clean_name and their tokens sorted into a key. Unseen keys are compared
+    only against keys sharing a rare character n-gram (an inverted index built as a sparse n-gram matrix), and
+    the candidate pairs are scored with vectorized n-gram Jaccard similarity. Single letters barely change the
+    n-grams, so similar keys are only matched if their tokens agree as well, see tokens_agree. The name ->
+    canonical id mapping is cached as in NameResolver.
+
+    Parameters
+    ----------
+    cache_path : Path
+        The CSV file holding the name -> canonical id mapping.
+    threshold : float
+        The minimal n-gram Jaccard similarity for two keys to be the same insider.
+    ngram : int
+        The length of the character n-grams.
+    max_block_size : int
+        N-grams shared by more keys than this are too common to generate candidate pairs.
+    """
+
+    def __init__(self, cache_path=DATA_DIR / "entity_resolution" / "insider_names.csv", threshold=0.75, ngram=3, max_block_size=100):
+        super().__init__(cache_path)
+        self.threshold = threshold
+        self.ngram = ngram
+        self.max_block_size = max_block_size
+
+    @staticmethod
+    def normalize(name) -> str:
+        """
+        Returns the matching key of a name: the cleaned name with its tokens sorted, so word order does not matter.
+        """
+        return " ".join(sorted(TickerHandler.clean_name(name).split()))
+
+    @staticmethod
+    def display_name(name) -> str:
+        return TickerHandler.clean_name(name)
+
+    @staticmethod
+    def tokens_agree(key, other) -> bool:
+        """
+        Checks that two keys can name the same person: the full words of one are all words of the other, so the
+        surname agrees whatever the word order of the raw names, and if both have initials, each initial starts a
+        word of the other key. "ROBERT A WILLIAMS" and "ROBERT B WILLIAMS" do not agree, "J A SMITH" and
+        "JOHN A SMITH" do.
+        """
+        words, other_words = key.split(), other.split()
+        full_words, other_full_words = {word for word in words if len(word) > 1}, {word for word in other_words if len(word) > 1}
+        if not full_words or not other_full_words or not (full_words <= other_full_words or other_full_words <= full_words):
+            return False
+        initials, other_initials = {word for word in words if len(word) == 1}, {word for word in other_words if len(word) == 1}
+        if initials and other_initials:
+            return initials <= {word[0] for word in other_words} and other_initials <= {word[0] for word in words}
+        return True
+
+    def _ngram_matrix(self, keys, vocabulary):
+        """Returns the binary key x n-gram matrix, adding unseen n-grams to the vocabulary."""
+        rows, columns = [], []
+        for row, key in enumerate(keys):
+            padded = f" {key} "
+            for gram in {padded[i : i + self.ngram] for i in range(max(len(padded) - self.ngram + 1, 1))}:
+                rows.append(row)
+                columns.append(vocabulary.setdefault(gram, len(vocabulary)))
+        return csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)), shape=(len(keys), len(vocabulary)))
+
+    def _candidate_scores(self, new_keys, all_keys, chunk_size=2000):
+        """
+        Returns the pairs (i, j, score) of new key i and key j of all_keys sharing a rare n-gram whose Jaccard
+        similarity reaches the threshold. all_keys starts with new_keys. New keys are processed in chunks so the
+        candidate pairs held in memory stay bounded.
+        """
+        vocabulary = {}
+        all_grams = self._ngram_matrix(all_keys, vocabulary)
+        sizes = np.asarray(all_grams.sum(axis=1)).ravel()
+
+        # the inverted index: only n-grams with short posting lists generate candidates
+        document_frequency = np.asarray(all_grams.sum(axis=0)).ravel()
+        blocking_index = (diags((document_frequency <= self.max_block_size).astype(np.float32)) @ all_grams.T).tocsr()
+
+        rows, columns, scores = [], [], []
+        for start in range(0, len(new_keys), chunk_size):
+            new_grams = all_grams[start : min(start + chunk_size, len(new_keys))]
+            candidates = (new_grams @ blocking_index).tocoo()
+            chunk_rows = candidates.row + start
+            keep = chunk_rows != candidates.col
+            chunk_rows, chunk_columns = chunk_rows[keep], candidates.col[keep]
+
+            intersection = np.asarray(all_grams[chunk_rows].multiply(all_grams[chunk_columns]).sum(axis=1)).ravel()
+            chunk_scores = intersection / (sizes[chunk_rows] + sizes[chunk_columns] - intersection)
+            similar = chunk_scores >= self.threshold
+            rows.append(chunk_rows[similar])
+            columns.append(chunk_columns[similar])
+            scores.append(chunk_scores[similar])
+        return np.concatenate(rows), np.concatenate(columns), np.concatenate(scores)
+
+    def _match_new_keys(self, new_keys, known, first_names) -> dict:
+        """
+        An unseen key joins the canonical id of the most similar known key above the threshold whose keys all agree
+        with it. Remaining unseen keys are clustered among themselves, most similar pairs first, merging two clusters
+        only if all their keys agree, and each cluster gets a new id.
+        """
+        all_keys = list(new_keys) + list(known.index)
+        rows, columns, scores = self._candidate_scores(list(new_keys), all_keys)
+        matches = pd.DataFrame({"row": rows, "column": columns, "score": scores}).sort_values("score", ascending=False, kind="stable")
+        matches = matches[np.array([self.tokens_agree(all_keys[row], all_keys[column]) for row, column in zip(matches["row"], matches["column"])], dtype=bool)]
+
+        # new keys similar to a known key join its canonical id
+        known_members = known.reset_index().groupby("canonicalId")["key"].apply(list)
+        resolved = {}
+        for row, column in zip(matches["row"], matches["column"]):
+            key = new_keys[row]
+            if column < len(new_keys) or key in resolved:
+                continue
+            canonical_id = known["canonicalId"].iloc[column - len(new_keys)]
+            if all(self.tokens_agree(key, member) for member in known_members[canonical_id]):
+                resolved[key] = (canonical_id, known["canonicalName"].iloc[column - len(new_keys)])
+
+        # the remaining new keys are clustered among themselves
+        clusters = {key: [key] for key in new_keys if key not in resolved}
+        for row, column in zip(matches["row"], matches["column"]):
+            if column >= len(new_keys) or new_keys[row] not in clusters or new_keys[column] not in clusters:
+                continue
+            cluster, other = clusters[new_keys[row]], clusters[new_keys[column]]
+            if cluster is other or not all(self.tokens_agree(key, member) for key in cluster for member in other):
+                continue
+            cluster.extend(other)
+            clusters.update({key: cluster for key in other})
+        for cluster in {id(cluster): cluster for cluster in clusters.values()}.values():
+            representative = max(cluster, key=len)
+            canonical = (self.canonical_id(representative), self.display_name(first_names[representative]))
+            resolved.update({key: canonical for key in cluster})
+        return resolved
+
+
+class HolderNameResolver(NameResolver):
+    """
+    Resolves punctuation and legal suffix variants of institution and mutual fund names
+    ("Vanguard Group Inc", "VANGUARD GROUP, INC.") to one canonical name.
+
+    Holder names are only matched on their normalized key: fund names differing in a single word or number
+    ("... 500 Index Fund", "... 400 Index Fund") are different funds, so no fuzzy matching is done. The canonical
+    name is the first raw name seen for a key.
+
+    Parameters
+    ----------
+    cache_path : Path
+        The CSV file holding the alias table.
+    """
+
+    LEGAL_SUFFIXES = {"INC", "INCORPORATED", "CORP", "CORPORATION", "CO", "COMPANY", "LLC", "LLP", "LP", "LTD", "LIMITED", "PLC", "SA", "AG", "NV", "THE"}
+
+    def __init__(self, cache_path=DATA_DIR / "entity_resolution" / "holder_aliases.csv"):
+        super().__init__(cache_path)
+
+    @classmethod
+    def normalize(cls, name) -> str:
+        """
+        Returns the matching key of a holder name: uppercase, "&" spelled out, punctuation and legal suffixes removed.
+        A name made only of legal suffixes ("The Company") keeps its uppercased name as key, so such names are not
+        all merged on the empty key.
+        """
+        tokens = re.sub(r"[^\w\s]", " ", name.upper().replace("&", " AND ")).split()
+        return " ".join(token for token in tokens if token not in cls.LEGAL_SUFFIXES) or name.upper().strip()
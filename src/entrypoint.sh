@@ -2,8 +2,17 @@
 
 echo "Running entrypoint"
 
-# Run the Python script
-/usr/local/bin/python /app/src/main.py
+# On a cold start, e.g. after Memgraph restarted, restore the graph from the artifact exported after the
+# last successful upload, which takes minutes instead of a full download and upload
+/usr/local/bin/python /app/src/restore.py --if-empty
+
+# Run the Python script, unless the graph already holds the data of the last scheduled run (21:05 on weekdays),
+# a run now would wipe the restored graph for hours to upload the same or an older snapshot
+if /usr/local/bin/python /app/src/restore.py --check-fresh; then
+    echo "The graph holds the data of the last scheduled run, skipping the download"
+else
+    /usr/local/bin/python /app/src/main.py
+fi
 
 # Start the cron service
 /usr/sbin/cron -f
@@ -1,25 +1,135 @@
+import argparse
 import asyncio
+import time
 
-import pandas as pd
-
-from db.upload import DataUploader
-from download import AsyncDataDownloader
+from metrics import metrics
 from utils import DATA_DIR, setup_custom_logger
 
 logger = setup_custom_logger(__name__)
 
+parser = argparse.ArgumentParser(description="Download the financial data and upload it to Memgraph")
+parser.add_argument("--load-history", action="store_true", help="load the holding relationships as validFrom/validTo intervals over all stored snapshots")
+parser.add_argument("--profile", action="store_true", help="profile this run with cProfile, the stats are saved to data/metrics/")
+stages = parser.add_mutually_exclusive_group()
+stages.add_argument("--download-only", action="store_true", help="only download the data, without connecting to Memgraph")
+stages.add_argument("--upload-only", action="store_true", help="only upload today's downloaded data")
+stages.add_argument("--pipelined", action="store_true", help="upload the downloaded chunks while the download continues")
+shards = parser.add_argument_group("sharded runs", "split the download over workers sharing the data directory, see the README")
+shards.add_argument("--shard-count", type=int, help="the number of shards the tickers are split into")
+shards.add_argument("--shard-index", type=int, help="only download this shard (from 0) of --shard-count into its part files")
+shards.add_argument("--merge-shards", action="store_true", help="merge the part files of the --shard-count shards into today's snapshot instead of downloading")
+shards.add_argument("--workers", type=int, help="download the data in this many local shard worker processes and merge their part files")
+args = parser.parse_args()
+if args.workers:
+    args.shard_count = args.workers
+    args.merge_shards = True
+if (args.shard_index is not None or args.merge_shards) and not args.shard_count:
+    parser.error("--shard-index and --merge-shards need --shard-count")
+if args.shard_count and args.shard_index is None and not args.merge_shards:
+    parser.error("--shard-count needs --shard-index or --merge-shards")
+if args.pipelined and (args.shard_count or args.shard_index is not None):
+    parser.error("--pipelined does not support sharded runs")
+if args.upload_only and (args.shard_count or args.shard_index is not None):
+    parser.error("--upload-only does not support sharded runs")
+
+
+# the stages import their dependencies (pandas, yfinance, scipy, gqlalchemy) themselves, so each run only pays
+# for the stages it runs and a download-only run never touches the database layer
+def load_tickers():
+    import pandas as pd
+
+    # tickers = os.getenv("TICKERS").split(",")
+    tickers = pd.read_csv(DATA_DIR / "nasdaq_screener_1721725526813.csv").dropna()
+    tickers = list(tickers["Symbol"])
+    logger.info("Getting data for the following tickers:")
+    logger.info(tickers)
+    return tickers
+
+
+def download():
+    from co_holding import CoHoldingBuilder
+    from download import AsyncDataDownloader
+    from price_history import PriceHistoryDownloader
+
+    tickers = load_tickers()
+    if args.merge_shards:
+        from shards import ShardedRun
+
+        sharded_run = ShardedRun(tickers, args.shard_count)
+        if args.workers:
+            sharded_run.run_local_workers()
+        sharded_run.merge()
+    else:
+        with metrics.timer("download"):
+            downloader = AsyncDataDownloader(tickers)
+            asyncio.get_event_loop().run_until_complete(downloader.download_data_by_chunks())
+        with metrics.timer("price_history"):
+            asyncio.get_event_loop().run_until_complete(PriceHistoryDownloader(tickers).download_data_by_batches())
+    # computed once over all tickers, the market correlation needs the universe return, not the one of a shard
+    with metrics.timer("price_metrics"):
+        price_downloader = PriceHistoryDownloader(tickers)
+        asyncio.get_event_loop().run_until_complete(price_downloader.save_metrics(price_downloader.compute_metrics()))
+    logger.info("All data downloaded")
+    with metrics.timer("co_holding"):
+        co_holding = CoHoldingBuilder()
+        co_holding.save(co_holding.compute())
+
+
+def upload():
+    from db.upload import DataUploader
+
+    logger.info("Uploading data to the database")
+    with metrics.timer("upload"):
+        uploader = DataUploader(load_history=args.load_history)
+        uploader.reupload_all_data()
+    logger.info("All data uploaded")
+
+
+def export_graph():
+    from db.artifact import GraphArtifact
+    from db.connection import memgraph
+
+    # a failed export only leaves the previous artifact for the next cold start, the upload itself succeeded
+    try:
+        # the date the run started, the one of its snapshot directory, even if the upload ends after midnight
+        GraphArtifact().export(memgraph, run_id[:10])
+    except Exception as e:
+        logger.error(f"Error exporting the graph artifact: {e}")
+
+
+def download_shard():
+    from shards import ShardedRun
+
+    ShardedRun(load_tickers(), args.shard_count).download_shard(args.shard_index)
+
+
+def pipelined():
+    from pipeline import PipelinedRun
+
+    PipelinedRun(load_tickers(), load_history=args.load_history).run()
+
+
 logger.info("Program started")
 logger.info("----------------")
-# tickers = os.getenv("TICKERS").split(",")
-tickers = pd.read_csv(DATA_DIR / "nasdaq_screener_1721725526813.csv").dropna()
-tickers = list(tickers["Symbol"])
-logger.info("Getting data for the following tickers:")
-logger.info(tickers)
-downloader = AsyncDataDownloader(tickers)
-asyncio.get_event_loop().run_until_complete(downloader.download_data_by_chunks())
-logger.info("All data downloaded")
-logger.info("Uploading data to the database")
-uploader = DataUploader()
-uploader.reupload_all_data()
-logger.info("All data uploaded")
+run_id = time.strftime("%Y-%m-%d_%H-%M-%S")
+if args.shard_index is not None:
+    run_id += f"_shard{args.shard_index}"
+metrics_dir = DATA_DIR / "metrics"
+try:
+    with metrics.profile(metrics_dir / f"profile_{run_id}.prof", enabled=args.profile):
+        if args.pipelined:
+            pipelined()
+            export_graph()
+        elif args.shard_index is not None:
+            download_shard()
+        else:
+            if not args.upload_only:
+                download()
+            if not args.download_only:
+                upload()
+                export_graph()
+finally:
+    metrics.write_report(metrics_dir / f"run_{run_id}.json")
+    # every shard worker writes its own file, they run at the same time and would replace each other's
+    metrics.write_prometheus(metrics_dir / ("financial_kg.prom" if args.shard_index is None else f"financial_kg_shard{args.shard_index}.prom"))
 logger.info("Program finished")
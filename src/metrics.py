@@ -0,0 +1,261 @@
+import cProfile
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from utils import setup_custom_logger
+
+logger = setup_custom_logger(__name__)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, float("inf"))
+
+
+class MetricsRegistry:
+    """
+    Collects the metrics of one pipeline run: stage timers with the rows they processed, latency histograms,
+    counters and the peak RSS of the process.
+
+    Stages are timed with timer or timed and may be nested; add_rows credits rows to the innermost running
+    stage so its throughput can be reported. The metrics are exported as a JSON run report and as a
+    Prometheus text-format file (for the node_exporter textfile collector).
+
+    Parameters
+    ----------
+    namespace : str
+        The prefix of the Prometheus metric names.
+
+    Methods
+    -------
+    timer(stage)
+        Context manager timing a stage.
+    timed(stage=None)
+        Decorator timing every call of a function as a stage.
+    add_rows(rows)
+        Credits rows to the innermost running stage.
+    observe(name, value, **labels)
+        Records a value in a latency histogram.
+    sample(name, key, value)
+        Keeps an individual measurement for the run report.
+    inc(name, value=1, **labels)
+        Increments a counter.
+    report()
+        Returns all metrics as a dictionary.
+    write_report(path)
+        Writes the JSON run report.
+    write_prometheus(path)
+        Writes the metrics in the Prometheus text format.
+    profile(path, enabled=True)
+        Context manager profiling the enclosed code with cProfile.
+    """
+
+    def __init__(self, namespace="financial_kg"):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        self.started_at = time.time()
+        self.stages = {}
+        self.histograms = {}
+        self.counters = {}
+        self.samples = {}
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def timer(self, stage):
+        """
+        Times the enclosed code as the given stage. Repeated runs of a stage are summed.
+        """
+        entry = {"rows": 0}
+        self._stack().append(entry)
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack().pop()
+            with self._lock:
+                stage_metrics = self.stages.setdefault(stage, {"seconds": 0.0, "calls": 0, "rows": 0})
+                stage_metrics["seconds"] += elapsed
+                stage_metrics["calls"] += 1
+                stage_metrics["rows"] += entry["rows"]
+
+    def timed(self, stage=None):
+        """
+        Decorator timing every call of the function as a stage named after the function by default.
+        """
+
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage or function.__name__):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def add_rows(self, rows):
+        """
+        Credits rows to the innermost running stage.
+        """
+        stack = self._stack()
+        if stack:
+            stack[-1]["rows"] += rows
+
+    def observe(self, name, value, **labels):
+        """
+        Records a value, in seconds, in the latency histogram of the given name and labels.
+
+        Parameters
+        ----------
+        name : str
+            The histogram name.
+        value : float
+            The observed latency.
+        labels : str
+            The labels of the histogram, e.g. dataset="news".
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.setdefault(key, {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0, "max": 0.0})
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+            histogram["max"] = max(histogram["max"], value)
+
+    def sample(self, name, key, value):
+        """
+        Keeps an individual measurement for the run report only, e.g. the fetch latency of one ticker, which
+        would be too many series for Prometheus.
+        """
+        with self._lock:
+            self.samples.setdefault(name, {})[key] = value
+
+    def inc(self, name, value=1, **labels):
+        """
+        Increments the counter of the given name and labels.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @staticmethod
+    def peak_rss_bytes() -> int:
+        """
+        Returns the peak resident set size of the process, 0 where it is not available.
+        """
+        if resource is None:
+            return 0
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def report(self, slowest=20) -> dict:
+        """
+        Returns all metrics as a dictionary.
+
+        Parameters
+        ----------
+        slowest : int
+            The number of largest samples kept per sample name.
+        """
+        with self._lock:
+            return {
+                "startedAt": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at)),
+                "durationSeconds": round(time.time() - self.started_at, 3),
+                "peakRssBytes": self.peak_rss_bytes(),
+                "stages": {stage: {**values, "seconds": round(values["seconds"], 3), "rowsPerSecond": round(values["rows"] / values["seconds"], 1) if values["rows"] and values["seconds"] else None} for stage, values in self.stages.items()},
+                "histograms": [
+                    {"name": name, "labels": dict(labels), "count": values["count"], "sum": round(values["sum"], 3), "max": round(values["max"], 3), "mean": round(values["sum"] / values["count"], 3)}
+                    for (name, labels), values in self.histograms.items()
+                ],
+                "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in self.counters.items()],
+                "slowest": {name: dict(sorted(values.items(), key=lambda item: item[1], reverse=True)[:slowest]) for name, values in self.samples.items()},
+            }
+
+    def write_report(self, path):
+        """
+        Writes the JSON run report.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.report(), indent=2))
+        logger.info(f"Saved run report to {path}")
+
+    @staticmethod
+    def _labels(labels, **extra) -> str:
+        labels = {**dict(labels), **extra}
+        return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}" if labels else ""
+
+    def write_prometheus(self, path):
+        """
+        Writes the metrics in the Prometheus text format.
+        """
+        prefix = self.namespace
+        lines = [f"# TYPE {prefix}_peak_rss_bytes gauge", f"{prefix}_peak_rss_bytes {self.peak_rss_bytes()}"]
+        lines += [f"# TYPE {prefix}_last_run_timestamp_seconds gauge", f"{prefix}_last_run_timestamp_seconds {self.started_at:.0f}"]
+        with self._lock:
+            for metric, field in [("stage_seconds", "seconds"), ("stage_rows", "rows")]:
+                lines.append(f"# TYPE {prefix}_{metric} gauge")
+                lines += [f"{prefix}_{metric}{self._labels((), stage=stage)} {values[field]}" for stage, values in self.stages.items()]
+
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {prefix}_{name} histogram")
+                for (histogram_name, labels), values in self.histograms.items():
+                    if histogram_name != name:
+                        continue
+                    for bound, count in zip(LATENCY_BUCKETS, values["buckets"]):
+                        lines.append(f"{prefix}_{name}_bucket{self._labels(labels, le='+Inf' if bound == float('inf') else bound)} {count}")
+                    lines.append(f"{prefix}_{name}_sum{self._labels(labels)} {values['sum']}")
+                    lines.append(f"{prefix}_{name}_count{self._labels(labels)} {values['count']}")
+
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                lines += [f"{prefix}_{name}{self._labels(labels)} {value}" for (counter_name, labels), value in self.counters.items() if counter_name == name]
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # written to a temporary file first so the textfile collector never reads a partial file
+        temporary_path = path.with_suffix(".tmp")
+        temporary_path.write_text("\n".join(lines) + "\n")
+        temporary_path.replace(path)
+        logger.info(f"Saved Prometheus metrics to {path}")
+
+    @contextmanager
+    def profile(self, path, enabled=True):
+        """
+        Profiles the enclosed code with cProfile and saves the stats to path.
+
+        Parameters
+        ----------
+        path : Path
+            The file the stats are saved to, readable with pstats or snakeviz.
+        enabled : bool
+            Whether to profile at all, so the hook can be switched on for a single run.
+        """
+        if not enabled:
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(path)
+            logger.info(f"Saved profile to {path}, inspect it with: python -m pstats {path}")
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,182 @@
+import pandas as pd
+
+from ticker_handler import NEWS_FIELDS
+from utils import DATA_DIR, setup_custom_logger
+
+logger = setup_custom_logger(__name__)
+
+ARTICLE_COLUMNS = [column for column in NEWS_FIELDS if column != "ticker"]
+
+
+class SeenNewsIndex:
+    """
+    A persistent index of the news articles already loaded into the graph and the tickers they are linked to.
+
+    The index holds one row per (uuid, ticker) link with the date the link was first seen, and the fields of
+    every indexed article in a second file next to it. News parsing skips the articles it contains, whose
+    fields are filled in from the stored ones, and the upload only writes the articles and links missing from
+    it, so the cost of a news load scales with what is new rather than with the size of the feeds. The stored
+    articles also let the upload recreate the ones missing from the graph, e.g. after Memgraph restarted.
+    Articles first seen more than max_age_days ago are evicted together with all their links.
+
+    Parameters
+    ----------
+    path : Path
+        The CSV file holding the index.
+    max_age_days : int
+        The number of days an article is kept after it was first seen.
+
+    Attributes
+    ----------
+    links : pd.DataFrame
+        The index with columns uuid, ticker and firstSeen.
+    articles : pd.DataFrame
+        The fields of the indexed articles, indexed by uuid.
+
+    Methods
+    -------
+    is_seen(uuid, ticker=None)
+        Checks if the article, or its link to the ticker, is in the index.
+    new_links(news)
+        Returns the rows of news whose (uuid, ticker) link is not in the index.
+    complete(news)
+        Fills in the fields of the indexed articles news only has the uuid of.
+    add(news, seen_at=None)
+        Adds the links and articles of news to the index.
+    article_rows(uuids)
+        Returns the stored fields of the given articles.
+    evict(now=None)
+        Removes the articles older than max_age_days and returns their uuids.
+    save()
+        Saves the index.
+    """
+
+    def __init__(self, path=DATA_DIR / "news_index.csv", max_age_days=90):
+        self.path = path
+        self.articles_path = path.with_name(f"{path.stem}_articles.csv")
+        self.max_age_days = max_age_days
+        if path.exists():
+            self.links = pd.read_csv(path, dtype=str, keep_default_na=False)
+        else:
+            self.links = pd.DataFrame(columns=["uuid", "ticker", "firstSeen"])
+        if self.articles_path.exists():
+            self.articles = pd.read_csv(self.articles_path, dtype=object).set_index("uuid")
+        else:
+            self.articles = pd.DataFrame(columns=ARTICLE_COLUMNS, dtype=object).set_index("uuid")
+        self.articles = self.articles.where(self.articles.notna(), None)
+
+        # links of articles without stored fields, e.g. indexed before the fields were stored, are forgotten so
+        # the articles are parsed and loaded again
+        unknown = ~self.links["uuid"].isin(self.articles.index)
+        if unknown.any():
+            logger.info(f"Dropping {unknown.sum()} indexed news links without a stored article")
+            self.links = self.links[~unknown].reset_index(drop=True)
+        self._refresh_lookups()
+
+    def _refresh_lookups(self):
+        self._uuids = set(self.links["uuid"])
+        self._links = set(zip(self.links["uuid"], self.links["ticker"]))
+
+    def __len__(self):
+        return len(self.links)
+
+    def is_seen(self, uuid, ticker=None) -> bool:
+        """
+        Checks if the article, or its link to the ticker if given, is in the index.
+        """
+        return uuid in self._uuids if ticker is None else (uuid, ticker) in self._links
+
+    def new_links(self, news) -> pd.DataFrame:
+        """
+        Returns the rows of news whose (uuid, ticker) link is not in the index.
+
+        Parameters
+        ----------
+        news : pd.DataFrame
+            The news with uuid and ticker columns.
+        """
+        if news.empty:
+            return news
+        seen = pd.Series([(uuid, ticker) in self._links for uuid, ticker in zip(news["uuid"], news["ticker"])], index=news.index, dtype=bool)
+        return news[~seen].drop_duplicates(["uuid", "ticker"])
+
+    def complete(self, news) -> pd.DataFrame:
+        """
+        Fills in the fields of the indexed articles news only has the uuid of, so the news hold every article of
+        the feeds whether it was parsed or not.
+
+        Parameters
+        ----------
+        news : pd.DataFrame
+            The parsed news with the NEWS_FIELDS columns.
+        """
+        known = news["uuid"].isin(self.articles.index) & news["title"].isna()
+        if not known.any():
+            return news
+        news = news.copy()
+        news.loc[known, ARTICLE_COLUMNS[1:]] = self.articles.loc[news.loc[known, "uuid"], ARTICLE_COLUMNS[1:]].to_numpy()
+        return news
+
+    def article_rows(self, uuids) -> pd.DataFrame:
+        """
+        Returns the stored fields of the given articles, with a uuid column.
+        """
+        return self.articles.loc[self.articles.index.intersection(pd.Index(uuids))].rename_axis("uuid").reset_index()
+
+    def add(self, news, seen_at=None):
+        """
+        Adds the links of news to the index and stores the fields of its articles not stored yet.
+
+        Parameters
+        ----------
+        news : pd.DataFrame
+            The news with uuid and ticker columns, and the NEWS_FIELDS columns of the new articles.
+        seen_at : str
+            The first-seen date of the new links, today by default.
+        """
+        new = self.new_links(news.dropna(subset=["uuid", "ticker"]))
+        if new.empty:
+            return
+        articles = new[~new["uuid"].isin(self.articles.index)].dropna(subset=["title"]).drop_duplicates("uuid")
+        if not articles.empty:
+            articles = articles.reindex(columns=ARTICLE_COLUMNS).astype(object).set_index("uuid")
+            articles = articles.where(articles.notna(), None)
+            self.articles = pd.concat([self.articles, articles]) if not self.articles.empty else articles
+        new = pd.DataFrame({"uuid": new["uuid"].astype(str), "ticker": new["ticker"].astype(str), "firstSeen": seen_at or pd.Timestamp.now().strftime("%Y-%m-%d")})
+        self.links = pd.concat([self.links, new], ignore_index=True) if not self.links.empty else new.reset_index(drop=True)
+        self._refresh_lookups()
+
+    def evict(self, now=None) -> list:
+        """
+        Removes the articles first seen more than max_age_days ago, with all their links.
+
+        Parameters
+        ----------
+        now : pd.Timestamp
+            The reference time, now by default.
+
+        Returns
+        -------
+        list
+            The uuids of the evicted articles.
+        """
+        if self.links.empty:
+            return []
+        cutoff = ((now or pd.Timestamp.now()) - pd.Timedelta(days=self.max_age_days)).strftime("%Y-%m-%d")
+        first_seen = self.links.groupby("uuid")["firstSeen"].min()
+        evicted = first_seen.index[first_seen < cutoff]
+        if len(evicted):
+            self.links = self.links[~self.links["uuid"].isin(evicted)].reset_index(drop=True)
+            self.articles = self.articles[~self.articles.index.isin(evicted)]
+            self._refresh_lookups()
+            logger.info(f"Evicted {len(evicted)} news articles first seen before {cutoff}")
+        return list(evicted)
+
+    def save(self):
+        """
+        Saves the index and the stored articles.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.links.to_csv(self.path, index=False)
+        self.articles.to_csv(self.articles_path)
+        logger.info(f"Saved {len(self.links)} news links to {self.path}")
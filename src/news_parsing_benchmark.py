@@ -0,0 +1,122 @@
+import argparse
+import json
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from ticker_handler import NEWS_FIELDS, TickerHandler
+from utils import DATA_DIR, setup_custom_logger
+
+logger = setup_custom_logger(__name__)
+
+FEEDS_DIR = DATA_DIR / "news_feeds"
+
+
+def parse_news_legacy(feed) -> pd.DataFrame:
+    """
+    The per-item news parser TickerHandler.prepare_news used before TickerHandler.parse_news, kept as the
+    benchmark baseline.
+    """
+
+    def get_nested_value(data, key_path):
+        keys = key_path.split(".")
+        for key in keys:
+            if isinstance(data, dict):
+                data = data.get(key, {})
+            else:
+                return None
+        return data if data != {} else None
+
+    parsed_news_list = []
+    for news in feed:
+        news_dict = {}
+        for key, source_key in NEWS_FIELDS.items():
+            try:
+                value = get_nested_value(news, source_key)
+                if key == "providerPublishTime" and value:
+                    try:
+                        value = datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").strftime("%Y-%m-%d %H:%M:%S")
+                    except Exception:
+                        value = None
+                news_dict[key] = value
+            except Exception:
+                news_dict[key] = None
+        news_dict["content_type"] = get_nested_value(news, "content.contentType")
+        news_dict["canonical_url"] = get_nested_value(news, "content.canonicalUrl.url")
+        parsed_news_list.append(news_dict)
+    return pd.DataFrame(data=parsed_news_list, columns=list(NEWS_FIELDS))
+
+
+def record_feeds(tickers):
+    """
+    Records the current news items of the tickers into FEEDS_DIR, one JSON file per ticker.
+    """
+    FEEDS_DIR.mkdir(parents=True, exist_ok=True)
+    for ticker in tickers:
+        feed = TickerHandler(ticker).prepare_news_items()
+        (FEEDS_DIR / f"{ticker}.json").write_text(json.dumps(feed))
+        logger.info(f"Recorded {len(feed)} news items of {ticker}")
+
+
+def _time(parser, feeds, repeat) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for feed in feeds:
+            parser(feed)
+    return (time.perf_counter() - start) / repeat
+
+
+def benchmark(feeds, repeat=20, chunk_size=4) -> dict:
+    """
+    Times both parsers on every feed separately, on the feeds of every download chunk combined, as the
+    downloader parses them, and on all feeds combined into one, and checks that they return the same news.
+
+    Parameters
+    ----------
+    feeds : dict
+        The recorded feeds by ticker.
+    repeat : int
+        The number of times each feed is parsed by each parser.
+    chunk_size : int
+        The number of tickers per download chunk, see AsyncDataDownloader.download_data_by_chunks.
+
+    Returns
+    -------
+    dict
+        The parse times of both parsers and the speedups.
+    """
+    # the per-feed timings show the per-ticker cost the legacy parser had in the downloader
+    per_feed = list(feeds.values())
+    per_chunk = [[item for feed in per_feed[i : i + chunk_size] for item in feed] for i in range(0, len(per_feed), chunk_size)]
+    combined = [item for feed in per_feed for item in feed]
+    items = len(combined)
+    report = {"feeds": len(feeds), "items": items, "chunkSize": chunk_size}
+    for mode, batches in [("perFeed", per_feed), ("perChunk", per_chunk), ("combined", [combined])]:
+        legacy = _time(parse_news_legacy, batches, repeat)
+        columnar = _time(TickerHandler.parse_news, batches, repeat)
+        report[mode] = {
+            "legacySeconds": round(legacy, 6),
+            "columnarSeconds": round(columnar, 6),
+            "legacyMicrosecondsPerItem": round(legacy / max(items, 1) * 1e6, 2),
+            "columnarMicrosecondsPerItem": round(columnar / max(items, 1) * 1e6, 2),
+            "speedup": round(legacy / columnar, 2),
+        }
+    report["mismatchedFeeds"] = [ticker for ticker, feed in feeds.items() if not parse_news_legacy(feed).astype(object).equals(TickerHandler.parse_news(feed).astype(object))]
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the columnar news parser against the legacy per-item parser on recorded feeds")
+    parser.add_argument("--record", nargs="+", metavar="TICKER", help="record the current news feeds of the tickers before benchmarking")
+    parser.add_argument("--repeat", type=int, default=20, help="number of times each feed is parsed")
+    parser.add_argument("--chunk-size", type=int, default=4, help="number of tickers per download chunk")
+    args = parser.parse_args()
+
+    if args.record:
+        record_feeds(args.record)
+    feeds = {path.stem: json.loads(path.read_text()) for path in sorted(FEEDS_DIR.glob("*.json"))}
+    if not feeds:
+        logger.error(f"No recorded feeds in {FEEDS_DIR}, record some with --record")
+    else:
+        print(json.dumps(benchmark(feeds, args.repeat, args.chunk_size), indent=2))
@@ -0,0 +1,142 @@
+import asyncio
+import io
+
+import pandas as pd
+
+from co_holding import CoHoldingBuilder
+from db.upload import DataUploader
+from download import AsyncDataDownloader
+from metrics import metrics
+from price_history import PriceHistoryDownloader
+from utils import DATA_DIR, setup_custom_logger
+
+logger = setup_custom_logger(__name__)
+
+
+class PipelinedRun:
+
+    """
+    Downloads and uploads the data as a pipeline: the per-ticker datasets of every finished download chunk are
+    handed through a bounded queue to an upload consumer, which loads them in batches while the next chunks
+    are downloaded. The data computed from the complete snapshot (price metrics, holdings history, co-held
+    tickers and summaries) is uploaded once the download has finished.
+
+    The snapshot written to disk is the same as the one of a download followed by DataUploader.reupload_all_data.
+
+    Parameters
+    ----------
+    tickers : list
+        The list of tickers to download data for.
+    load_history : bool
+        Whether the holding relationships are loaded from the holdings history, see DataUploader.
+    queue_size : int
+        The number of downloaded chunks that may wait for the upload before the download pauses.
+    batch_size : int
+        The maximum number of waiting chunks uploaded together.
+
+    Methods
+    -------
+    run()
+        Runs the pipeline.
+    """
+
+    def __init__(self, tickers, load_history=False, queue_size=8, batch_size=4):
+        self.tickers = tickers
+        self.load_history = load_history
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+
+    @staticmethod
+    def _as_snapshot(data) -> pd.DataFrame:
+        """
+        Round-trips the data through CSV, so the uploads see the same values and types as when reading the snapshot.
+        """
+        if data.empty:
+            return data
+        return pd.read_csv(io.StringIO(data.to_csv(index=False)))
+
+    def _upload_batch(self, uploader, chunks):
+        datasets = [self._as_snapshot(pd.concat([chunk[i] for chunk in chunks])) for i in range(6)]
+        with metrics.timer("pipelined_upload_batch"):
+            uploader.upload_snapshot_data(*datasets, update_news_index=False)
+        logger.info(f"Uploaded a batch of {len(chunks)} downloaded chunks")
+
+    async def _consume(self, uploader, chunk_queue) -> int:
+        """
+        Uploads the chunks from the queue until the None sentinel, taking all chunks already waiting, up to
+        batch_size, as one batch. The uploads run in a thread so the download continues meanwhile.
+
+        Returns
+        -------
+        int
+            The number of batches that failed to upload.
+        """
+        failed = 0
+        finished = False
+        while not finished:
+            chunks = [await chunk_queue.get()]
+            while len(chunks) < self.batch_size and not chunk_queue.empty():
+                chunks.append(chunk_queue.get_nowait())
+            if chunks[-1] is None:
+                finished = True
+                chunks.pop()
+            if not chunks:
+                continue
+            try:
+                await asyncio.to_thread(self._upload_batch, uploader, chunks)
+            except Exception as e:
+                # the queue is drained regardless, a stalled consumer would block the download
+                failed += 1
+                metrics.inc("pipelined_failed_batches_total")
+                logger.error(f"Error uploading a batch of {len(chunks)} chunks: {e}")
+        return failed
+
+    async def _download(self, chunk_queue, seen_news):
+        with metrics.timer("download"):
+            await AsyncDataDownloader(self.tickers, seen_news=seen_news).download_data_by_chunks(chunk_queue=chunk_queue)
+        with metrics.timer("price_history"):
+            price_downloader = PriceHistoryDownloader(self.tickers)
+            await price_downloader.download_data_by_batches()
+            await price_downloader.save_metrics(price_downloader.compute_metrics())
+        logger.info("All data downloaded")
+        with metrics.timer("co_holding"):
+            co_holding = CoHoldingBuilder()
+            co_holding.save(co_holding.compute())
+
+    async def _run(self, uploader):
+        chunk_queue = asyncio.Queue(maxsize=self.queue_size)
+        consumer = asyncio.create_task(self._consume(uploader, chunk_queue))
+        try:
+            await self._download(chunk_queue, uploader.seen_news)
+        except BaseException:
+            consumer.cancel()
+            raise
+        with metrics.timer("pipelined_upload_drain"):
+            failed = await consumer
+        if failed:
+            # the graph misses the data of the failed batches, so the run fails rather than being exported
+            logger.error(f"{failed} batches failed to upload, the graph is incomplete")
+            raise RuntimeError(f"{failed} batches failed to upload, the graph is incomplete")
+
+    def run(self):
+        """
+        Runs the pipeline: recreates the graph from the downloaded chunks as they arrive, then uploads the data
+        computed from the complete snapshot. Raises a RuntimeError if any batch failed to upload, once the
+        download has finished, so the incomplete graph is not exported.
+
+        The downloader and the uploader share one seen-news index, so the download sees the articles uploaded
+        meanwhile. It is evicted before and saved after all batches rather than for every batch.
+        """
+        # the uploader reads the files computed from the complete snapshot from today's directory
+        (DATA_DIR / f"data_{pd.Timestamp.now().strftime('%Y-%m-%d')}").mkdir(parents=True, exist_ok=True)
+        uploader = DataUploader(load_history=self.load_history)
+        logger.info("Running the pipelined download and upload")
+        with metrics.timer("pipelined_run"), uploader.index_planner.bulk_load():
+            uploader.delete_all_data(keep_news=True)
+            uploader.evict_news()
+            asyncio.run(self._run(uploader))
+            uploader.relink_news()
+            uploader.seen_news.save()
+            uploader.upload_derived_data()
+        uploader.index_planner.report()
+        logger.info("Finished the pipelined download and upload")
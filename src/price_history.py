@@ -0,0 +1,401 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from metrics import metrics
+from utils import DATA_DIR, setup_custom_logger
+
+logger = setup_custom_logger(__name__)
+
+# one daily bar, 28 bytes per record
+BAR_DTYPE = np.dtype([("date", "<M8[D]"), ("open", "<f4"), ("high", "<f4"), ("low", "<f4"), ("close", "<f4"), ("volume", "<f8")])
+BAR_COLUMNS = {"Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"}
+# the corporate actions downloaded with the bars, after which the stored adjusted bars are on another scale
+ACTION_COLUMNS = {"Dividends": "dividends", "Stock Splits": "splits"}
+TRADING_DAYS = 252
+
+
+class PriceStore:
+    """
+    An append-only, memory-mapped store of daily OHLCV bars with one binary file per ticker.
+
+    Parameters
+    ----------
+    path : Path
+        The directory holding the per-ticker files.
+
+    Attributes
+    ----------
+    path : Path
+        The directory holding the per-ticker files.
+
+    Methods
+    -------
+    read(ticker)
+        Memory-maps all bars stored for the ticker.
+    last_date(ticker)
+        Returns the date of the last stored bar for the ticker.
+    append(ticker, bars)
+        Appends the bars newer than the last stored bar.
+    replace(ticker, bars)
+        Replaces all bars stored for the ticker.
+    rescale(ticker, factor)
+        Multiplies the prices of all bars stored for the ticker by the factor.
+    """
+
+    def __init__(self, path=DATA_DIR / "prices"):
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _file(self, ticker):
+        return self.path / f"{ticker}.bin"
+
+    def read(self, ticker) -> np.ndarray:
+        """
+        Memory-maps all bars stored for the ticker.
+
+        Parameters
+        ----------
+        ticker : str
+            The ticker symbol.
+
+        Returns
+        -------
+        np.ndarray
+            A read-only structured array of BAR_DTYPE records sorted by date (empty if nothing is stored).
+        """
+        file = self._file(ticker)
+        # a partly written last record, e.g. of an interrupted append, is ignored
+        count = file.stat().st_size // BAR_DTYPE.itemsize if file.exists() else 0
+        if count == 0:
+            return np.empty(0, dtype=BAR_DTYPE)
+        return np.memmap(file, dtype=BAR_DTYPE, mode="r", shape=(count,))
+
+    def last_date(self, ticker):
+        """
+        Returns the date of the last stored bar for the ticker.
+
+        Parameters
+        ----------
+        ticker : str
+            The ticker symbol.
+
+        Returns
+        -------
+        pd.Timestamp or None
+            The date of the last stored bar, None if nothing is stored.
+        """
+        bars = self.read(ticker)
+        if len(bars) == 0:
+            return None
+        return pd.Timestamp(bars["date"][-1])
+
+    def append(self, ticker, bars: pd.DataFrame) -> int:
+        """
+        Appends the bars newer than the last stored bar.
+
+        Parameters
+        ----------
+        ticker : str
+            The ticker symbol.
+        bars : pd.DataFrame
+            The daily bars indexed by date with open, high, low, close and volume columns.
+
+        Returns
+        -------
+        int
+            The number of appended bars.
+        """
+        bars = bars.dropna(subset=["close"]).sort_index()
+        last_date = self.last_date(ticker)
+        if last_date is not None:
+            bars = bars[bars.index > last_date]
+        if bars.empty:
+            return 0
+
+        records = self._records(bars)
+        with open(self._file(ticker), "ab") as file:
+            # drops a partly written last record, which would shift all appended records
+            file.truncate(file.tell() - file.tell() % BAR_DTYPE.itemsize)
+            records.tofile(file)
+        return len(records)
+
+    def replace(self, ticker, bars: pd.DataFrame) -> int:
+        """
+        Replaces all bars stored for the ticker, e.g. with a backfill adjusted for a new split.
+
+        Parameters
+        ----------
+        ticker : str
+            The ticker symbol.
+        bars : pd.DataFrame
+            The daily bars indexed by date with open, high, low, close and volume columns.
+
+        Returns
+        -------
+        int
+            The number of stored bars.
+        """
+        return self._write(ticker, self._records(bars.dropna(subset=["close"]).sort_index()))
+
+    def rescale(self, ticker, factor) -> int:
+        """
+        Multiplies the prices of all bars stored for the ticker by the factor, e.g. the adjustment for a new
+        dividend. The volumes are kept.
+
+        Parameters
+        ----------
+        ticker : str
+            The ticker symbol.
+        factor : float
+            The factor the open, high, low and close prices are multiplied by.
+
+        Returns
+        -------
+        int
+            The number of rescaled bars.
+        """
+        records = np.array(self.read(ticker))
+        for column in ("open", "high", "low", "close"):
+            records[column] *= factor
+        return self._write(ticker, records)
+
+    def _write(self, ticker, records) -> int:
+        # written to a temporary file first so a failed write keeps the previous bars
+        temporary_file = self._file(ticker).with_suffix(".tmp")
+        records.tofile(temporary_file)
+        temporary_file.replace(self._file(ticker))
+        return len(records)
+
+    @staticmethod
+    def _records(bars) -> np.ndarray:
+        records = np.empty(len(bars), dtype=BAR_DTYPE)
+        records["date"] = bars.index.values.astype("datetime64[D]")
+        for column in BAR_COLUMNS.values():
+            records[column] = bars[column].to_numpy()
+        return records
+
+
+class PriceHistoryDownloader:
+    """
+    A class that downloads daily OHLCV bars in multi-symbol batches and stores them incrementally.
+
+    The bars are split and dividend adjusted, so a corporate action rescales all bars before it. A ticker
+    whose new bars contain a split is therefore backfilled again instead of appended to. For a dividend, which
+    most tickers pay regularly, the stored bars are rescaled by the adjustment factor instead. Both keep the
+    stored bars on one scale.
+
+    Parameters
+    ----------
+    tickers : list
+        The list of tickers to download bars for.
+    store : PriceStore
+        The store the bars are appended to.
+    backfill_start : str
+        The first date downloaded for tickers without stored bars.
+
+    Attributes
+    ----------
+    tickers : list
+        The list of tickers to download bars for.
+    store : PriceStore
+        The store the bars are appended to.
+    backfill_start : pd.Timestamp
+        The first date downloaded for tickers without stored bars.
+
+    Methods
+    -------
+    get_batch(batch, start, retries=3)
+        Downloads the bars for a batch of tickers starting at the given date.
+    download_data_by_batches(batch_size=100, sleep_time=2.5)
+        Downloads the missing bars for all tickers batch by batch.
+    compute_metrics(window=TRADING_DAYS)
+        Computes the derived price metrics for all tickers.
+    save_metrics(price_metrics)
+        Saves the price metrics to the current data directory.
+    """
+
+    def __init__(self, tickers, store=None, backfill_start=(pd.Timestamp.now() - pd.DateOffset(years=5)).strftime("%Y-%m-%d")):
+        self.tickers = tickers
+        self.store = store or PriceStore()
+        self.backfill_start = pd.Timestamp(backfill_start)
+
+    async def get_batch(self, batch, start, retries=3):
+        """
+        Downloads the bars for a batch of tickers starting at the given date.
+
+        Parameters
+        ----------
+        batch : list
+            The tickers to download.
+        start : pd.Timestamp
+            The first date to download.
+        retries : int
+            The number of attempts before the batch is skipped.
+
+        Returns
+        -------
+        dict
+            The bars per ticker, each a DataFrame indexed by date with the BAR_COLUMNS and ACTION_COLUMNS values as columns.
+        """
+        for attempt in range(1, retries + 1):
+            try:
+                data = yf.download(batch, start=start.strftime("%Y-%m-%d"), group_by="ticker", auto_adjust=True, actions=True, progress=False, threads=True)
+                break
+            except Exception as E:
+                logger.error(f"Price download failed for {batch[0]}..{batch[-1]} (attempt {attempt}/{retries}): {E}")
+                if attempt < retries:
+                    metrics.inc("retries_total", stage="price_history")
+                    await asyncio.sleep(2**attempt)
+        else:
+            return {}
+
+        bars = {}
+        for ticker in batch:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                ticker_data = data[ticker]
+            else:
+                ticker_data = data
+            columns = list(BAR_COLUMNS) + [column for column in ACTION_COLUMNS if column in ticker_data]
+            bars[ticker] = ticker_data[columns].rename(columns={**BAR_COLUMNS, **ACTION_COLUMNS})
+        return bars
+
+    @staticmethod
+    def _has_action(bars, action) -> bool:
+        return action in bars and bool((bars[action].fillna(0) != 0).any())
+
+    @staticmethod
+    def _dividend_factor(bars, last_close) -> float:
+        """
+        Returns the factor the bars before the dividends among the new bars were adjusted by, the product of
+        1 - dividend / unadjusted close before the ex-date. The last stored close is unadjusted, and a new bar
+        before the ex-date is adjusted for the dividend, so its unadjusted close is the adjusted one plus the
+        dividend.
+        """
+        closes = bars["close"].to_numpy(dtype=np.float64)
+        dividends = bars["dividends"].fillna(0).to_numpy(dtype=np.float64)
+        factor = 1.0
+        for i in np.flatnonzero(dividends):
+            previous_close = closes[i - 1] + dividends[i] if i > 0 else last_close
+            factor *= 1 - dividends[i] / previous_close
+        return factor
+
+    async def download_data_by_batches(self, batch_size=100, sleep_time=2.5):
+        """
+        Downloads the missing bars for all tickers batch by batch. Tickers are grouped by the date their
+        download has to start at, so a nightly run only requests the bars since the last stored one and a
+        full backfill holds a single batch in memory at a time.
+
+        Parameters
+        ----------
+        batch_size : int
+            The number of tickers per request.
+        sleep_time : int
+            The time to sleep between each batch.
+        """
+
+        logger.info(f"Downloading price history by batches with batch size {batch_size}")
+        starts = {}
+        for ticker in self.tickers:
+            last_date = self.store.last_date(ticker)
+            start = self.backfill_start if last_date is None else last_date + pd.Timedelta(days=1)
+            starts.setdefault(start, []).append(ticker)
+
+        appended = 0
+        backfill = []
+        for start, tickers in sorted(starts.items()):
+            if start > pd.Timestamp.now().normalize():
+                continue
+            for i in range(0, len(tickers), batch_size):
+                batch = tickers[i : i + batch_size]
+                for ticker, bars in (await self.get_batch(batch, start)).items():
+                    bars = bars.dropna(subset=["close"]).sort_index()
+                    if start != self.backfill_start and self._has_action(bars, "splits"):
+                        backfill.append(ticker)
+                        continue
+                    if start != self.backfill_start and self._has_action(bars, "dividends"):
+                        self.store.rescale(ticker, self._dividend_factor(bars, float(self.store.read(ticker)["close"][-1])))
+                        metrics.inc("price_rescales_total")
+                    appended += self.store.append(ticker, bars)
+                await asyncio.sleep(sleep_time)
+        logger.info(f"Appended {appended} price bars")
+
+        if backfill:
+            logger.info(f"Backfilling {len(backfill)} tickers again after a split")
+            metrics.inc("price_backfills_total", len(backfill))
+        for i in range(0, len(backfill), batch_size):
+            for ticker, bars in (await self.get_batch(backfill[i : i + batch_size], self.backfill_start)).items():
+                self.store.replace(ticker, bars)
+            await asyncio.sleep(sleep_time)
+
+    def compute_metrics(self, window=TRADING_DAYS) -> pd.DataFrame:
+        """
+        Computes the derived price metrics for all tickers over the last window trading days: 1M/3M/1Y returns,
+        annualized volatility and the correlation of daily returns with the equal-weighted universe return.
+
+        Parameters
+        ----------
+        window : int
+            The number of trading days the metrics are computed over.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per ticker with stored bars.
+        """
+        tails = {ticker: self.store.read(ticker)[-(window + 1) :] for ticker in self.tickers}
+        tails = {ticker: bars for ticker, bars in tails.items() if len(bars) > 1}
+        if not tails:
+            return pd.DataFrame([])
+
+        # align all tickers on the most recent window + 1 trading dates of the universe
+        dates = np.unique(np.concatenate([bars["date"] for bars in tails.values()]))[-(window + 1) :]
+        closes = np.full((len(dates), len(tails)), np.nan, dtype=np.float64)
+        for column, bars in enumerate(tails.values()):
+            bars = bars[bars["date"] >= dates[0]]
+            closes[np.searchsorted(dates, bars["date"]), column] = bars["close"]
+
+        def period_return(days):
+            days = min(days, len(dates) - 1)
+            return closes[-1] / closes[-(days + 1)] - 1
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.log(closes[1:] / closes[:-1])
+            has_return = ~np.isnan(returns)
+            market = np.where(has_return, returns, 0.0).sum(axis=1) / has_return.sum(axis=1)
+
+            valid = has_return & ~np.isnan(market)[:, None]
+            count = valid.sum(axis=0)
+            ticker_mean = np.where(valid, returns, 0.0).sum(axis=0) / count
+            market_mean = np.where(valid, market[:, None], 0.0).sum(axis=0) / count
+            ticker_dev = np.where(valid, returns - ticker_mean, 0.0)
+            market_dev = np.where(valid, market[:, None] - market_mean, 0.0)
+            correlation = (ticker_dev * market_dev).sum(axis=0) / np.sqrt((ticker_dev**2).sum(axis=0) * (market_dev**2).sum(axis=0))
+            volatility = np.sqrt((ticker_dev**2).sum(axis=0) / (count - 1)) * np.sqrt(TRADING_DAYS)
+
+        price_metrics = pd.DataFrame(
+            {
+                "ticker": list(tails),
+                "return1M": period_return(21),
+                "return3M": period_return(63),
+                "return1Y": period_return(window),
+                "volatility1Y": volatility,
+                "marketCorrelation1Y": correlation,
+                "lastPriceDate": [str(bars["date"][-1]) for bars in tails.values()],
+            }
+        )
+        return price_metrics.replace([np.inf, -np.inf], np.nan)
+
+    async def save_metrics(self, price_metrics):
+        """
+        Saves the price metrics to the current data directory.
+        """
+        current_date = pd.Timestamp.now().strftime("%Y-%m-%d")
+        file_path = DATA_DIR / f"data_{current_date}" / "price_metrics.csv"
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        price_metrics.to_csv(file_path, index=False)
+        logger.info(f"Saved data to {file_path}")
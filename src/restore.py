@@ -0,0 +1,30 @@
+import argparse
+import sys
+
+from db.artifact import GraphArtifact, graph_is_empty
+from db.connection import memgraph
+from db.index_planner import IndexPlanner
+from utils import setup_custom_logger
+
+logger = setup_custom_logger(__name__)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Restore the graph from the artifact exported after the last successful upload")
+    parser.add_argument("--if-empty", action="store_true", help="only restore if the graph has no nodes, e.g. after Memgraph restarted")
+    parser.add_argument("--check-fresh", action="store_true", help="do not restore, exit with status 0 if the graph holds the snapshot of the last scheduled run and 1 otherwise")
+    args = parser.parse_args()
+
+    artifact = GraphArtifact()
+    if args.check_fresh:
+        fresh = artifact.is_fresh() and not graph_is_empty(memgraph)
+        logger.info(f"The graph {'holds' if fresh else 'does not hold'} the snapshot of the last scheduled run")
+        sys.exit(0 if fresh else 1)
+
+    if artifact.manifest() is None:
+        logger.info(f"No graph artifact in {artifact.path}, nothing to restore")
+    elif args.if_empty and not graph_is_empty(memgraph):
+        logger.info("The graph is not empty, skipping the restore")
+    else:
+        with IndexPlanner(memgraph).bulk_load():
+            artifact.restore(memgraph)
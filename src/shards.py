@@ -0,0 +1,136 @@
+import asyncio
+import subprocess
+import sys
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from download import AsyncDataDownloader
+from metrics import metrics
+from price_history import PriceHistoryDownloader
+from utils import DATA_DIR, setup_custom_logger
+
+logger = setup_custom_logger(__name__)
+
+# the files every shard writes to its part directory, merged into the snapshot files of the same name. The price
+# metrics are not among them, they are computed over all tickers after the merge
+PART_FILES = ("ticker_info.csv", "insider_holder.csv", "mutual_fund.csv", "institution.csv", "insider_transaction.csv", "news.csv")
+DONE_MARKER = "_DONE"
+
+
+def shard_of(ticker, shard_count) -> int:
+    """
+    Returns the shard of the ticker. The CRC32 of the symbol is stable across processes, hosts and Python
+    versions, unlike hash(), so every worker computes the same partition.
+    """
+    return zlib.crc32(ticker.encode()) % shard_count
+
+
+def shard_tickers(tickers, shard_index, shard_count) -> list:
+    """
+    Returns the tickers of the given shard, in their original order.
+    """
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"Shard index {shard_index} is not in [0, {shard_count})")
+    return [ticker for ticker in tickers if shard_of(ticker, shard_count) == shard_index]
+
+
+class ShardedRun:
+
+    """
+    Splits a run over shard_count workers. Every worker downloads a hash partition of the tickers into its
+    own part directory, data_YYYY-MM-DD/parts/<index>-of-<count>, and marks it done when it has finished.
+    Once all parts are done, merge combines them into the snapshot files, which are then processed and
+    uploaded as in a single-process run. The workers only share the per-ticker price files and read the
+    seen-news index, so they can run as processes, containers or on hosts sharing the data directory.
+
+    Parameters
+    ----------
+    tickers : list
+        The list of all tickers, the same for every worker.
+    shard_count : int
+        The number of shards.
+    data_path : Path
+        The snapshot directory, the one of the current date by default.
+
+    Methods
+    -------
+    part_path(shard_index)
+        Returns the part directory of the shard.
+    download_shard(shard_index)
+        Downloads the data of the shard into its part directory.
+    run_local_workers()
+        Downloads all shards in parallel local worker processes.
+    merge()
+        Merges the part files of all shards into the snapshot.
+    """
+
+    def __init__(self, tickers, shard_count, data_path=None):
+        if shard_count < 1:
+            raise ValueError(f"Shard count must be positive, got {shard_count}")
+        self.tickers = tickers
+        self.shard_count = shard_count
+        self.data_path = data_path or DATA_DIR / f"data_{pd.Timestamp.now().strftime('%Y-%m-%d')}"
+
+    def part_path(self, shard_index) -> Path:
+        return self.data_path / "parts" / f"{shard_index}-of-{self.shard_count}"
+
+    def download_shard(self, shard_index):
+        """
+        Downloads the data and price history of the shard into its part directory and marks it done. The price
+        history goes to the shared price store.
+        """
+        tickers = shard_tickers(self.tickers, shard_index, self.shard_count)
+        part_path = self.part_path(shard_index)
+        part_path.mkdir(parents=True, exist_ok=True)
+        (part_path / DONE_MARKER).unlink(missing_ok=True)
+        logger.info(f"Downloading shard {shard_index} of {self.shard_count} with {len(tickers)} tickers into {part_path}")
+        with metrics.timer("download"):
+            downloader = AsyncDataDownloader(tickers, data_path=part_path)
+            asyncio.get_event_loop().run_until_complete(downloader.download_data_by_chunks())
+        with metrics.timer("price_history"):
+            asyncio.get_event_loop().run_until_complete(PriceHistoryDownloader(tickers).download_data_by_batches())
+        (part_path / DONE_MARKER).write_text(pd.Timestamp.now().isoformat())
+        logger.info(f"Shard {shard_index} of {self.shard_count} downloaded")
+
+    def run_local_workers(self):
+        """
+        Downloads all shards in parallel, each in a worker process running main.py --shard-index, the same
+        command a worker container runs.
+        """
+        main = Path(__file__).resolve().parent / "main.py"
+        workers = [subprocess.Popen([sys.executable, str(main), "--shard-index", str(shard_index), "--shard-count", str(self.shard_count)]) for shard_index in range(self.shard_count)]
+        failed = [shard_index for shard_index, worker in enumerate(workers) if worker.wait() != 0]
+        if failed:
+            logger.error(f"Shard workers {failed} failed")
+            raise RuntimeError(f"Shard workers {failed} failed")
+
+    @staticmethod
+    def _read_part(file_path) -> pd.DataFrame:
+        try:
+            return pd.read_csv(file_path)
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            return pd.DataFrame()
+
+    def merge(self):
+        """
+        Merges the part files of all shards into the snapshot files. The rows are ordered by the ticker order,
+        as a single-process run writes them.
+        """
+        missing = [shard_index for shard_index in range(self.shard_count) if not (self.part_path(shard_index) / DONE_MARKER).exists()]
+        if missing:
+            logger.error(f"Shards {missing} of {self.shard_count} are not downloaded")
+            raise FileNotFoundError(f"Shards {missing} of {self.shard_count} are not downloaded")
+
+        position = {ticker: i for i, ticker in enumerate(self.tickers)}
+        for file_name in PART_FILES:
+            with metrics.timer(f"merge_{file_name}"):
+                parts = [self._read_part(self.part_path(shard_index) / file_name) for shard_index in range(self.shard_count)]
+                data = pd.concat(parts, ignore_index=True)
+                if "ticker" in data:
+                    data = data.iloc[np.argsort(data["ticker"].map(position).fillna(len(position)).to_numpy(), kind="stable")]
+                data.to_csv(self.data_path / file_name, index=False)
+                metrics.add_rows(len(data))
+            logger.info(f"Merged {len(data)} rows of {self.shard_count} shards into {self.data_path / file_name}")
@@ -0,0 +1,389 @@
+import numpy as np
+import pandas as pd
+
+from utils import DATA_DIR, setup_custom_logger
+
+logger = setup_custom_logger(__name__)
+
+
+class CSRAdjacency:
+    """
+    The adjacency of one relationship type in compressed sparse row form, indexed in both directions.
+
+    Parameters
+    ----------
+    src : np.ndarray
+        The integer id of the start node of each edge.
+    dst : np.ndarray
+        The integer id of the end node of each edge.
+    num_src : int
+        The number of nodes with the start label.
+    num_dst : int
+        The number of nodes with the end label.
+    properties : dict
+        The edge property columns, aligned with src and dst.
+
+    Attributes
+    ----------
+    indptr, indices : np.ndarray
+        The outgoing edges of node i are indices[indptr[i]:indptr[i + 1]].
+    rev_indptr, rev_indices : np.ndarray
+        The incoming edges of node j are rev_indices[rev_indptr[j]:rev_indptr[j + 1]].
+    rev_edges : np.ndarray
+        The position in the outgoing arrays of every incoming edge, to look up its properties.
+    properties : dict
+        The edge property columns in outgoing edge order.
+    """
+
+    def __init__(self, src, dst, num_src, num_dst, properties=None):
+        order = np.lexsort((dst, src))
+        self.indptr = self._indptr(src, num_src)
+        self.indices = dst[order]
+        self.properties = {name: np.asarray(values)[order] for name, values in (properties or {}).items()}
+
+        position = np.empty(len(order), dtype=np.int64)
+        position[order] = np.arange(len(order))
+        rev_order = np.lexsort((src, dst))
+        self.rev_indptr = self._indptr(dst, num_dst)
+        self.rev_indices = src[rev_order]
+        self.rev_edges = position[rev_order]
+
+    @staticmethod
+    def _indptr(ids, num_nodes):
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ids, minlength=num_nodes), out=indptr[1:])
+        return indptr
+
+    def arrays(self, direction="out"):
+        """Returns the (indptr, indices) pair for the given direction ("out" or "in")."""
+        return (self.indptr, self.indices) if direction == "out" else (self.rev_indptr, self.rev_indices)
+
+    def gather(self, nodes, direction="out"):
+        """
+        Returns the neighbors of all given nodes concatenated, together with the source node of each entry.
+
+        Parameters
+        ----------
+        nodes : np.ndarray
+            The integer node ids.
+        direction : str
+            "out" to follow edges from start to end node, "in" for the reverse.
+
+        Returns
+        -------
+        tuple
+            The neighbor ids and, aligned with them, the node id they were reached from.
+        """
+        indptr, indices = self.arrays(direction)
+        nodes = np.asarray(nodes, dtype=np.int64)
+        starts, lengths = indptr[nodes], indptr[nodes + 1] - indptr[nodes]
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        positions = np.arange(lengths.sum()) + offsets
+        return indices[positions], np.repeat(nodes, lengths)
+
+
+class SnapshotGraph:
+    """
+    An in-process, read-only graph built from one data_YYYY-MM-DD snapshot, following the schema of db/models.py.
+
+    Nodes of each label get dense integer ids, relationships are stored as CSRAdjacency arrays per type and
+    node and edge properties as NumPy columns, so whole-universe analytics run vectorized without a database.
+
+    Parameters
+    ----------
+    nodes : dict
+        The keys of the nodes per label; the position of a key is the node id.
+    node_properties : dict
+        The property columns per label, aligned with the node keys.
+    adjacency : dict
+        The CSRAdjacency per relationship type.
+
+    Methods
+    -------
+    from_snapshot(data_path)
+        Builds the graph from the CSV files of a snapshot.
+    index_of(label, key)
+        Returns the node id of the node with the given key.
+    neighbors(relationship, label, key, direction="out")
+        Returns the keys of the neighbors of a node.
+    degree(relationship, direction="out")
+        Returns the degree of every node.
+    k_hop(label, key, k, relationships=None)
+        Returns all nodes reachable within k hops, ignoring edge direction.
+    aggregate(relationship, prop, by="dst", func="sum")
+        Aggregates an edge property per start or end node.
+    holder_overlap(ticker_a, ticker_b, relationships=("HOLDS_IT", "HOLDS_MT"))
+        Returns the holders shared by two tickers.
+    ownership_concentration(relationship="HOLDS_IT")
+        Returns the Herfindahl index of the holders' pctHeld per ticker.
+    """
+
+    # relationship type -> (start label, end label)
+    RELATIONSHIPS = {
+        "HOLDS_IT": ("Institution", "Ticker"),
+        "HOLDS_MT": ("MutualFund", "Ticker"),
+        "HOLDS_IHT": ("Ticker", "InsiderHolder"),
+        "CREATED": ("InsiderHolder", "InsiderTransaction"),
+        "INVOLVES": ("InsiderTransaction", "Ticker"),
+        "ABOUT_NT": ("News", "Ticker"),
+    }
+
+    def __init__(self, nodes, node_properties, adjacency):
+        self.nodes = nodes
+        self.node_properties = node_properties
+        self.adjacency = adjacency
+        self._ids = {label: pd.Index(keys) for label, keys in nodes.items()}
+
+    @staticmethod
+    def _read(file_path) -> pd.DataFrame:
+        try:
+            return pd.read_csv(file_path)
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            return pd.DataFrame([])
+
+    @classmethod
+    def from_snapshot(cls, data_path=DATA_DIR / f"data_{pd.Timestamp.now().strftime('%Y-%m-%d')}"):
+        """
+        Builds the graph from the CSV files of a snapshot.
+
+        Parameters
+        ----------
+        data_path : Path
+            The snapshot directory.
+
+        Returns
+        -------
+        SnapshotGraph
+            The graph of the snapshot.
+        """
+        ticker_info = cls._read(data_path / "ticker_info.csv")
+        institution = cls._read(data_path / "institution.csv")
+        mutual_fund = cls._read(data_path / "mutual_fund.csv")
+        insider_holder = cls._read(data_path / "insider_holder.csv")
+        insider_transaction = cls._read(data_path / "insider_transaction.csv")
+        news = cls._read(data_path / "news.csv")
+
+        def column(data, name):
+            return data[name] if name in data else pd.Series([], dtype=object)
+
+        # every ticker referenced by a relationship gets a node, listed tickers first
+        tickers = pd.unique(pd.concat([column(data, "ticker") for data in [ticker_info, institution, mutual_fund, insider_holder, insider_transaction, news]]).dropna())
+        nodes = {
+            "Ticker": tickers,
+            "Institution": pd.unique(column(institution, "name").dropna()),
+            "MutualFund": pd.unique(column(mutual_fund, "name").dropna()),
+            "InsiderHolder": pd.unique(pd.concat([column(insider_holder, "name"), column(insider_transaction, "name")]).dropna()),
+            "InsiderTransaction": np.arange(len(insider_transaction)),
+            "News": pd.unique(column(news, "uuid").dropna()),
+        }
+        ids = {label: pd.Index(keys) for label, keys in nodes.items()}
+
+        node_properties = {label: {} for label in nodes}
+        if not ticker_info.empty:
+            ticker_info = ticker_info.drop_duplicates("ticker").set_index("ticker").reindex(tickers)
+            node_properties["Ticker"] = {name: ticker_info[name].to_numpy() for name in ticker_info.columns}
+        if not insider_transaction.empty:
+            node_properties["InsiderTransaction"] = {name: insider_transaction[name].to_numpy() for name in insider_transaction.columns}
+        if not news.empty:
+            news_nodes = news.drop_duplicates("uuid").set_index("uuid").reindex(nodes["News"])
+            node_properties["News"] = {name: news_nodes[name].to_numpy() for name in news_nodes.columns if name != "ticker"}
+
+        def edges(data, src_label, src_column, dst_label, dst_column, properties=()):
+            if data.empty:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), {name: np.empty(0) for name in properties}
+            src = ids[src_label].get_indexer(data[src_column]) if src_column else np.arange(len(data))
+            dst = ids[dst_label].get_indexer(data[dst_column]) if dst_column else np.arange(len(data))
+            keep = (src >= 0) & (dst >= 0)
+            return src[keep], dst[keep], {name: pd.to_numeric(data[name], errors="coerce").to_numpy()[keep] for name in properties if name in data}
+
+        holding = ("shares", "pctHeld", "value")
+        edge_lists = {
+            "HOLDS_IT": edges(institution, "Institution", "name", "Ticker", "ticker", holding),
+            "HOLDS_MT": edges(mutual_fund, "MutualFund", "name", "Ticker", "ticker", holding),
+            "HOLDS_IHT": edges(insider_holder, "Ticker", "ticker", "InsiderHolder", "name", ("sharesOwnedDirectly", "sharesOwnedIndirectly")),
+            "CREATED": edges(insider_transaction, "InsiderHolder", "name", "InsiderTransaction", None),
+            "INVOLVES": edges(insider_transaction, "InsiderTransaction", None, "Ticker", "ticker"),
+            "ABOUT_NT": edges(news.drop_duplicates(["uuid", "ticker"]) if not news.empty else news, "News", "uuid", "Ticker", "ticker"),
+        }
+        adjacency = {}
+        for relationship, (src, dst, properties) in edge_lists.items():
+            src_label, dst_label = cls.RELATIONSHIPS[relationship]
+            adjacency[relationship] = CSRAdjacency(src, dst, len(nodes[src_label]), len(nodes[dst_label]), properties)
+
+        logger.info(f"Built snapshot graph from {data_path}: " + ", ".join(f"{label}={len(keys)}" for label, keys in nodes.items()))
+        return cls(nodes, node_properties, adjacency)
+
+    def index_of(self, label, key) -> int:
+        """
+        Returns the node id of the node with the given key.
+
+        Raises
+        ------
+        KeyError
+            If there is no such node.
+        """
+        return self._ids[label].get_loc(key)
+
+    def neighbors(self, relationship, label, key, direction="out") -> np.ndarray:
+        """
+        Returns the keys of the neighbors of a node.
+
+        Parameters
+        ----------
+        relationship : str
+            The relationship type.
+        label : str
+            The label of the node, the start label for direction "out" and the end label for "in".
+        key : str
+            The key of the node.
+        direction : str
+            "out" to follow edges from start to end node, "in" for the reverse.
+
+        Returns
+        -------
+        np.ndarray
+            The keys of the neighbors.
+        """
+        src_label, dst_label = self.RELATIONSHIPS[relationship]
+        neighbor_label = dst_label if direction == "out" else src_label
+        neighbor_ids, _ = self.adjacency[relationship].gather([self.index_of(label, key)], direction)
+        return np.asarray(self.nodes[neighbor_label])[neighbor_ids]
+
+    def degree(self, relationship, direction="out") -> pd.Series:
+        """
+        Returns the degree of every node, indexed by node key.
+
+        Parameters
+        ----------
+        relationship : str
+            The relationship type.
+        direction : str
+            "out" for the out-degree of the start nodes, "in" for the in-degree of the end nodes.
+        """
+        src_label, dst_label = self.RELATIONSHIPS[relationship]
+        indptr, _ = self.adjacency[relationship].arrays(direction)
+        return pd.Series(np.diff(indptr), index=self.nodes[src_label if direction == "out" else dst_label])
+
+    def k_hop(self, label, key, k, relationships=None) -> dict:
+        """
+        Returns all nodes reachable within k hops, ignoring edge direction.
+
+        Parameters
+        ----------
+        label : str
+            The label of the start node.
+        key : str
+            The key of the start node.
+        k : int
+            The maximum number of hops.
+        relationships : list, optional
+            The relationship types to follow, all by default.
+
+        Returns
+        -------
+        dict
+            The keys of the reached nodes per label, excluding the start node.
+        """
+        relationships = relationships or list(self.RELATIONSHIPS)
+        visited = {name: np.zeros(len(keys), dtype=bool) for name, keys in self.nodes.items()}
+        start = self.index_of(label, key)
+        visited[label][start] = True
+        frontier = {label: np.array([start])}
+
+        for _ in range(k):
+            reached = {}
+            for relationship in relationships:
+                src_label, dst_label = self.RELATIONSHIPS[relationship]
+                for from_label, to_label, direction in [(src_label, dst_label, "out"), (dst_label, src_label, "in")]:
+                    if len(frontier.get(from_label, [])):
+                        neighbor_ids, _ = self.adjacency[relationship].gather(frontier[from_label], direction)
+                        reached.setdefault(to_label, []).append(neighbor_ids)
+            frontier = {}
+            for to_label, found in reached.items():
+                found = np.unique(np.concatenate(found))
+                found = found[~visited[to_label][found]]
+                visited[to_label][found] = True
+                frontier[to_label] = found
+            if not frontier:
+                break
+
+        visited[label][start] = False
+        return {name: np.asarray(self.nodes[name])[mask] for name, mask in visited.items() if mask.any()}
+
+    def aggregate(self, relationship, prop, by="dst", func="sum") -> pd.Series:
+        """
+        Aggregates an edge property per start or end node.
+
+        Parameters
+        ----------
+        relationship : str
+            The relationship type.
+        prop : str
+            The edge property to aggregate; missing values are ignored.
+        by : str
+            "src" to aggregate per start node, "dst" per end node.
+        func : str
+            One of "sum", "mean", "max", "min" or "count".
+
+        Returns
+        -------
+        pd.Series
+            The aggregate per node key, NaN for nodes without values ("count" and "sum" give 0).
+        """
+        adjacency = self.adjacency[relationship]
+        src_label, dst_label = self.RELATIONSHIPS[relationship]
+        if by == "src":
+            indptr, values, keys = adjacency.indptr, adjacency.properties[prop], self.nodes[src_label]
+        else:
+            indptr, values, keys = adjacency.rev_indptr, adjacency.properties[prop][adjacency.rev_edges], self.nodes[dst_label]
+
+        groups = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        valid = ~np.isnan(values)
+        groups, values = groups[valid], values[valid]
+        counts = np.bincount(groups, minlength=len(keys)).astype(np.float64)
+        if func == "count":
+            result = counts
+        elif func in ("sum", "mean"):
+            result = np.bincount(groups, weights=values, minlength=len(keys))
+            if func == "mean":
+                with np.errstate(invalid="ignore"):
+                    result = result / counts
+        elif func in ("max", "min"):
+            result = np.full(len(keys), -np.inf if func == "max" else np.inf)
+            (np.maximum if func == "max" else np.minimum).at(result, groups, values)
+            result[counts == 0] = np.nan
+        else:
+            raise ValueError(f"Unknown aggregation {func}")
+        return pd.Series(result, index=keys)
+
+    def holder_overlap(self, ticker_a, ticker_b, relationships=("HOLDS_IT", "HOLDS_MT")) -> dict:
+        """
+        Returns the holders shared by two tickers.
+
+        Parameters
+        ----------
+        ticker_a, ticker_b : str
+            The tickers to compare.
+        relationships : tuple
+            The holding relationship types to compare.
+
+        Returns
+        -------
+        dict
+            The keys of the shared holders per relationship type.
+        """
+        return {relationship: np.intersect1d(self.neighbors(relationship, "Ticker", ticker_a, "in"), self.neighbors(relationship, "Ticker", ticker_b, "in")) for relationship in relationships}
+
+    def ownership_concentration(self, relationship="HOLDS_IT") -> pd.Series:
+        """
+        Returns the Herfindahl index of the holders' pctHeld per ticker (sum of squared stakes).
+
+        Parameters
+        ----------
+        relationship : str
+            The holding relationship type, HOLDS_IT or HOLDS_MT.
+        """
+        adjacency = self.adjacency[relationship]
+        squared = np.nan_to_num(adjacency.properties["pctHeld"][adjacency.rev_edges]) ** 2
+        groups = np.repeat(np.arange(len(adjacency.rev_indptr) - 1), np.diff(adjacency.rev_indptr))
+        return pd.Series(np.bincount(groups, weights=squared, minlength=len(self.nodes["Ticker"])), index=self.nodes["Ticker"])
@@ -1,12 +1,26 @@
-from datetime import datetime
+import re
 
 import pandas as pd
 import yfinance as yf
 
+from metrics import metrics
 from utils import setup_custom_logger
 
 logger = setup_custom_logger(__name__)
 
+# news column -> path of the field in a yfinance news item
+NEWS_FIELDS = {
+    "uuid": "id",
+    "title": "content.title",
+    "publisher": "content.provider.displayName",
+    "link": "content.canonicalUrl.url",
+    "providerPublishTime": "content.pubDate",
+    "summary": "content.summary",
+    "description": "content.description",
+    "ticker": "ticker",
+}
+NEWS_PATHS = {column: tuple(path.split(".")) for column, path in NEWS_FIELDS.items()}
+
 
 class TickerHandler(yf.Ticker):
     """
@@ -38,8 +52,12 @@ class TickerHandler(yf.Ticker):
         Prepares the insider transactions information.
     prepare_insider_roster_holders()
         Prepares the insider roster holders information.
-    prepare_news()
+    prepare_news(seen_news=None)
         Prepares news data.
+    prepare_news_items(seen_news=None)
+        Returns the raw news items still to be parsed.
+    parse_news(feed)
+        Parses news items into a DataFrame.
     clean_name(name)
         Cleans the given name by removing titles and degrees and converting it to uppercase.
     count_number_of_shared_letters_ratio(name1, name2)
@@ -62,7 +80,7 @@ class TickerHandler(yf.Ticker):
         try:
             info.pop("companyOfficers")
         except Exception as E:
-            logger.info("no companyOfficers", E)
+            logger.info(f"no companyOfficers: {E}")
         # TODO: Include company officers. Map them maybe?
         # officers = info.pop('companyOfficers')
         # officers = pd.DataFrame(officers)
@@ -87,7 +105,8 @@ class TickerHandler(yf.Ticker):
             major_holders = major_holders.infer_objects(copy=False).fillna("")
             return major_holders
         except Exception as E:
-            logger.error("No major_holders found for: ", self.ticker, " with exception: ", E)
+            metrics.inc("fetch_errors_total", dataset="major_holders")
+            logger.error(f"No major_holders found for: {self.ticker} with exception: {E}")
             return pd.DataFrame([])
 
     def prepare_insider_purchases(self) -> pd.DataFrame:
@@ -110,7 +129,8 @@ class TickerHandler(yf.Ticker):
             insider_purchases = insider_purchases.infer_objects(copy=False).fillna("")
             return insider_purchases
         except Exception as E:
-            logger.error("No insider_transactions found for: ", self.ticker, " with exception: ", E)
+            metrics.inc("fetch_errors_total", dataset="insider_purchases")
+            logger.error(f"No insider_transactions found for: {self.ticker} with exception: {E}")
             return pd.DataFrame([])
 
     def prepare_institutional_holders(self) -> pd.DataFrame:
@@ -128,7 +148,8 @@ class TickerHandler(yf.Ticker):
             institutional_holders.columns = ["dateReported", "name", "pctHeld", "shares", "value", "pctChange"]
             return institutional_holders
         except Exception as E:
-            logger.error("No institutional_holders found for: ", self.ticker, " with exception: ", E)
+            metrics.inc("fetch_errors_total", dataset="institutional_holders")
+            logger.error(f"No institutional_holders found for: {self.ticker} with exception: {E}")
             return pd.DataFrame([])
 
     def prepare_mutualfund_holders(self) -> pd.DataFrame:
@@ -146,7 +167,8 @@ class TickerHandler(yf.Ticker):
             mutualfund_holders.columns = ["dateReported", "name", "pctHeld", "shares", "value", "pctChange"]
             return mutualfund_holders
         except Exception as E:
-            logger.error("No mutualfund_holders found for: ", self.ticker, " with exception: ", E)
+            metrics.inc("fetch_errors_total", dataset="mutualfund_holders")
+            logger.error(f"No mutualfund_holders found for: {self.ticker} with exception: {E}")
             return pd.DataFrame([])
 
     def prepare_insider_transactions(self) -> pd.DataFrame:
@@ -163,7 +185,8 @@ class TickerHandler(yf.Ticker):
             insider_transactions.columns = ["shares", "value", "url", "transaction_text", "name", "position", "transaction", "startDate", "ownership"]
             return insider_transactions
         except Exception as E:
-            logger.error("No insider_transactions found for: ", self.ticker, " with exception: ", E)
+            metrics.inc("fetch_errors_total", dataset="insider_transactions")
+            logger.error(f"No insider_transactions found for: {self.ticker} with exception: {E}")
             return pd.DataFrame([])
 
     def prepare_insider_roster_holders(self) -> pd.DataFrame:
@@ -193,80 +216,86 @@ class TickerHandler(yf.Ticker):
                 return pd.DataFrame([])
 
         except Exception as E:
-            logger.error("No insider_roster_holders found for: ", self.ticker, " with exception: ", E)
+            metrics.inc("fetch_errors_total", dataset="insider_roster_holders")
+            logger.error(f"No insider_roster_holders found for: {self.ticker} with exception: {E}")
             return pd.DataFrame([])
 
-    def prepare_news(self):
+    def prepare_news(self, seen_news=None):
         """
         Preates the news information for a given ticker.
 
+        Parameters
+        ----------
+        seen_news : SeenNewsIndex
+            The index of the news already loaded, see prepare_news_items.
+
         Returns
         -------
         pd.DataFrame
             News the news information for a given ticker.
         """
+        return self.parse_news(self.prepare_news_items(seen_news))
 
-        try:
-            parsed_news_list = []
-            fields = {
-                "uuid": "id",
-                "title": "content.title",
-                "publisher": "content.provider.displayName",
-                "link": "content.canonicalUrl.url",
-                "providerPublishTime": "content.pubDate",
-                "summary": "content.summary",
-                "description": "content.description",
-            }
-
-            def get_nested_value(data, key_path):
-                """
-                Retrieve a nested value from a dictionary using a dot-separated key path.
-
-                Args:
-                    data (dict): The dictionary to search
-                    key_path (str): Dot-separated path to the desired value
-
-                Returns:
-                    The value at the specified path, or None if not found
-                """
-                keys = key_path.split(".")
-                for key in keys:
-                    if isinstance(data, dict):
-                        data = data.get(key, {})
-                    else:
-                        return None
-                return data if data != {} else None
-
-            for news in self.news:
-                news_dict = {}
-                for key, source_key in fields.items():
-                    try:
-                        value = get_nested_value(news, source_key)
-
-                        # Convert timestamp if it's a publish time
-                        if key == "providerPublishTime" and value:
-                            try:
-                                # Parse ISO 8601 format
-                                value = datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").strftime("%Y-%m-%d %H:%M:%S")
-                            except Exception:
-                                value = None
-
-                        news_dict[key] = value
-                    except Exception:
-                        news_dict[key] = None
-
-                # Add additional useful fields
-                news_dict["content_type"] = get_nested_value(news, "content.contentType")
-                news_dict["canonical_url"] = get_nested_value(news, "content.canonicalUrl.url")
-
-                parsed_news_list.append(news_dict)
-
-            news_df = pd.DataFrame(data=parsed_news_list, columns=["uuid", "title", "publisher", "link", "providerPublishTime", "summary", "description"])
-            return news_df
+    def prepare_news_items(self, seen_news=None) -> list:
+        """
+        Returns the raw news items of the ticker that still need to be parsed, each with a ticker key, so the
+        items of many tickers can be parsed at once with parse_news.
+
+        Parameters
+        ----------
+        seen_news : SeenNewsIndex
+            The index of the news already loaded. Its articles are only returned with their uuid, their fields
+            are filled in from the index with SeenNewsIndex.complete.
 
+        Returns
+        -------
+        list
+            The news items.
+        """
+        try:
+            items = []
+            for item in self.news:
+                uuid = item.get("id")
+                if seen_news is None or not seen_news.is_seen(uuid):
+                    items.append({**item, "ticker": self.ticker})
+                else:
+                    items.append({"id": uuid, "ticker": self.ticker})
+            return items
         except Exception as E:
-            logger.error("No news found for: ", self.ticker, " with exception: ", E)
-            return pd.DataFrame([])
+            metrics.inc("fetch_errors_total", dataset="news")
+            logger.error(f"No news found for: {self.ticker} with exception: {E}")
+            return []
+
+    @staticmethod
+    @metrics.timed("parse_news")
+    def parse_news(feed) -> pd.DataFrame:
+        """
+        Parses a news feed column by column: every field is read from all items along its precompiled key
+        path, and the publish times are converted with one vectorized to_datetime.
+
+        Parameters
+        ----------
+        feed : list
+            The news items as returned by prepare_news_items, from one or several tickers.
+
+        Returns
+        -------
+        pd.DataFrame
+            The news with the NEWS_FIELDS columns, missing values as None.
+        """
+
+        def get_path(item, path):
+            for key in path:
+                if not isinstance(item, dict):
+                    return None
+                item = item.get(key)
+            return item
+
+        metrics.add_rows(len(feed))
+        news_df = pd.DataFrame({column: [get_path(item, path) for item in feed] for column, path in NEWS_PATHS.items()}, columns=list(NEWS_PATHS), dtype=object)
+        publish_time = pd.to_datetime(news_df["providerPublishTime"], format="%Y-%m-%dT%H:%M:%SZ", errors="coerce")
+        news_df["providerPublishTime"] = publish_time.dt.strftime("%Y-%m-%d %H:%M:%S").astype(object).where(publish_time.notna(), None)
+        return news_df
 
     def is_valid_ticker(self) -> bool:
         """
@@ -281,13 +310,15 @@ class TickerHandler(yf.Ticker):
             self.info
             return True
         except Exception as E:
-            logger.error("Invalid ticker: ", self.ticker, " with exception: ", E)
+            metrics.inc("fetch_errors_total", dataset="info")
+            logger.error(f"Invalid ticker: {self.ticker} with exception: {E}")
             return False
 
     @staticmethod
     def clean_name(name):
         """
-        Cleans the given name by removing titles and degrees and converting it to uppercase.
+        Cleans the given name by removing titles, degrees and punctuation and converting it to uppercase.
+        Titles are only removed as whole words, so e.g. "WILLIAMS" keeps its "MS".
 
         Parameters
         ----------
@@ -299,10 +330,8 @@ class TickerHandler(yf.Ticker):
         str
             The cleaned name.
         """
-        # Remove titles and degrees
-        for title in ["Dr.", "Ms.", "Mr.", "Ph.D.", "PhD", "MD", "MS"]:
-            name = name.replace(title, "")
-        return name.upper().strip()
+        tokens = re.sub(r"[^\w\s]", " ", name.upper().replace("PH.D.", "PHD")).split()
+        return " ".join(token for token in tokens if token not in {"DR", "MS", "MR", "MRS", "PHD", "MD"})
 
     @staticmethod
     def count_number_of_shared_letters_ratio(name1, name2):
@@ -1,32 +1,136 @@
+import atexit
 import logging
 import logging.handlers
+import os
+import queue
+import threading
 from pathlib import Path
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT_DIR / "data"
 
+# logger settings
+LOG_FILE = "logs.log"
+LOG_FILE_MAX_SIZE = 1024 * 1024 * 20  # megabytes
+LOG_NUM_BACKUPS = 3
+LOG_FORMAT = "%(asctime)s [%(levelname)s]: %(filename)s(%(funcName)s:%(lineno)s) >> %(message)s"
+# at most LOG_RATE_LIMIT warnings or errors per call site are logged every LOG_RATE_PERIOD seconds
+LOG_RATE_LIMIT = int(os.getenv("LOG_RATE_LIMIT", "20"))
+LOG_RATE_PERIOD = 60.0
+# records with this attribute set, e.g. the suppressed counts, are never limited
+RATE_LIMIT_EXEMPT = "rate_limit_exempt"
+
+_listener = None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limits repetitive warnings and errors, e.g. one per failed row, to rate records per call site and period.
+    The number of suppressed records is appended to the first record let through in the next period, and
+    the remaining counts are logged by log_suppressed. Records with the RATE_LIMIT_EXEMPT attribute set are
+    never limited.
+
+    Parameters
+    ----------
+    rate : int
+        The number of records logged per call site and period.
+    period : float
+        The length of the period in seconds.
+    level : int
+        Records below this level are never limited.
+    """
+
+    def __init__(self, rate=LOG_RATE_LIMIT, period=LOG_RATE_PERIOD, level=logging.WARNING):
+        super().__init__()
+        self.rate = rate
+        self.period = period
+        self.level = level
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record) -> bool:
+        if record.levelno < self.level or getattr(record, RATE_LIMIT_EXEMPT, False):
+            return True
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or record.created - window["start"] >= self.period:
+                suppressed = window["suppressed"] if window else 0
+                self._windows[key] = {"start": record.created, "count": 1, "suppressed": 0}
+                if suppressed:
+                    record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+                return True
+            window["count"] += 1
+            if window["count"] <= self.rate:
+                return True
+            window["suppressed"] += 1
+            return False
+
+    def log_suppressed(self):
+        """
+        Logs the number of records suppressed in the current period of every call site. The counts are logged
+        from a single call site, so they are exempt from the limit, which would suppress them otherwise.
+        """
+        with self._lock:
+            suppressed = {key: window["suppressed"] for key, window in self._windows.items() if window["suppressed"]}
+            for window in self._windows.values():
+                window["suppressed"] = 0
+        for (pathname, lineno), count in suppressed.items():
+            logging.getLogger(__name__).warning(f"{count} similar messages from {os.path.basename(pathname)}:{lineno} suppressed", extra={RATE_LIMIT_EXEMPT: True})
+
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues the records unformatted, so formatting happens on the listener thread. The records are never
+    pickled, which is what the formatting in QueueHandler.prepare is for.
+    """
+
+    def prepare(self, record):
+        return record
 
-def setup_custom_logger(name):
 
-    # logger settings
-    log_file = "logs.log"
-    log_file_max_size = 1024 * 1024 * 20  # megabytes
-    log_num_backups = 3
-    log_format = "%(asctime)s [%(levelname)s]: %(filename)s(%(funcName)s:%(lineno)s) >> %(message)s"
-    # log_date_format = "%m/%d/%Y %I:%M:%S %p"
-    log_filemode = "w"  # w: overwrite; a: append
-
-    # setup logger
-    # datefmt=log_date_format
-    logging.basicConfig(filename=log_file, format=log_format, filemode=log_filemode, level=logging.DEBUG)
-    rotate_file = logging.handlers.RotatingFileHandler(log_file, maxBytes=log_file_max_size, backupCount=log_num_backups)
-    logger = logging.getLogger(name)
-    logger.addHandler(rotate_file)
-
-    # print log messages to console
-    consoleHandler = logging.StreamHandler()
-    logFormatter = logging.Formatter(log_format)
-    consoleHandler.setFormatter(logFormatter)
-    logger.addHandler(consoleHandler)
-
-    return logger
+def _stop_listener(rate_limit):
+    rate_limit.log_suppressed()
+    _listener.stop()
+
+
+def configure_logging(level=None):
+    """
+    Configures logging once per process: the root logger enqueues the records and a QueueListener thread
+    formats them and writes them to the rotating log file and the console.
+
+    Parameters
+    ----------
+    level : str
+        The level of the root logger, the LOG_LEVEL environment variable or INFO by default.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.handlers.RotatingFileHandler(LOG_FILE, maxBytes=LOG_FILE_MAX_SIZE, backupCount=LOG_NUM_BACKUPS)
+    file_handler.setFormatter(formatter)
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    rate_limit = RateLimitFilter()
+    queue_handler = _InProcessQueueHandler(log_queue)
+    queue_handler.addFilter(rate_limit)
+
+    root = logging.getLogger()
+    root.setLevel(level or os.getenv("LOG_LEVEL", "INFO"))
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_stop_listener, rate_limit)
+
+
+def setup_custom_logger(name):
+    """
+    Returns the logger of the given module, configuring logging on the first call.
+    """
+    configure_logging()
+    return logging.getLogger(name)
@@ -0,0 +1,123 @@
+import json
+import re
+
+import pandas as pd
+import pytest
+
+from db.artifact import RESTORE_ID, GraphArtifact, last_scheduled_run
+
+
+@pytest.mark.parametrize(
+    "now, last_run",
+    [
+        ("2024-06-12 21:05", "2024-06-12 21:05"),  # Wednesday at the schedule
+        ("2024-06-12 23:00", "2024-06-12 21:05"),
+        ("2024-06-12 09:00", "2024-06-11 21:05"),  # Wednesday morning, the run of Tuesday
+        ("2024-06-15 12:00", "2024-06-14 21:05"),  # Saturday, the run of Friday
+        ("2024-06-17 08:00", "2024-06-14 21:05"),  # Monday morning, still the run of Friday
+    ],
+)
+def test_last_scheduled_run(now, last_run):
+    assert last_scheduled_run(pd.Timestamp(now)) == pd.Timestamp(last_run)
+
+
+def test_artifact_of_the_last_scheduled_run_is_fresh(tmp_path):
+    artifact = GraphArtifact(tmp_path)
+    assert not artifact.is_fresh(pd.Timestamp("2024-06-15 12:00"))
+
+    (tmp_path / "manifest.json").write_text(json.dumps({"snapshotDate": "2024-06-14"}))
+    assert artifact.is_fresh(pd.Timestamp("2024-06-15 12:00"))
+    assert artifact.is_fresh(pd.Timestamp("2024-06-17 08:00"))
+    assert not artifact.is_fresh(pd.Timestamp("2024-06-17 21:30"))
+
+
+class FakeGraph:
+    """
+    An in-memory graph answering the queries of GraphArtifact.export and restore. Any other query fails, so
+    the tests also check the generated Cypher.
+    """
+
+    def __init__(self, nodes=(), relationships=()):
+        self.nodes = {i: {"labels": list(labels), "properties": dict(properties)} for i, (labels, properties) in enumerate(nodes)}
+        self.relationships = [{"source": source, "target": target, "type": type_, "properties": dict(properties)} for source, target, type_, properties in relationships]
+        self.indexes = set()
+
+    def execute_and_fetch(self, query):
+        query = " ".join(query.split())
+        if query.startswith("MATCH (n) RETURN id(n)"):
+            return iter([{"id": i, "labels": node["labels"], "properties": node["properties"]} for i, node in self.nodes.items()])
+        if query.startswith("MATCH (a)-[r]->(b) RETURN"):
+            return iter(
+                [
+                    {"source": r["source"], "sourceLabels": self.nodes[r["source"]]["labels"], "target": r["target"], "targetLabels": self.nodes[r["target"]]["labels"], "type": r["type"], "properties": r["properties"]}
+                    for r in self.relationships
+                ]
+            )
+        raise AssertionError(f"Unexpected query: {query}")
+
+    def _find(self, label, restore_id):
+        found = [i for i, node in self.nodes.items() if node["properties"].get(RESTORE_ID) == restore_id and (not label or label in node["labels"])]
+        assert len(found) == 1
+        return found[0]
+
+    def execute(self, query, parameters=None):
+        query = " ".join(query.split())
+        rows = (parameters or {}).get("rows", [])
+        if query == "MATCH (n) DETACH DELETE n":
+            self.nodes, self.relationships = {}, []
+        elif match := re.fullmatch(rf"CREATE INDEX ON :(\w+)\({RESTORE_ID}\);", query):
+            self.indexes.add(match[1])
+        elif match := re.fullmatch(rf"DROP INDEX ON :(\w+)\({RESTORE_ID}\);", query):
+            self.indexes.remove(match[1])
+        elif match := re.fullmatch(rf"UNWIND \$rows AS row CREATE \(n((?::\w+)*)\) SET n = row.properties, n.{RESTORE_ID} = row.id", query):
+            for row in rows:
+                self.nodes[len(self.nodes)] = {"labels": match[1].split(":")[1:], "properties": {**row["properties"], RESTORE_ID: row["id"]}}
+        elif match := re.fullmatch(
+            rf"UNWIND \$rows AS row MATCH \(a(?::(\w+))? {{{RESTORE_ID}: row.source}}\), \(b(?::(\w+))? {{{RESTORE_ID}: row.target}}\) CREATE \(a\)-\[r:(\w+)\]->\(b\) SET r = row.properties", query
+        ):
+            for row in rows:
+                self.relationships.append({"source": self._find(match[1], row["source"]), "target": self._find(match[2], row["target"]), "type": match[3], "properties": row["properties"]})
+        elif match := re.fullmatch(rf"MATCH \(n(?::(\w+))?\) WHERE n.{RESTORE_ID} IS NOT NULL REMOVE n.{RESTORE_ID}", query):
+            for node in self.nodes.values():
+                if not match[1] or match[1] in node["labels"]:
+                    node["properties"].pop(RESTORE_ID, None)
+        else:
+            raise AssertionError(f"Unexpected query: {query}")
+
+    def content(self):
+        """Returns the nodes and relationships by their name property, independent of the node ids."""
+        name = {i: node["properties"]["name"] for i, node in self.nodes.items()}
+        nodes = sorted((node["properties"]["name"], tuple(node["labels"]), sorted(node["properties"].items())) for node in self.nodes.values())
+        relationships = sorted((name[r["source"]], r["type"], name[r["target"]], sorted(r["properties"].items())) for r in self.relationships)
+        return nodes, relationships
+
+
+def test_export_and_restore_round_trip(tmp_path):
+    graph = FakeGraph(
+        nodes=[
+            (["Ticker"], {"name": "AAPL", "price": 190.5}),
+            (["Ticker"], {"name": "MSFT"}),
+            (["Person", "Insider"], {"name": "Jane Doe"}),
+            (["Person"], {"name": "John Roe"}),
+            ([], {"name": "orphan"}),
+        ],
+        relationships=[
+            (2, 0, "HOLDS", {"shares": 100}),
+            (3, 1, "HOLDS", {"shares": 5}),
+            (0, 1, "CO_HELD", {}),
+            (4, 0, "MENTIONS", {"weight": 0.5}),
+        ],
+    )
+    artifact = GraphArtifact(tmp_path / "graph_artifact", batch_size=2)
+    artifact.export(graph, "2024-06-14")
+
+    manifest = artifact.manifest()
+    assert manifest["snapshotDate"] == "2024-06-14"
+    assert manifest["nodes"] == {"Ticker": 2, "Person:Insider": 1, "Person": 1, "": 1}
+    assert manifest["relationships"] == {"Person:Insider-HOLDS-Ticker": 1, "Person-HOLDS-Ticker": 1, "Ticker-CO_HELD-Ticker": 1, "-MENTIONS-Ticker": 1}
+
+    restored = FakeGraph(nodes=[(["Stale"], {"name": "stale"})])
+    assert artifact.restore(restored) == manifest
+    assert restored.content() == graph.content()
+    assert not any(RESTORE_ID in node["properties"] for node in restored.nodes.values())
+    assert restored.indexes == set()
@@ -0,0 +1,54 @@
+import pytest
+
+from entity_resolution import HolderNameResolver, InsiderNameResolver, NameResolver
+
+
+@pytest.fixture
+def resolver(tmp_path):
+    return InsiderNameResolver(cache_path=tmp_path / "insider_names.csv")
+
+
+def canonical_ids(resolver, names):
+    return resolver.resolve(names).set_index("name")["canonicalId"]
+
+
+def test_variants_of_one_insider_share_an_id(resolver):
+    ids = canonical_ids(resolver, ["Dr. John Smith", "SMITH JOHN", "John A Smith", "J A Smith"])
+    assert ids["Dr. John Smith"] == ids["SMITH JOHN"] == ids["John A Smith"]
+
+
+@pytest.mark.parametrize("name, other", [("Robert A. Williams", "Robert B. Williams"), ("SMITH JOHN A", "John B. Smith"), ("Mary K. Jones", "Mary L. Jones")])
+def test_conflicting_initials_are_different_insiders(resolver, name, other):
+    ids = canonical_ids(resolver, [name, other])
+    assert ids[name] != ids[other]
+
+
+def test_conflicting_initials_are_not_chained_through_a_name_without_initials(resolver):
+    ids = canonical_ids(resolver, ["Robert A. Williams", "Robert Williams", "Robert B. Williams"])
+    assert ids["Robert A. Williams"] != ids["Robert B. Williams"]
+
+
+def test_unseen_name_does_not_join_a_conflicting_known_insider(resolver):
+    known = canonical_ids(resolver, ["Robert A. Williams"])
+    ids = canonical_ids(resolver, ["Robert B. Williams"])
+    assert ids["Robert B. Williams"] != known["Robert A. Williams"]
+
+
+@pytest.mark.parametrize("key, other, agree", [("A ROBERT WILLIAMS", "B ROBERT WILLIAMS", False), ("A J SMITH", "A JOHN SMITH", True), ("JOHN SMITH", "A JOHN SMITH", True), ("JOHN SMITH", "JOHN SMYTH", False)])
+def test_tokens_agree(key, other, agree):
+    assert InsiderNameResolver.tokens_agree(key, other) is agree
+
+
+def test_holder_suffix_variants_share_a_name(tmp_path):
+    names = HolderNameResolver(cache_path=tmp_path / "holder_aliases.csv").resolve(["Vanguard Group Inc", "VANGUARD GROUP, INC."]).set_index("name")["canonicalName"]
+    assert names["Vanguard Group Inc"] == names["VANGUARD GROUP, INC."]
+
+
+def test_holder_names_of_only_legal_suffixes_are_not_merged(tmp_path):
+    names = HolderNameResolver(cache_path=tmp_path / "holder_aliases.csv").resolve(["The Company", "Co"]).set_index("name")["canonicalName"]
+    assert names["The Company"] != names["Co"]
+
+
+def test_name_resolver_requires_normalize(tmp_path):
+    with pytest.raises(TypeError):
+        NameResolver(tmp_path / "aliases.csv")
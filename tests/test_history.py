@@ -0,0 +1,62 @@
+import pandas as pd
+
+from db.history import HoldingsHistory
+
+KEYS = ["name", "ticker"]
+VALUES = ["shares"]
+
+
+def snapshots(*rows):
+    return pd.DataFrame(rows, columns=KEYS + VALUES + ["date"])
+
+
+def test_value_changes_and_gaps_open_new_intervals():
+    data = snapshots(
+        ("Fund A", "AAPL", 100, "2024-01-01"),
+        ("Fund A", "AAPL", 100, "2024-01-02"),
+        ("Fund A", "AAPL", 150, "2024-01-03"),
+        ("Fund B", "AAPL", 10, "2024-01-01"),
+        ("Fund B", "AAPL", 10, "2024-01-03"),
+    )
+    intervals = HoldingsHistory.build_intervals(data, ["2024-01-01", "2024-01-02", "2024-01-03"], KEYS, VALUES)
+    assert intervals[KEYS + VALUES + ["validFrom", "validTo"]].values.tolist() == [
+        ["Fund A", "AAPL", 100, "2024-01-01", "2024-01-03"],
+        ["Fund A", "AAPL", 150, "2024-01-03", None],
+        ["Fund B", "AAPL", 10, "2024-01-01", "2024-01-02"],
+        ["Fund B", "AAPL", 10, "2024-01-03", None],
+    ]
+
+
+def test_open_intervals_are_carried_over():
+    open_intervals = pd.DataFrame([("Fund A", "AAPL", 100, "2023-12-01", None), ("Fund B", "AAPL", 10, "2023-12-15", None)], columns=KEYS + VALUES + ["validFrom", "validTo"])
+    data = snapshots(("Fund A", "AAPL", 100, "2024-01-02"), ("Fund A", "AAPL", 100, "2024-01-03"))
+    intervals = HoldingsHistory.build_intervals(data, ["2024-01-01", "2024-01-02", "2024-01-03"], KEYS, VALUES, open_intervals=open_intervals)
+    assert intervals[KEYS + VALUES + ["validFrom", "validTo"]].values.tolist() == [
+        ["Fund A", "AAPL", 100, "2023-12-01", None],
+        ["Fund B", "AAPL", 10, "2023-12-15", "2024-01-02"],
+    ]
+
+
+def write_institutions(data_path, date, rows):
+    directory = data_path / f"data_{date}"
+    directory.mkdir()
+    if rows is not None:
+        pd.DataFrame(rows, columns=["name", "ticker", "shares", "dateReported", "pctHeld", "value"]).to_csv(directory / "institution.csv", index=False)
+
+
+def test_snapshots_without_holdings_are_no_gap(tmp_path):
+    row = ("Fund A", "AAPL", 100, "2023-12-31", 0.01, 1000)
+    write_institutions(tmp_path, "2024-01-01", [row])
+    # e.g. a failed download, or the directory the pipelined run creates before downloading
+    write_institutions(tmp_path, "2024-01-02", None)
+    write_institutions(tmp_path, "2024-01-03", [row])
+    history = HoldingsHistory(tmp_path)
+    history.update()
+    write_institutions(tmp_path, "2024-01-04", [])
+    history.update()
+    write_institutions(tmp_path, "2024-01-05", [row])
+    history.update()
+
+    intervals = history.load_intervals("HOLDS_IT")
+    assert intervals[["name", "shares", "validFrom"]].values.tolist() == [["Fund A", 100, "2024-01-01"]]
+    assert intervals["validTo"].isna().all()
@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+# the cumulative import time of the modules main.py --help imports, in microseconds
+MAIN_HELP_IMPORT_BUDGET = 300_000
+HEAVY_MODULES = ("pandas", "numpy", "scipy", "yfinance", "gqlalchemy")
+
+
+def run_python(*args) -> subprocess.CompletedProcess:
+    # without the Memgraph settings, so an import that connects fails
+    env = {key: value for key, value in os.environ.items() if not key.startswith("QUICK_CONNECT_MG_")}
+    env["PYTHONPATH"] = str(SRC_DIR)
+    return subprocess.run([sys.executable, *args], cwd=SRC_DIR, env=env, capture_output=True, text=True, check=True)
+
+
+def test_importing_the_models_opens_no_connection():
+    result = run_python("-c", "import db.models; from db.connection import memgraph; print(memgraph._memgraph is None, len(memgraph._pending) > 0)")
+    assert result.stdout.split() == ["True", "True"]
+
+
+def test_main_help_imports_within_budget():
+    result = run_python("-X", "importtime", "main.py", "--help")
+    imported, imports = set(), {}
+    for line in result.stderr.splitlines()[1:]:
+        _, cumulative, name = line.split("|")
+        imported.add(name.strip().split(".")[0])
+        # only the top-level imports for the budget, the nested ones are included in their cumulative time
+        if not name.startswith("  "):
+            imports[name.strip()] = int(cumulative)
+    startup = {"site", "encodings", "io", "zipimport", "_frozen_importlib_external"}
+    main_imports = sum(cumulative for name, cumulative in imports.items() if name not in startup and not name.startswith("_"))
+    assert main_imports < MAIN_HELP_IMPORT_BUDGET
+    assert imported.isdisjoint(HEAVY_MODULES)
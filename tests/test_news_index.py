@@ -0,0 +1,34 @@
+import pandas as pd
+
+from news_index import SeenNewsIndex
+from ticker_handler import TickerHandler
+
+FEED = [
+    {"id": "a1", "ticker": "AAPL", "content": {"title": "Apple article", "pubDate": "2024-01-02T10:00:00Z"}},
+    {"id": "a1", "ticker": "MSFT", "content": {"title": "Apple article", "pubDate": "2024-01-02T10:00:00Z"}},
+]
+
+
+def test_indexed_articles_are_completed_from_the_stored_fields(tmp_path):
+    index = SeenNewsIndex(tmp_path / "news_index.csv")
+    index.add(TickerHandler.parse_news(FEED), seen_at="2024-01-02")
+    index.save()
+
+    reloaded = SeenNewsIndex(tmp_path / "news_index.csv")
+    news = reloaded.complete(TickerHandler.parse_news([{"id": "a1", "ticker": "AAPL"}, {"id": "a1", "ticker": "GOOG"}]))
+    assert list(news["title"]) == ["Apple article", "Apple article"]
+    assert list(news["providerPublishTime"]) == ["2024-01-02 10:00:00", "2024-01-02 10:00:00"]
+
+
+def test_links_without_a_stored_article_are_dropped(tmp_path):
+    pd.DataFrame({"uuid": ["legacy"], "ticker": ["AAPL"], "firstSeen": ["2024-01-01"]}).to_csv(tmp_path / "news_index.csv", index=False)
+    index = SeenNewsIndex(tmp_path / "news_index.csv")
+    assert len(index) == 0
+    assert not index.is_seen("legacy")
+
+
+def test_evicted_articles_are_forgotten(tmp_path):
+    index = SeenNewsIndex(tmp_path / "news_index.csv", max_age_days=30)
+    index.add(TickerHandler.parse_news(FEED), seen_at="2024-01-02")
+    assert index.evict(pd.Timestamp("2024-03-01")) == ["a1"]
+    assert index.article_rows(["a1"]).empty
@@ -0,0 +1,39 @@
+from news_parsing_benchmark import parse_news_legacy
+from ticker_handler import TickerHandler
+
+# the shape of the items yfinance returns, with the fields that are missing or malformed in real feeds
+FEED = [
+    {
+        "id": "0b5a9c2e",
+        "ticker": "AAPL",
+        "content": {
+            "id": "0b5a9c2e",
+            "contentType": "STORY",
+            "title": "Apple unveils new iPhone lineup",
+            "summary": "Apple introduced its latest phones on Tuesday.",
+            "description": "<p>Apple introduced its latest phones.</p>",
+            "pubDate": "2024-09-10T17:32:05Z",
+            "provider": {"displayName": "Reuters", "url": "https://www.reuters.com/"},
+            "canonicalUrl": {"url": "https://finance.yahoo.com/news/apple-unveils-iphone.html", "site": "finance"},
+        },
+    },
+    {
+        "id": "7f1d3e44",
+        "ticker": "AAPL",
+        "content": {"id": "7f1d3e44", "contentType": "VIDEO", "title": "Market wrap", "pubDate": "not a date", "provider": {}, "canonicalUrl": None},
+    },
+    {"id": "c91e0b7a", "ticker": "MSFT", "content": {"title": "Microsoft earnings preview", "pubDate": "2024-10-29T12:00:00Z", "summary": ""}},
+    # an article already in the seen-news index, returned link-only
+    {"id": "0b5a9c2e", "ticker": "MSFT"},
+]
+
+
+def test_columnar_parser_matches_the_legacy_parser():
+    columnar = TickerHandler.parse_news(FEED)
+    assert list(columnar.columns) == list(parse_news_legacy(FEED).columns)
+    assert columnar.astype(object).equals(parse_news_legacy(FEED).astype(object))
+    assert list(columnar["providerPublishTime"]) == ["2024-09-10 17:32:05", None, "2024-10-29 12:00:00", None]
+
+
+def test_empty_feed():
+    assert TickerHandler.parse_news([]).astype(object).equals(parse_news_legacy([]).astype(object))
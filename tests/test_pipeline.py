@@ -0,0 +1,97 @@
+import asyncio
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("gqlalchemy")
+
+import download  # noqa: E402
+from download import AsyncDataDownloader  # noqa: E402
+from news_index import SeenNewsIndex  # noqa: E402
+from pipeline import PipelinedRun  # noqa: E402
+
+
+class FailingRun(PipelinedRun):
+    """Puts downloaded chunks on the queue instead of downloading and fails to upload the second batch."""
+
+    def __init__(self, chunk_count):
+        super().__init__([], batch_size=1)
+        self.chunk_count = chunk_count
+        self.uploaded = []
+
+    async def _download(self, chunk_queue, seen_news):
+        for i in range(self.chunk_count):
+            await chunk_queue.put(tuple(pd.DataFrame({"ticker": [f"T{i}"]}) for _ in range(6)))
+        await chunk_queue.put(None)
+
+    def _upload_batch(self, uploader, chunks):
+        if len(self.uploaded) == 1:
+            self.uploaded.append(None)
+            raise ConnectionError("Memgraph unavailable")
+        self.uploaded.append(chunks)
+
+
+def test_a_failed_batch_fails_the_run_after_the_queue_is_drained():
+    run = FailingRun(chunk_count=3)
+    with pytest.raises(RuntimeError, match="1 batches failed"):
+        asyncio.run(run._run(SimpleNamespace(seen_news=None)))
+    assert len(run.uploaded) == 3
+
+
+class RecordingUploader:
+    """Records the uploaded batches and adds their news to the shared index, as upload_news_data does."""
+
+    def __init__(self, seen_news):
+        self.seen_news = seen_news
+        self.batches = []
+
+    def upload_snapshot_data(self, ticker_info, insider_holder, mutual_fund, institution, insider_transaction, news, update_news_index=True):
+        assert not update_news_index
+        self.batches.append({"ticker_info": ticker_info, "news": news})
+        self.seen_news.add(news)
+
+
+class DownloadOnlyRun(PipelinedRun):
+    """Runs the real chunked download without the price history and co-holding stages."""
+
+    async def _download(self, chunk_queue, seen_news):
+        await AsyncDataDownloader(self.tickers, seen_news=seen_news).download_data_by_chunks(chunk_size=2, sleep_time=0, chunk_queue=chunk_queue)
+
+
+def test_downloaded_chunks_reach_the_uploader_through_the_queue(tmp_path, monkeypatch):
+    uploader = RecordingUploader(SeenNewsIndex(tmp_path / "news_index.csv"))
+    saved, link_only = {}, []
+
+    async def get_data(self, ticker):
+        assert self.seen_news is uploader.seen_news
+        if ticker == "T3":
+            # the article shared with T0 is uploaded by then, so it is only linked, as prepare_news_items does
+            while not uploader.batches:
+                await asyncio.sleep(0.01)
+        uuid = "shared" if ticker in ("T0", "T3") else f"u{ticker}"
+        if self.seen_news.is_seen(uuid):
+            link_only.append(ticker)
+        item = {"id": uuid, "ticker": ticker} if self.seen_news.is_seen(uuid) else {"id": uuid, "ticker": ticker, "content": {"title": f"About {uuid}", "pubDate": "2024-06-14T10:00:00Z"}}
+        ticker_info = pd.DataFrame({"ticker": [ticker], "marketCap": [pd.NA if ticker == "T1" else "1000"]}, dtype=object)
+        empty = pd.DataFrame()
+        return ticker_info, empty, empty, empty, empty, [item]
+
+    async def save_data(self, data, file_name):
+        saved[file_name] = data
+
+    monkeypatch.setattr(AsyncDataDownloader, "get_data", get_data)
+    monkeypatch.setattr(AsyncDataDownloader, "save_data", save_data)
+    monkeypatch.setattr(download, "NEWS_PARSE_BATCH", 1)
+    run = DownloadOnlyRun(["T0", "T1", "T2", "T3"], queue_size=1, batch_size=1)
+    asyncio.run(run._run(uploader))
+
+    assert [list(batch["ticker_info"]["ticker"]) for batch in uploader.batches] == [["T0", "T1"], ["T2", "T3"]]
+    # the batches hold the values as read back from the snapshot CSV
+    assert uploader.batches[0]["ticker_info"]["marketCap"].dtype == "float64"
+    # the article uploaded with the first batch is only linked, its fields are filled in from the shared index
+    assert link_only == ["T3"]
+    last_news = uploader.batches[1]["news"].set_index("ticker")
+    assert last_news.loc["T3", "uuid"] == "shared" and last_news.loc["T3", "title"] == "About shared"
+    assert last_news.loc["T2", "providerPublishTime"] == "2024-06-14 10:00:00"
+    assert list(saved["news.csv"]["ticker"]) == ["T0", "T1", "T2", "T3"]
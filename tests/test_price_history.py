@@ -0,0 +1,103 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from price_history import BAR_DTYPE, TRADING_DAYS, PriceHistoryDownloader, PriceStore
+
+
+def make_bars(dates, closes, **actions):
+    closes = np.asarray(closes, dtype=np.float64)
+    return pd.DataFrame({"open": closes, "high": closes * 1.01, "low": closes * 0.99, "close": closes, "volume": 1000.0, **actions}, index=pd.DatetimeIndex(dates))
+
+
+def test_append_skips_bars_at_or_before_the_last_stored_date(tmp_path):
+    store = PriceStore(tmp_path)
+    assert store.append("AAPL", make_bars(["2024-01-03", "2024-01-02"], [11.0, 10.0])) == 2
+    assert store.append("AAPL", make_bars(["2024-01-02", "2024-01-03", "2024-01-04"], [99.0, 99.0, 12.0])) == 1
+    assert store.append("AAPL", make_bars(["2024-01-04"], [99.0])) == 0
+
+    bars = store.read("AAPL")
+    assert [str(date) for date in bars["date"]] == ["2024-01-02", "2024-01-03", "2024-01-04"]
+    assert bars["close"].tolist() == [10.0, 11.0, 12.0]
+    assert store.last_date("AAPL") == pd.Timestamp("2024-01-04")
+
+
+def test_partly_written_records_are_ignored_and_dropped_on_append(tmp_path):
+    store = PriceStore(tmp_path)
+    (tmp_path / "AAPL.bin").write_bytes(b"\0" * (BAR_DTYPE.itemsize - 1))
+    assert len(store.read("AAPL")) == 0
+    assert store.last_date("AAPL") is None
+
+    store.append("AAPL", make_bars(["2024-01-02"], [10.0]))
+    with open(tmp_path / "AAPL.bin", "ab") as file:
+        file.write(b"\0" * 5)
+    assert store.last_date("AAPL") == pd.Timestamp("2024-01-02")
+    store.append("AAPL", make_bars(["2024-01-03"], [11.0]))
+    assert store.read("AAPL")["close"].tolist() == [10.0, 11.0]
+
+
+def test_replace_and_rescale(tmp_path):
+    store = PriceStore(tmp_path)
+    store.append("AAPL", make_bars(["2024-01-02", "2024-01-03"], [10.0, 11.0]))
+    assert store.replace("AAPL", make_bars(["2024-01-03", "2024-01-01", "2024-01-02"], [5.5, 4.0, np.nan])) == 2
+    assert store.read("AAPL")["close"].tolist() == [4.0, 5.5]
+
+    store.rescale("AAPL", 0.5)
+    bars = store.read("AAPL")
+    assert bars["close"].tolist() == [2.0, 2.75]
+    assert bars["volume"].tolist() == [1000.0, 1000.0]
+
+
+class FakeDownloader(PriceHistoryDownloader):
+    """Returns the given bars instead of downloading them."""
+
+    def __init__(self, tickers, store, new_bars, backfills):
+        super().__init__(tickers, store=store, backfill_start="2023-01-02")
+        self.new_bars = new_bars
+        self.backfills = backfills
+
+    async def get_batch(self, batch, start, retries=3):
+        source = self.backfills if start == self.backfill_start else self.new_bars
+        return {ticker: source[ticker] for ticker in batch if ticker in source}
+
+
+def test_splits_are_backfilled_and_dividends_rescale_the_stored_bars(tmp_path):
+    store = PriceStore(tmp_path)
+    for ticker in ("SPLIT", "DIVIDEND", "PLAIN"):
+        store.append(ticker, make_bars(["2024-01-02", "2024-01-03"], [100.0, 100.0]))
+    new_bars = {
+        "SPLIT": make_bars(["2024-01-04"], [50.0], splits=[2.0], dividends=[0.0]),
+        # yfinance adjusts the bar before the ex-date for the dividend, 100 * (1 - 2 / 100) = 98
+        "DIVIDEND": make_bars(["2024-01-04", "2024-01-05"], [98.0, 98.0], splits=[0.0, 0.0], dividends=[0.0, 2.0]),
+        "PLAIN": make_bars(["2024-01-04"], [101.0], splits=[0.0], dividends=[0.0]),
+    }
+    backfills = {"SPLIT": make_bars(["2024-01-02", "2024-01-03", "2024-01-04"], [50.0, 50.0, 50.0])}
+    downloader = FakeDownloader(list(new_bars), store, new_bars, backfills)
+    asyncio.run(downloader.download_data_by_batches(sleep_time=0))
+
+    assert store.read("SPLIT")["close"].tolist() == [50.0, 50.0, 50.0]
+    assert np.allclose(store.read("DIVIDEND")["close"], [98.0, 98.0, 98.0, 98.0])
+    assert store.read("PLAIN")["close"].tolist() == [100.0, 100.0, 101.0]
+
+
+def test_compute_metrics_on_synthetic_bars(tmp_path):
+    store = PriceStore(tmp_path)
+    dates = pd.bdate_range("2023-01-02", periods=TRADING_DAYS + 11)
+    returns = np.sin(np.arange(1, len(dates))) / 100
+    store.append("SLOW", make_bars(dates, 100 * np.exp(np.concatenate([[0.0], np.cumsum(returns)]))))
+    store.append("FAST", make_bars(dates, 50 * np.exp(np.concatenate([[0.0], np.cumsum(2 * returns)]))))
+    store.append("ONE_BAR", make_bars(dates[-1:], [10.0]))
+
+    price_metrics = PriceHistoryDownloader(["SLOW", "FAST", "ONE_BAR"], store=store).compute_metrics().set_index("ticker")
+    assert list(price_metrics.index) == ["SLOW", "FAST"]
+
+    window = returns[-TRADING_DAYS:].astype(np.float32)
+    slow = price_metrics.loc["SLOW"]
+    assert np.isclose(slow["return1M"], np.exp(returns[-21:].sum()) - 1, atol=1e-5)
+    assert np.isclose(slow["return1Y"], np.exp(returns[-TRADING_DAYS:].sum()) - 1, atol=1e-5)
+    assert np.isclose(slow["volatility1Y"], window.std(ddof=1) * np.sqrt(TRADING_DAYS), rtol=1e-3)
+    # the market return is 1.5 times the one of SLOW, so both correlate perfectly with it
+    assert np.allclose(price_metrics["marketCorrelation1Y"], 1.0)
+    assert np.isclose(price_metrics.loc["FAST", "volatility1Y"], 2 * slow["volatility1Y"], rtol=1e-3)
+    assert slow["lastPriceDate"] == str(dates[-1].date())
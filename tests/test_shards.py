@@ -0,0 +1,63 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from shards import DONE_MARKER, ShardedRun, shard_of, shard_tickers
+
+TICKERS = ["AAPL", "MSFT", "GOOG", "AMZN", "NVDA", "TSLA", "META", "NFLX"]
+
+
+def test_partition_is_stable():
+    # CRC32 of the symbols, the same in every process, unlike the salted hash()
+    assert {ticker: shard_of(ticker, 4) for ticker in TICKERS} == {"AAPL": 0, "MSFT": 3, "GOOG": 0, "AMZN": 2, "NVDA": 3, "TSLA": 3, "META": 1, "NFLX": 3}
+
+
+def test_every_ticker_is_in_exactly_one_shard():
+    shards = [shard_tickers(TICKERS, shard_index, 3) for shard_index in range(3)]
+    assert sorted(ticker for shard in shards for ticker in shard) == sorted(TICKERS)
+    # in their screener order
+    assert all(shard == [ticker for ticker in TICKERS if ticker in shard] for shard in shards)
+    with pytest.raises(ValueError):
+        shard_tickers(TICKERS, 3, 3)
+
+
+def write_part(run, shard_index, done=True, **files):
+    part_path = run.part_path(shard_index)
+    part_path.mkdir(parents=True)
+    for file_name, data in files.items():
+        data.to_csv(part_path / f"{file_name}.csv", index=False)
+    if done:
+        (part_path / DONE_MARKER).write_text("done")
+
+
+def test_merge_orders_the_rows_as_the_screener(tmp_path):
+    run = ShardedRun(TICKERS, 2, data_path=tmp_path)
+    write_part(run, 0, ticker_info=pd.DataFrame({"ticker": ["NFLX", "AAPL"]}), news=pd.DataFrame({"uuid": ["n1", "n2"], "ticker": ["DELISTED", "AAPL"]}))
+    write_part(run, 1, ticker_info=pd.DataFrame({"ticker": ["TSLA", "MSFT"]}), news=pd.DataFrame({"uuid": ["n3", "n4"], "ticker": ["MSFT", "MSFT"]}))
+    run.merge()
+
+    assert list(pd.read_csv(tmp_path / "ticker_info.csv")["ticker"]) == ["AAPL", "MSFT", "TSLA", "NFLX"]
+    # the rows of a ticker keep their order, unknown tickers go last
+    assert list(pd.read_csv(tmp_path / "news.csv")["uuid"]) == ["n2", "n3", "n4", "n1"]
+    # a file no shard wrote is merged into an empty one
+    assert (tmp_path / "institution.csv").read_text().strip() == ""
+
+
+def test_merge_fails_while_a_shard_is_not_done(tmp_path):
+    run = ShardedRun(TICKERS, 2, data_path=tmp_path)
+    write_part(run, 0, ticker_info=pd.DataFrame({"ticker": ["AAPL"]}))
+    write_part(run, 1, done=False, ticker_info=pd.DataFrame({"ticker": ["MSFT"]}))
+    with pytest.raises(FileNotFoundError, match=r"Shards \[1\]"):
+        run.merge()
+    assert not (tmp_path / "ticker_info.csv").exists()
+
+
+@pytest.mark.parametrize("stage", ["--upload-only", "--pipelined"])
+def test_sharded_runs_reject_other_stages(stage):
+    main = Path(__file__).resolve().parents[1] / "src" / "main.py"
+    result = subprocess.run([sys.executable, str(main), stage, "--shard-index", "0", "--shard-count", "2"], cwd=main.parent, capture_output=True, text=True)
+    assert result.returncode == 2
+    assert "does not support sharded runs" in result.stderr
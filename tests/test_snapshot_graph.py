@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from snapshot_graph import CSRAdjacency, SnapshotGraph
+
+
+@pytest.fixture
+def graph(tmp_path):
+    frames = {
+        "ticker_info": pd.DataFrame({"ticker": ["AAPL", "MSFT", "GOOG"], "marketCap": [3.0, 2.5, 2.0]}),
+        # TSLA is not listed in ticker_info but held, so it gets a node after the listed tickers
+        "institution": pd.DataFrame(
+            {
+                "name": ["Vanguard", "Vanguard", "BlackRock", "BlackRock"],
+                "ticker": ["AAPL", "MSFT", "AAPL", "TSLA"],
+                "shares": [100, 50, 80, 20],
+                "pctHeld": [0.1, 0.2, 0.05, 0.3],
+                "value": [1000, 500, 800, 200],
+            }
+        ),
+        "mutual_fund": pd.DataFrame({"name": ["Fund X"], "ticker": ["MSFT"], "shares": [10], "pctHeld": [0.3], "value": [np.nan]}),
+        "insider_holder": pd.DataFrame({"ticker": ["AAPL"], "name": ["Tim Cook"], "sharesOwnedDirectly": [1000], "sharesOwnedIndirectly": [np.nan]}),
+        "insider_transaction": pd.DataFrame({"name": ["Tim Cook", "Jane Roe"], "ticker": ["AAPL", "MSFT"], "shares": [10, 5]}),
+        "news": pd.DataFrame({"uuid": ["u1", "u1", "u2", "u1"], "ticker": ["AAPL", "MSFT", "GOOG", "AAPL"], "title": ["Apple and Microsoft", "Apple and Microsoft", "Google", "Apple and Microsoft"]}),
+    }
+    for name, data in frames.items():
+        data.to_csv(tmp_path / f"{name}.csv", index=False)
+    return SnapshotGraph.from_snapshot(tmp_path)
+
+
+def test_nodes_and_properties(graph):
+    assert list(graph.nodes["Ticker"]) == ["AAPL", "MSFT", "GOOG", "TSLA"]
+    assert list(graph.nodes["InsiderHolder"]) == ["Tim Cook", "Jane Roe"]
+    assert list(graph.nodes["News"]) == ["u1", "u2"]
+    assert graph.node_properties["Ticker"]["marketCap"][:3].tolist() == [3.0, 2.5, 2.0]
+    assert np.isnan(graph.node_properties["Ticker"]["marketCap"][3])
+    assert graph.index_of("Ticker", "GOOG") == 2
+    with pytest.raises(KeyError):
+        graph.index_of("Ticker", "IBM")
+
+
+def test_neighbors_and_degrees(graph):
+    assert sorted(graph.neighbors("HOLDS_IT", "Ticker", "AAPL", "in")) == ["BlackRock", "Vanguard"]
+    assert list(graph.neighbors("HOLDS_IT", "Institution", "Vanguard")) == ["AAPL", "MSFT"]
+    assert list(graph.neighbors("HOLDS_IHT", "Ticker", "AAPL")) == ["Tim Cook"]
+    assert list(graph.neighbors("ABOUT_NT", "News", "u1")) == ["AAPL", "MSFT"]
+    assert len(graph.neighbors("HOLDS_IT", "Ticker", "GOOG", "in")) == 0
+
+    assert graph.degree("HOLDS_IT").to_dict() == {"Vanguard": 2, "BlackRock": 2}
+    assert graph.degree("HOLDS_IT", "in").to_dict() == {"AAPL": 2, "MSFT": 1, "GOOG": 0, "TSLA": 1}
+    # the duplicated news row gives one link
+    assert graph.degree("ABOUT_NT", "in").to_dict() == {"AAPL": 1, "MSFT": 1, "GOOG": 1, "TSLA": 0}
+
+
+def test_k_hop(graph):
+    reached = graph.k_hop("Institution", "Vanguard", 1, relationships=["HOLDS_IT"])
+    assert {label: sorted(keys) for label, keys in reached.items()} == {"Ticker": ["AAPL", "MSFT"]}
+    reached = graph.k_hop("Institution", "Vanguard", 3, relationships=["HOLDS_IT"])
+    assert {label: sorted(keys) for label, keys in reached.items()} == {"Ticker": ["AAPL", "MSFT", "TSLA"], "Institution": ["BlackRock"]}
+
+    reached = graph.k_hop("Ticker", "AAPL", 2)
+    assert {label: sorted(keys) for label, keys in reached.items()} == {
+        "Ticker": ["MSFT", "TSLA"],
+        "Institution": ["BlackRock", "Vanguard"],
+        "InsiderHolder": ["Tim Cook"],
+        "InsiderTransaction": [0],
+        "News": ["u1"],
+    }
+    # the news about GOOG are about no other ticker, so the traversal stops early
+    assert {label: list(keys) for label, keys in graph.k_hop("Ticker", "GOOG", 5).items()} == {"News": ["u2"]}
+
+
+def test_aggregates(graph):
+    assert graph.aggregate("HOLDS_IT", "shares").to_dict() == {"AAPL": 180, "MSFT": 50, "GOOG": 0, "TSLA": 20}
+    assert graph.aggregate("HOLDS_IT", "value", by="src", func="max").to_dict() == {"Vanguard": 1000, "BlackRock": 800}
+    assert graph.aggregate("HOLDS_IT", "pctHeld", func="mean")[["AAPL", "MSFT"]].round(6).tolist() == [0.075, 0.2]
+    assert np.isnan(graph.aggregate("HOLDS_IT", "pctHeld", func="min")["GOOG"])
+    # missing values are ignored
+    assert graph.aggregate("HOLDS_MT", "value", func="count")["MSFT"] == 0
+    with pytest.raises(ValueError):
+        graph.aggregate("HOLDS_IT", "shares", func="median")
+
+
+def test_holder_overlap_and_concentration(graph):
+    overlap = graph.holder_overlap("AAPL", "MSFT")
+    assert list(overlap["HOLDS_IT"]) == ["Vanguard"]
+    assert len(overlap["HOLDS_MT"]) == 0
+    assert graph.ownership_concentration().round(6).to_dict() == {"AAPL": 0.0125, "MSFT": 0.04, "GOOG": 0.0, "TSLA": 0.09}
+
+
+def test_csr_adjacency_in_both_directions():
+    adjacency = CSRAdjacency(np.array([2, 0, 0, 1]), np.array([0, 2, 1, 2]), num_src=3, num_dst=3, properties={"weight": [20, 2, 1, 12]})
+    assert adjacency.indptr.tolist() == [0, 2, 3, 4]
+    assert adjacency.indices.tolist() == [1, 2, 2, 0]
+    assert adjacency.properties["weight"].tolist() == [1, 2, 12, 20]
+    neighbors, sources = adjacency.gather([0, 2])
+    assert (neighbors.tolist(), sources.tolist()) == ([1, 2, 0], [0, 0, 2])
+    neighbors, sources = adjacency.gather([2], "in")
+    assert (neighbors.tolist(), sources.tolist()) == ([0, 1], [2, 2])
+    assert adjacency.properties["weight"][adjacency.rev_edges].tolist() == [20, 1, 2, 12]
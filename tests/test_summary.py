@@ -0,0 +1,17 @@
+import pandas as pd
+
+from db.summary import SummaryBuilder
+
+
+def test_latest_news_fields_come_from_one_article():
+    news = pd.DataFrame(
+        {
+            "uuid": ["old", "latest", "undated"],
+            "ticker": ["AAPL", "AAPL", "AAPL"],
+            "title": ["Old article", "Latest article", None],
+            "providerPublishTime": ["2024-01-01 10:00:00", "2024-01-02 10:00:00", None],
+        }
+    )
+    empty = pd.DataFrame()
+    latest = SummaryBuilder(empty, empty, empty, empty, news)._latest_news()
+    assert latest.loc["AAPL"].to_dict() == {"latestNewsUuid": "latest", "latestNewsTitle": "Latest article", "latestNewsTime": "2024-01-02 10:00:00", "newsCount": 3}
@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip("gqlalchemy")
+
+from db.upload import DataUploader  # noqa: E402
+from news_index import SeenNewsIndex  # noqa: E402
+from ticker_handler import TickerHandler  # noqa: E402
+
+
+class RecordingMemgraph:
+    """Answers the News uuid query with the given uuids and records the executed queries."""
+
+    def __init__(self, uuids):
+        self.uuids = uuids
+        self.executed = []
+
+    def execute_and_fetch(self, query):
+        return iter([{"uuid": uuid} for uuid in self.uuids])
+
+    def execute(self, query, parameters=None):
+        self.executed.append((" ".join(query.split()), parameters))
+
+
+def test_relink_news_recreates_indexed_articles_missing_from_the_graph(tmp_path):
+    uploader = DataUploader.__new__(DataUploader)
+    uploader.memgraph = RecordingMemgraph(uuids=[])
+    uploader.seen_news = SeenNewsIndex(tmp_path / "news_index.csv")
+    uploader.seen_news.add(TickerHandler.parse_news([{"id": "a1", "ticker": "AAPL", "content": {"title": "Apple article"}}]))
+
+    uploader.relink_news()
+
+    created, linked = uploader.memgraph.executed
+    assert "MERGE (n:News {uuid: row.uuid})" in created[0]
+    assert created[1]["rows"][0]["uuid"] == "a1" and created[1]["rows"][0]["title"] == "Apple article"
+    assert linked[1]["rows"] == [{"uuid": "a1", "ticker": "AAPL"}]
+
+
+def test_batched_news_uploads_leave_the_index_file_alone(tmp_path):
+    uploader = DataUploader.__new__(DataUploader)
+    uploader.memgraph = RecordingMemgraph(uuids=[])
+    uploader.seen_news = SeenNewsIndex(tmp_path / "news_index.csv")
+    news = TickerHandler.parse_news([{"id": "a1", "ticker": "AAPL", "content": {"title": "Apple article"}}])
+
+    uploader.upload_news_data(news, update_index=False)
+    assert uploader.seen_news.is_seen("a1", "AAPL")
+    assert not (tmp_path / "news_index.csv").exists()
+
+    uploader.upload_news_data(news.assign(ticker="MSFT"))
+    assert (tmp_path / "news_index.csv").exists()
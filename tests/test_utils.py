@@ -0,0 +1,34 @@
+import logging
+
+from utils import RateLimitFilter
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def make_record(lineno, created):
+    record = logging.LogRecord("test", logging.WARNING, "ticker_handler.py", lineno, "Row failed", None, None)
+    record.created = created
+    return record
+
+
+def test_suppressed_counts_are_not_suppressed_themselves():
+    rate_limit = RateLimitFilter(rate=1, period=60.0)
+    for lineno in (10, 20, 30):
+        assert [rate_limit.filter(make_record(lineno, created=0.0)) for _ in range(3)] == [True, False, False]
+
+    handler = RecordingHandler()
+    handler.addFilter(rate_limit)
+    logger = logging.getLogger("utils")
+    logger.addHandler(handler)
+    try:
+        rate_limit.log_suppressed()
+    finally:
+        logger.removeHandler(handler)
+    assert handler.messages == [f"2 similar messages from ticker_handler.py:{lineno} suppressed" for lineno in (10, 20, 30)]